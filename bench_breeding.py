@@ -0,0 +1,41 @@
+"""
+Benchmark of breeding.py's pair ranking.
+
+Usage:
+    python bench_breeding.py [N]
+
+Times rank_pairs on N random veterans (default 10000) and reports how many
+of the pairs had to be scored after pruning.
+"""
+
+import sys
+import time
+
+from breeding import DEFAULT_TOP_K, PARENT_SPARK_WEIGHT, np, rank_pairs
+
+
+def run_benchmark(count: int):
+    """Time pair ranking over random veterans."""
+    rng = np.random.default_rng(0)
+    targets = 6
+    vectors = rng.integers(0, 4, size=(count, targets)).astype(np.float32)
+    vectors += PARENT_SPARK_WEIGHT * rng.integers(0, 7, size=(count, targets)).astype(np.float32)
+    target = rng.integers(6, 16, size=targets).astype(np.float32)
+
+    start = time.perf_counter()
+    pairs, scored = rank_pairs(vectors, target, DEFAULT_TOP_K)
+    elapsed = time.perf_counter() - start
+
+    total = count * (count - 1) // 2
+    print(f"[OK] {count} veterans, {total:,} pairs: scored {scored:,} ({scored / max(total, 1):.1%}) in {elapsed:.2f}s")
+    print(f"     Best score {pairs[0][0]:g} / {target.sum():g}")
+
+
+def main():
+    args = sys.argv[1:2]
+    run_benchmark(int(args[0]) if args and args[0].isdigit() else 10000)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
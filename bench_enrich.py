@@ -0,0 +1,76 @@
+"""
+Before/after check of enrich_data.py's shared catalog lookups.
+
+Usage:
+    python bench_enrich.py [data.json]
+
+Enriches the export (default data.json) twice with the cached translation
+data, once with lookup sharing turned off and once with it on, and checks
+that both give the same JSON, that the shared records are smaller, and that
+cached_lookup returns the very same object for a repeated lookup. Exits 1
+if any check fails.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+from enrich_data import (cached_lookup, enrich_character, enrich_unshared, get_chara_info, get_skill_details,
+                         has_translation_data, load_sources, memory_stats, update_sources)
+
+
+def run_check(input_path: Path) -> int:
+    """Compare an unshared and a shared enrichment of input_path."""
+    try:
+        raw = json.loads(input_path.read_bytes())
+    except (OSError, ValueError) as e:
+        print(f"[X] Error: Could not load {input_path}: {e}")
+        return 1
+    data = load_sources(update_sources())
+    if not has_translation_data(data):
+        print("[X] Error: No translation data, nothing is looked up to share")
+        return 1
+    
+    start = time.perf_counter()
+    unshared = enrich_unshared(raw, data)
+    unshared_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    shared = json.loads(input_path.read_bytes())
+    for char in shared:
+        enrich_character(char, data)
+    shared_time = time.perf_counter() - start
+    
+    before, after = memory_stats(unshared), memory_stats(shared)
+    mb = 1024 * 1024
+    print(f"{len(raw)} veterans from {input_path}")
+    print(f"  Without sharing: {before['objects']:>10,} objects  {before['bytes'] / mb:8.1f} MB  {unshared_time:.2f}s")
+    print(f"  With sharing:    {after['objects']:>10,} objects  {after['bytes'] / mb:8.1f} MB  {shared_time:.2f}s")
+    
+    # A repeated lookup of an ID the run already saw must hand back the stored object
+    skill_id = next((s.get("skill_id") for c in raw for s in c.get("skill_array", []) if s.get("skill_id")), None)
+    card_id = next((c.get("card_id") for c in raw if c.get("card_id")), None)
+    repeats = [
+        cached_lookup(data, "skill_details", skill_id, get_skill_details)
+        is cached_lookup(data, "skill_details", skill_id, get_skill_details),
+        cached_lookup(data, "chara", card_id, get_chara_info) is cached_lookup(data, "chara", card_id, get_chara_info),
+    ]
+    
+    checks = [
+        ("same enriched JSON", json.dumps(unshared, sort_keys=True) == json.dumps(shared, sort_keys=True)),
+        ("fewer objects with sharing", after["objects"] < before["objects"]),
+        ("fewer bytes with sharing", after["bytes"] < before["bytes"]),
+        ("repeated lookups return the same object", skill_id is not None and card_id is not None and all(repeats)),
+    ]
+    for label, ok in checks:
+        print(f"  {'[OK]' if ok else '[X]'} {label}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def main():
+    return run_check(Path(sys.argv[1]) if len(sys.argv) > 1 else Path("data.json"))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Load and soak tests for the launcher's HTTP server and job scheduler.
+
+Each test starts the launcher's server on a free local port (or drives the
+scheduler directly), runs against the files in this folder and prints what
+it measured; the exit code is 1 when a check failed.
+
+Usage:
+    python bench_launcher.py --stress [N]
+    python bench_launcher.py --reload-test [file]
+    python bench_launcher.py --noise-test [N]
+    python bench_launcher.py --concurrency-test [N]
+    python bench_launcher.py --pipeline-test
+
+    --stress    Hit the server with N parallel local clients (default 50):
+                control panel API calls plus the largest static file,
+                reporting failures and latency
+    --reload-test
+                Fetch a static file (default enriched_data.json) plain,
+                gzip-compressed and revalidated, reporting bytes on the
+                wire and latency of each
+    --noise-test
+                Run a job printing N lines (default 200000) while a client
+                polls its output, reporting memory kept and poll latency
+                early and late in the run
+    --concurrency-test
+                While one client downloads a large file at a throttled rate,
+                hit the server with N parallel clients (default 20); fails
+                unless every request succeeds and /api/status keeps
+                answering within CONCURRENCY_STATUS_LIMIT seconds
+    --pipeline-test
+                Run extract -> enrich -> validate through the scheduler, with
+                stand-in extract and enrich steps and a copy of the data that
+                has a terminology finding; the pipeline must finish completed
+"""
+
+import http.client
+import json
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import launcher
+from launcher import (JOB_KINDS, PIPELINE, SCRIPT_DIR, JobOutput, LauncherHandler, LauncherServer,
+                      output_buffers, scheduler, start_process_job, state_lock)
+
+
+def run_stress_test(clients: int):
+    """Hit a server on a free port with many parallel clients and report latency."""
+    server = LauncherServer(('127.0.0.1', 0), LauncherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    # The largest static file stands in for the viewer's data download
+    static = max((p for p in SCRIPT_DIR.iterdir() if p.is_file() and p.suffix in ('.json', '.js', '.html')),
+                 key=lambda p: p.stat().st_size)
+    paths = ['/api/status', '/api/output/enrich', '/', f'/{static.name}']
+    
+    def fetch(i):
+        path = paths[i % len(paths)]
+        start = time.perf_counter()
+        with urllib.request.urlopen(base + path, timeout=30) as response:
+            size = len(response.read())
+        return path, time.perf_counter() - start, size
+    
+    start = time.perf_counter()
+    failures = 0
+    results = []
+    with ThreadPoolExecutor(clients) as pool:
+        for future in [pool.submit(fetch, i) for i in range(clients * 4)]:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                failures += 1
+                print(f"[X] {e}")
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    
+    print(f"{len(results) + failures} requests from {clients} parallel clients in {elapsed:.2f}s, {failures} failed")
+    for path in paths:
+        times = sorted(t for p, t, _ in results if p == path)
+        if times:
+            p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+            print(f"  {path:<28} median {times[len(times) // 2] * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+    return 1 if failures else 0
+
+
+def run_noise_test(count: int):
+    """Run a job printing count lines while a client polls it, reporting memory and latency."""
+    server = LauncherServer(('127.0.0.1', 0), LauncherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    action = 'noise-test'
+    
+    code = f"for i in range({count}): print(f'line {{i}}: ' + 'x' * 100)"
+    with state_lock:
+        buffer = output_buffers[action] = JobOutput(action)
+        start_process_job(action, buffer, [sys.executable, '-c', code])
+    
+    # Polls like the panel, plus a late client asking for everything from the start
+    seq = 0
+    polls = []
+    status = 'running'
+    start = time.perf_counter()
+    while status == 'running':
+        for since in (seq, 0):
+            poll_start = time.perf_counter()
+            with urllib.request.urlopen(f"{base}/api/output/{action}?since={since}", timeout=30) as response:
+                data = json.loads(response.read())
+            polls.append((since == 0, data['seq'], time.perf_counter() - poll_start, len(data['output'])))
+        seq, status = data['seq'], data['status']
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    
+    print(f"{buffer.seq} lines in {elapsed:.2f}s, {len(buffer.lines)} kept in memory ({buffer.size / 1024:.0f} KB), "
+          f"full output in logs/{action}.log")
+    for late, label in ((False, 'since last seq'), (True, 'since 0')):
+        rows = [row for row in polls if row[0] == late]
+        for part, chunk in (('first', rows[:max(len(rows) // 10, 1)]), ('last', rows[-max(len(rows) // 10, 1):])):
+            times = sorted(t for _, _, t, _ in chunk)
+            print(f"  {label:<15} {part:<5} 10%: median {times[len(times) // 2] * 1000:6.1f} ms, "
+                  f"max response {max(size for *_, size in chunk) / 1024:6.0f} KB")
+    return 0 if status == 'completed' else 1
+
+
+def run_reload_test(name: str):
+    """Bytes on the wire and latency for a first load vs. a cached reload."""
+    if not (SCRIPT_DIR / name).is_file():
+        print(f"[X] Error: {name} not found")
+        return 1
+    
+    server = LauncherServer(('127.0.0.1', 0), LauncherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    def fetch(headers):
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=60)
+        start = time.perf_counter()
+        conn.request('GET', '/' + name, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - start
+        conn.close()
+        return response.status, len(body), elapsed, response.getheader('ETag')
+    
+    _, _, _, etag = fetch({'Accept-Encoding': 'gzip'})
+    runs = [
+        ('plain', {}),
+        ('gzip', {'Accept-Encoding': 'gzip'}),
+        ('reload (If-None-Match)', {'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+    ]
+    print(f"{name}:")
+    for label, headers in runs:
+        status, size, elapsed, _ = fetch(headers)
+        print(f"  {label:<24} {status}  {size:>12,} bytes  {elapsed * 1000:8.1f} ms")
+    server.shutdown()
+    server.server_close()
+    return 0
+
+
+# Slowest /api/status answer --concurrency-test accepts during the download
+CONCURRENCY_STATUS_LIMIT = 0.5
+
+
+def run_concurrency_test(clients: int):
+    """Check that a slow download neither fails other requests nor delays /api/status."""
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        # Far more than socket buffers hold, so the download thread stays blocked on the client
+        big = work / 'enriched_data.json'
+        size = 64 * 1024 * 1024
+        with open(big, 'wb') as f:
+            f.write(b'[' + b'0,' * (size // 2 - 1) + b'0]')
+        shutil.copy(SCRIPT_DIR / 'viewer.html', work / 'viewer.html')
+        
+        script_dir = launcher.SCRIPT_DIR
+        launcher.SCRIPT_DIR = work
+        server = LauncherServer(('127.0.0.1', 0), LauncherHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        try:
+            received = 0
+            stop = threading.Event()
+            
+            def slow_download():
+                # About 1 MB/s: 16 KB reads with a pause between them
+                nonlocal received
+                with socket.create_connection(('127.0.0.1', port), timeout=30) as sock:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16 * 1024)
+                    sock.sendall(f'GET /{big.name} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+                    while not stop.is_set():
+                        chunk = sock.recv(16 * 1024)
+                        if not chunk:
+                            break
+                        received += len(chunk)
+                        time.sleep(0.016)
+            
+            downloader = threading.Thread(target=slow_download, daemon=True)
+            downloader.start()
+            time.sleep(0.5)
+            
+            paths = ['/api/status', '/api/output/enrich', '/api/jobs', '/viewer.html']
+            
+            def fetch(i):
+                path = paths[i % len(paths)]
+                start = time.perf_counter()
+                # Short timeout: a server stalled behind the download fails fast
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+                    response.read()
+                return path, time.perf_counter() - start
+            
+            failures = 0
+            results = []
+            with ThreadPoolExecutor(clients) as pool:
+                for future in [pool.submit(fetch, i) for i in range(clients * 10)]:
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        failures += 1
+                        print(f"[X] {e}")
+            in_progress = downloader.is_alive() and 0 < received < size
+            stop.set()
+            downloader.join(5)
+        finally:
+            server.shutdown()
+            server.server_close()
+            launcher.SCRIPT_DIR = script_dir
+    
+    status_times = sorted(t for p, t in results if p == '/api/status')
+    slowest = status_times[-1] if status_times else float('inf')
+    print(f"{len(results) + failures} requests from {clients} parallel clients during a throttled "
+          f"{size // (1024 * 1024)} MB download ({received / (1024 * 1024):.1f} MB received)")
+    if status_times:
+        print(f"  /api/status median {status_times[len(status_times) // 2] * 1000:.1f} ms, "
+              f"slowest {slowest * 1000:.1f} ms")
+    checks = [
+        ('no failed requests', failures == 0),
+        ('download still in progress throughout', in_progress),
+        (f'/api/status within {CONCURRENCY_STATUS_LIMIT}s', slowest <= CONCURRENCY_STATUS_LIMIT),
+    ]
+    for label, ok in checks:
+        print(f"  {'[OK]' if ok else '[X]'} {label}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def run_pipeline_test():
+    """Run PIPELINE whose validate step finds an issue; it must still complete."""
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for name in ('validate_localization.py', 'viewer.html', 'viewer.js', 'launcher.py'):
+            shutil.copy(SCRIPT_DIR / name, work / name)
+        # "Runner" is a JP-style spark name, reported as "Front Runner"
+        record = {"trained_chara_id": 1, "spark_array_enriched": [{"spark_id": 101, "spark_name_en": "Runner"}]}
+        (work / 'enriched_data.json').write_text(json.dumps([record]), encoding='utf-8')
+        
+        def stand_in(kind):
+            return lambda buffer: start_process_job(kind, buffer, [sys.executable, '-c', f"print('{kind} ok')"])
+        
+        starts = {kind: JOB_KINDS[kind]['start'] for kind in ('extract', 'enrich')}
+        script_dir = launcher.SCRIPT_DIR
+        launcher.SCRIPT_DIR = work
+        try:
+            for kind in starts:
+                JOB_KINDS[kind]['start'] = stand_in(kind)
+            with state_lock:
+                jobs = scheduler.submit_pipeline(PIPELINE)
+            pipeline = jobs[0].pipeline
+            deadline = time.time() + 120
+            while True:
+                with state_lock:
+                    summary = next(p for p in scheduler.summary()['pipelines'] if p['id'] == pipeline)
+                    found = jobs[-1].output.mentions("Found: 'Runner'")
+                if summary['status'] != 'running' or time.time() > deadline:
+                    break
+                time.sleep(0.2)
+        finally:
+            launcher.SCRIPT_DIR = script_dir
+            for kind, start in starts.items():
+                JOB_KINDS[kind]['start'] = start
+    
+    steps = ', '.join(f"{step['kind']} {step['status']}" for step in summary['steps'])
+    print(f"Pipeline {pipeline}: {summary['status']} ({steps})")
+    checks = [
+        ('validate step reported the finding', found),
+        ('pipeline completed', summary['status'] == 'completed'),
+    ]
+    for label, ok in checks:
+        print(f"  {'[OK]' if ok else '[X]'} {label}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+def main():
+    if '--concurrency-test' in sys.argv:
+        pos = sys.argv.index('--concurrency-test')
+        args = sys.argv[pos + 1:pos + 2]
+        return run_concurrency_test(int(args[0]) if args and args[0].isdigit() else 20)
+    
+    if '--pipeline-test' in sys.argv:
+        return run_pipeline_test()
+    
+    if '--reload-test' in sys.argv:
+        pos = sys.argv.index('--reload-test')
+        args = sys.argv[pos + 1:pos + 2]
+        return run_reload_test(args[0] if args else 'enriched_data.json')
+    
+    if '--noise-test' in sys.argv:
+        pos = sys.argv.index('--noise-test')
+        args = sys.argv[pos + 1:pos + 2]
+        return run_noise_test(int(args[0]) if args and args[0].isdigit() else 200000)
+    
+    if '--stress' in sys.argv:
+        pos = sys.argv.index('--stress')
+        args = sys.argv[pos + 1:pos + 2]
+        return run_stress_test(int(args[0]) if args and args[0].isdigit() else 50)
+    
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Memory and speed of model.py's slotted records compared with plain dicts.
+
+Usage:
+    python bench_model.py [enriched_data.json] [--copies N]
+
+Loads the file both ways (optionally repeated N times for a larger
+collection) and reports memory kept, load time, field access time and
+whether to_dict() gives back the original records.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from model import Veteran
+from spark_index import PARENT_POSITIONS
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
+
+def _measure(build) -> tuple:
+    """(bytes still allocated by build's result, seconds to build it)."""
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    del result
+
+    # Timed and traced separately, tracemalloc slows allocation down a lot
+    tracemalloc.start()
+    result = build()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed
+
+
+def run_benchmark(path: Path, copies: int):
+    """Compare dict records with the slotted model: memory, access time, round trip."""
+    text = path.read_text(encoding="utf-8")
+    if copies > 1:
+        records = json.loads(text)
+        text = json.dumps(records * copies)
+
+    dict_bytes, dict_load = _measure(lambda: json.loads(text))
+    model_bytes, model_load = _measure(lambda: [Veteran.from_dict(r) for r in json.loads(text)])
+    dicts = json.loads(text)
+    veterans = [Veteran.from_dict(r) for r in dicts]
+
+    def dict_access():
+        total = 0
+        for char in dicts:
+            total += char.get("speed", 0) + char.get("stamina", 0)
+            for spark in char.get("spark_array_enriched", []):
+                total += spark.get("stars") or 0
+            for parent in char.get("succession_chara_array", []):
+                if parent.get("position_id") in PARENT_POSITIONS:
+                    for spark in parent.get("factor_info_array", []):
+                        total += spark.get("stars") or 0
+        return total
+
+    def model_access():
+        total = 0
+        for vet in veterans:
+            total += (vet.speed or 0) + (vet.stamina or 0)
+            for spark in vet.sparks or ():
+                total += spark.stars or 0
+            for parent in vet.direct_parents():
+                for spark in parent.sparks or ():
+                    total += spark.stars or 0
+        return total
+
+    timings = {}
+    for label, fn in (("dicts", dict_access), ("model", model_access)):
+        start = time.perf_counter()
+        for _ in range(5):
+            result = fn()
+        timings[label] = ((time.perf_counter() - start) / 5, result)
+
+    round_trip = all(v.to_dict() == d for v, d in zip(veterans, dicts))
+    mb = 1024 * 1024
+
+    print(f"{len(dicts)} veterans from {path.name}" + (f" (x{copies})" if copies > 1 else ""))
+    print(f"  Memory:  dicts {dict_bytes / mb:8.1f} MB   model {model_bytes / mb:8.1f} MB   ({1 - model_bytes / dict_bytes:.0%} less)")
+    print(f"  Load:    dicts {dict_load:8.2f} s    model {model_load:8.2f} s")
+    print(f"  Access:  dicts {timings['dicts'][0] * 1000:8.1f} ms   model {timings['model'][0] * 1000:8.1f} ms"
+          f"   (same result: {timings['dicts'][1] == timings['model'][1]})")
+    print(f"  Round trip to_dict() == original: {round_trip}")
+
+
+def main():
+    args = sys.argv[1:]
+    copies = 1
+    if "--copies" in args:
+        pos = args.index("--copies")
+        try:
+            copies = int(args[pos + 1])
+        except (IndexError, ValueError):
+            print("[X] Error: --copies needs a number")
+            return 1
+        del args[pos:pos + 2]
+
+    path = Path(args[0]) if args else SCRIPT_DIR / "enriched_data.json"
+    if not path.exists():
+        print(f"[X] Error: {path} not found. Run enrich_data.py first.")
+        return 1
+
+    run_benchmark(path, max(copies, 1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Benchmark of validate_localization.py's enriched data check.
+
+Usage:
+    python bench_validate.py [N]
+
+Times check_enriched_data on a synthetic enriched_data.json of N veterans
+(default 100000), and the name checks alone without JSON parsing.
+"""
+
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from validate_localization import check_characters, check_enriched_data
+
+
+def run_benchmark(count: int):
+    """Time check_enriched_data on a synthetic file of count veterans."""
+    rng = random.Random(0)
+    # Realistic spread: a few hundred distinct names, a handful of them wrong
+    spark_names = [f"Spark {i}" for i in range(400)] + ["Front Runner", "Long", "Wit", "Runner", "Int"]
+    epithet_names = [f"Epithet {i}" for i in range(200)] + ["Wit Bonus", "Skill Point Bonus", "Wisdom Bonus"]
+    data = [
+        {
+            "spark_array_enriched": [
+                {"spark_id": i, "spark_name_en": rng.choice(spark_names), "stars": rng.randint(1, 3)}
+                for i in range(rng.randint(6, 12))
+            ],
+            "nickname_array_enriched": [
+                {"nickname_id": i, "nickname_name_en": rng.choice(epithet_names)}
+                for i in range(rng.randint(0, 3))
+            ],
+        }
+        for _ in range(count)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = Path(tmp) / "enriched_data.json"
+        with open(data_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        size_mb = data_path.stat().st_size / (1024 * 1024)
+        
+        start = time.perf_counter()
+        issues = check_enriched_data(data_path, full=True)
+        total = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    check_characters(data, "enriched_data.json")
+    scan = time.perf_counter() - start
+    
+    print(f"[OK] {count} veterans ({size_mb:.1f} MB): {len(issues)} issue(s)")
+    print(f"     check_enriched_data: {total:.2f}s (name checks alone {scan:.2f}s, the rest is JSON parsing)")
+
+
+def main():
+    args = sys.argv[1:2]
+    run_benchmark(int(args[0]) if args and args[0].isdigit() else 100000)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "numpy",
+# ]
+# ///
+"""
+Rank breeding pairs from enriched veteran data against a target spark profile.
+
+Each veteran becomes a vector of spark stars per target: its own sparks plus
+its parents' sparks (which become the child's grandparents, weighted by
+PARENT_SPARK_WEIGHT). A pair scores the stars it covers, capped at the target:
+
+    score(a, b) = sum(min(a + b, target))
+
+Since min(a + b, t) <= min(a, t) + min(b, t), each veteran's solo coverage
+gives an upper bound for every pair it is in. Veterans are sorted by that
+bound and whole runs of pairs that cannot reach the current top K are skipped.
+
+Usage:
+    python breeding.py <target>=<stars> [...] [--top K] [--input enriched_data.json]
+
+Targets are spark categories (speed, stamina, power, guts, wit, turf, dirt,
+sprint, mile, medium, long, front, pace, late, end, unique) or any part of a
+spark name, e.g.:
+    python breeding.py stamina=9 long=6 "groundwork=3" --top 10
+"""
+
+import heapq
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Fix Unicode output on Windows consoles
+if sys.stdout:
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+if sys.stderr:
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+# Auto-install numpy if not available
+try:
+    import numpy as np
+except ImportError:
+    print("Installing required dependency: numpy...")
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", "numpy"])
+    import numpy as np
+
+from spark_index import PARENT_POSITIONS, SPARK_CATEGORIES, normalize_spark_name, spark_stars
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
+# Parents' sparks pass down as grandparent sparks, which inherit less often
+PARENT_SPARK_WEIGHT = 0.5
+
+DEFAULT_TOP_K = 10
+
+
+def parse_targets(args: list[str]) -> dict[str, float]:
+    """Parse "name=stars" arguments into a target profile."""
+    targets = {}
+    for arg in args:
+        name, sep, stars = arg.partition("=")
+        if not sep:
+            raise ValueError(f"Target must look like name=stars: {arg}")
+        stars = float(stars)
+        if stars <= 0:
+            raise ValueError(f"Target stars must be positive: {arg}")
+        targets[normalize_spark_name(name)] = stars
+    return targets
+
+
+def _target_matcher(target: str):
+    """Predicate telling whether a spark (id, name) counts toward a target."""
+    if target in SPARK_CATEGORIES:
+        lo, hi = SPARK_CATEGORIES[target]
+        return lambda spark_id, name: lo <= spark_id <= hi
+    return lambda spark_id, name: target in name
+
+
+def _sparks(sparks: list, id_key: str):
+    """Yield (spark_id, normalized name, stars) for a spark list."""
+    for spark in sparks:
+        try:
+            spark_id = int(spark.get(id_key) or 0)
+        except (TypeError, ValueError):
+            continue
+        yield spark_id, normalize_spark_name(spark.get("spark_name_en")), spark.get("stars") or spark_stars(spark_id)
+
+
+def spark_vectors(characters: list[dict], targets: dict) -> tuple:
+    """Own and parent star matrices, shape (veterans, targets)."""
+    matchers = [_target_matcher(t) for t in targets]
+    own = np.zeros((len(characters), len(targets)), dtype=np.float32)
+    parents = np.zeros_like(own)
+
+    for row, char in enumerate(characters):
+        for spark_id, name, stars in _sparks(char.get("spark_array_enriched", []), "spark_id"):
+            for col, matches in enumerate(matchers):
+                if matches(spark_id, name):
+                    own[row, col] += stars
+        for parent in char.get("succession_chara_array", []):
+            if parent.get("position_id") not in PARENT_POSITIONS:
+                continue
+            for spark_id, name, stars in _sparks(parent.get("factor_info_array", []), "factor_id"):
+                for col, matches in enumerate(matchers):
+                    if matches(spark_id, name):
+                        parents[row, col] += stars
+    return own, parents
+
+
+def rank_pairs(vectors, target, top_k: int = DEFAULT_TOP_K) -> tuple[list, int]:
+    """Top-K pairs by capped coverage of target.
+
+    Returns ([(score, row_a, row_b), ...] best first, pairs scored).
+    """
+    n = len(vectors)
+    solo = np.minimum(vectors, target).sum(axis=1)
+    order = np.argsort(-solo, kind="stable")
+    ranked = vectors[order]
+    bounds = solo[order]
+    neg_bounds = -bounds
+    best_possible = float(target.sum())
+
+    heap = []  # min-heap of (score, a, b), the current top K
+    scored = 0
+    for i in range(n - 1):
+        threshold = heap[0][0] if len(heap) == top_k else -1.0
+        # Bounds are sorted, so no later row can pair above the threshold either
+        if bounds[i] + bounds[i + 1] <= threshold or threshold >= best_possible:
+            break
+        # Partners whose bound can still beat the threshold form a prefix
+        end = int(np.searchsorted(neg_bounds, bounds[i] - threshold, side="left"))
+        if end <= i + 1:
+            continue
+        scores = np.minimum(ranked[i] + ranked[i + 1:end], target).sum(axis=1)
+        scored += len(scores)
+        if len(scores) > top_k:
+            keep = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            keep = np.arange(len(scores))
+        for k in keep:
+            score = float(scores[k])
+            if len(heap) < top_k:
+                heapq.heappush(heap, (score, int(order[i]), int(order[i + 1 + k])))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, int(order[i]), int(order[i + 1 + k])))
+
+    return sorted(heap, key=lambda entry: (-entry[0], entry[1], entry[2])), scored
+
+
+def recommend_pairs(characters: list[dict], targets: dict, top_k: int = DEFAULT_TOP_K) -> list[dict]:
+    """Best parent pairs for a target profile, with a per-target breakdown."""
+    own, parents = spark_vectors(characters, targets)
+    vectors = own + PARENT_SPARK_WEIGHT * parents
+    target = np.array(list(targets.values()), dtype=np.float32)
+    pairs, _scored = rank_pairs(vectors, target, top_k)
+
+    results = []
+    for score, a, b in pairs:
+        breakdown = {}
+        for col, name in enumerate(targets):
+            breakdown[name] = {
+                "target": float(target[col]),
+                "first": {"own": float(own[a, col]), "parents": float(parents[a, col])},
+                "second": {"own": float(own[b, col]), "parents": float(parents[b, col])},
+                "covered": float(min(vectors[a, col] + vectors[b, col], target[col])),
+            }
+        results.append({
+            "score": score,
+            "max_score": float(target.sum()),
+            "first": a,
+            "second": b,
+            "breakdown": breakdown,
+        })
+    return results
+
+
+def label(char: dict) -> str:
+    """Short description of a veteran for console output."""
+    return f"{char.get('chara_name_en') or char.get('card_id')} (#{char.get('trained_chara_id')}, score {char.get('rank_score', 0)})"
+
+
+def main():
+    args = sys.argv[1:]
+
+    top_k = DEFAULT_TOP_K
+    input_path = SCRIPT_DIR / "enriched_data.json"
+    try:
+        if "--top" in args:
+            pos = args.index("--top")
+            top_k = int(args[pos + 1])
+            del args[pos:pos + 2]
+        if "--input" in args:
+            pos = args.index("--input")
+            input_path = Path(args[pos + 1])
+            del args[pos:pos + 2]
+        targets = parse_targets(args)
+    except (IndexError, ValueError) as e:
+        print(f"[X] Error: {e}" if str(e) else "[X] Error: missing option value")
+        return 1
+
+    if not targets or top_k < 1:
+        print("Usage:" + __doc__.split("Usage:")[1].split("\n\n")[0])
+        return 1
+
+    if not input_path.exists():
+        print(f"[X] Error: {input_path} not found. Run enrich_data.py first.")
+        return 1
+
+    with open(input_path, "r", encoding="utf-8") as f:
+        characters = json.load(f)
+
+    results = recommend_pairs(characters, targets, top_k)
+    print(f"Top {len(results)} pairs for " + ", ".join(f"{t} {s:g}*" for t, s in targets.items()))
+    for rank, result in enumerate(results, 1):
+        print(f"\n{rank}. {result['score']:g} / {result['max_score']:g}")
+        print(f"   {label(characters[result['first']])}")
+        print(f"   {label(characters[result['second']])}")
+        for name, part in result["breakdown"].items():
+            first, second = part["first"], part["second"]
+            print(f"     {name}: {part['covered']:g}/{part['target']:g}"
+                  f"  ({first['own']:g} + {first['parents']:g}p, {second['own']:g} + {second['parents']:g}p)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
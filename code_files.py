@@ -0,0 +1,19 @@
+"""
+Source files the enriched output depends on.
+
+Shared by enrich_data.py, whose build cache (build.json) is invalidated when
+any of them changes, and the launcher, which restarts its resident
+enrichment worker so it doesn't keep running the old code.
+"""
+
+ENRICH_CODE_FILES = (
+    "enrich_data.py",
+    "list_index.py",
+    "validate_localization.py",
+    # Sidecar index builders (enrich_data.SIDECAR_INDEXES) and what they use
+    "spark_index.py",
+    "search_index.py",
+    "lineage.py",
+    "dedup.py",
+    "model.py",
+)
@@ -0,0 +1,188 @@
+"""
+In-memory query index over enriched veteran data for the launcher.
+
+The launcher's /api/characters endpoint answers the viewer's list (filters,
+search, sort and one page of rows) from this index, so the browser never has
+to download the whole collection. It is built from enriched_data.json on the
+first request and rebuilt whenever the file changes:
+
+    rows       list rows (list_index.list_row) in file order
+    details    each full record as compact JSON text, sent as is
+    by_id      trained_chara_id -> row
+    sparks     spark index (spark_index.build_spark_index)
+    search     trigram search index (search_index.build_search_index)
+
+Filters take the viewer's filter model (defaultFilters in viewer.js): each
+aptitude group keeps rows graded A or better in at least one checked option,
+and the spark groups are evaluated like spark_index.evaluate_spark_filters.
+"""
+
+import json
+import threading
+from pathlib import Path
+
+from list_index import LIST_FIELDS, list_row
+from search_index import build_search_index, search
+from spark_index import build_spark_index, evaluate_spark_filters
+
+# Filter model group -> option -> aptitude field, same as passesFilters in viewer.js
+APTITUDE_FILTERS = {
+    "track": {"turf": "proper_ground_turf", "dirt": "proper_ground_dirt"},
+    "distance": {
+        "sprint": "proper_distance_short", "mile": "proper_distance_mile",
+        "medium": "proper_distance_middle", "long": "proper_distance_long",
+    },
+    "style": {
+        "front": "proper_running_style_nige", "pace": "proper_running_style_senko",
+        "late": "proper_running_style_sashi", "end": "proper_running_style_oikomi",
+    },
+}
+
+# A rank, the lowest aptitude grade that passes a filter
+GOOD_APTITUDE = 7
+
+# Fields compared as lowercase text when sorting; every other field is numeric
+TEXT_SORT_FIELDS = ("chara_name_en", "create_time")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Filtered and sorted row orders kept per collection, so paging is cheap
+RESULT_CACHE_SIZE = 16
+
+
+class CollectionError(ValueError):
+    """Raised for list queries the index can't answer (unknown sort field...)."""
+
+
+def build_collection(characters: list[dict]) -> dict:
+    """Index a list of enriched characters for list queries and detail lookups."""
+    return {
+        "row_count": len(characters),
+        "rows": [list_row(char) for char in characters],
+        "details": [json.dumps(char, ensure_ascii=False, separators=(",", ":")) for char in characters],
+        "by_id": {char["trained_chara_id"]: row for row, char in enumerate(characters) if "trained_chara_id" in char},
+        "sparks": build_spark_index(characters),
+        "search": build_search_index(characters),
+        "results": {},
+        "results_lock": threading.Lock(),
+    }
+
+
+def _passes_aptitudes(row: dict, groups: list[list[str]]) -> bool:
+    for fields in groups:
+        if not any((row.get(field) or 0) >= GOOD_APTITUDE for field in fields):
+            return False
+    return True
+
+
+def _sort_key(field: str):
+    if field in TEXT_SORT_FIELDS:
+        return lambda row: str(row.get(field) or "").lower()
+
+    def number(row):
+        value = row.get(field)
+        if isinstance(value, (int, float)):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 0
+    return number
+
+
+def filter_rows(collection: dict, filters: dict, query: str = "",
+                sort_field: str = "rank_score", sort_asc: bool = False) -> list[int]:
+    """Rows passing the filters and search query, in list order.
+
+    Mirrors filterAndSortList in viewer.js: ties keep file order in either
+    direction, and missing values sort as 0 (or "" for text fields).
+    """
+    if sort_field not in LIST_FIELDS:
+        raise CollectionError(f"Cannot sort by {sort_field!r}")
+
+    # Groups that aren't objects can't hold a setting, as if left at their defaults
+    filters = {group: value for group, value in filters.items() if isinstance(value, dict)}
+    key = json.dumps([filters, query.strip().lower(), sort_field, bool(sort_asc)], sort_keys=True)
+    results = collection["results"]
+    with collection["results_lock"]:
+        cached = results.get(key)
+    if cached is not None:
+        return cached
+
+    rows = collection["rows"]
+    candidates = range(len(rows))
+    if query.strip():
+        candidates = search(collection["search"], query)
+    spark_rows = evaluate_spark_filters(collection["sparks"], filters)
+
+    aptitude_groups = []
+    for group, options in APTITUDE_FILTERS.items():
+        checked = filters.get(group, {})
+        fields = [field for option, field in options.items() if checked.get(option)]
+        if fields:
+            aptitude_groups.append(fields)
+
+    matched = [n for n in candidates if n in spark_rows and _passes_aptitudes(rows[n], aptitude_groups)]
+    sort_key = _sort_key(sort_field)
+    matched.sort(key=lambda n: sort_key(rows[n]), reverse=not sort_asc)
+
+    with collection["results_lock"]:
+        if len(results) >= RESULT_CACHE_SIZE:
+            results.pop(next(iter(results)))
+        results[key] = matched
+    return matched
+
+
+def page_rows(collection: dict, matched: list[int], offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> list[dict]:
+    """List rows for matched[offset:offset + limit], each with its row number."""
+    limit = max(0, min(limit, MAX_PAGE_SIZE))
+    rows = collection["rows"]
+    return [{**rows[n], "row": n} for n in matched[max(offset, 0):max(offset, 0) + limit]]
+
+
+def ancestor_rows(collection: dict, row: int) -> list[dict]:
+    """List rows of a character's parents and grandparents that are in the collection."""
+    rows = collection["rows"]
+    by_id = collection["by_id"]
+    found = []
+    generation = [row]
+    for _ in range(2):
+        parents = []
+        for n in generation:
+            for field in ("succession_trained_chara_id_1", "succession_trained_chara_id_2"):
+                parent = by_id.get(rows[n].get(field))
+                if parent is not None:
+                    parents.append(parent)
+        found.extend({**rows[n], "row": n} for n in parents)
+        generation = parents
+    return found
+
+
+class CharacterCollection:
+    """enriched_data.json, indexed on first use and re-indexed when it changes."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.signature = None
+        self.collection = None
+
+    def get(self) -> dict | None:
+        """The current index, or None when the data file is missing."""
+        with self.lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                self.signature = self.collection = None
+                return None
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature != self.signature:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    characters = json.load(f)
+                if not isinstance(characters, list):
+                    raise CollectionError(f"{self.path.name} is not a list of characters")
+                self.collection = build_collection(characters)
+                self.signature = signature
+            return self.collection
@@ -0,0 +1,212 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+Near-duplicate veteran detection with MinHash and LSH banding.
+
+Veterans of the same character whose sparks, skills and parents' sparks are
+nearly identical are grouped into clusters, each with a suggested keeper (the
+highest rank_score). enrich_data.py writes the report next to the enriched
+output (duplicates.json) and the viewer's optimizer lists the clusters.
+
+Each veteran's feature set gets a MinHash signature; signatures are split into
+bands and only veterans sharing a band bucket are compared, so the work stays
+close to linear in the collection size. Candidates are confirmed by exact
+Jaccard similarity before being clustered.
+
+Report layout:
+    {
+      "version": 1,
+      "row_count": 1234,
+      "threshold": 0.8,
+      "clusters": [{"keeper": 17, "members": [[17, 1.0], [230, 0.91]]}, ...]  # [row, similarity to keeper]
+    }
+
+Usage:
+    python dedup.py [enriched_data.json] [--threshold 0.8]
+"""
+
+import hashlib
+import random
+import sys
+from pathlib import Path
+
+from model import Veteran, load_veterans
+
+# Fix Unicode output on Windows consoles
+if sys.stdout:
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+if sys.stderr:
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
+DUPLICATES_VERSION = 1
+
+# Minimum Jaccard similarity of feature sets for two veterans to be duplicates
+DEFAULT_THRESHOLD = 0.8
+
+# 16 bands of 4 rows: pairs around 0.5 similarity and above become candidates
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def feature_set(vet: Veteran) -> frozenset:
+    """Own sparks, learned skills and direct parents' sparks as tokens."""
+    tokens = set()
+    for spark in vet.sparks or ():
+        tokens.add(f"s{spark.spark_id}")
+    for skill in vet.skills or ():
+        tokens.add(f"k{skill.skill_id}")
+    for parent in vet.direct_parents():
+        for spark in parent.sparks or ():
+            tokens.add(f"p{spark.spark_id}")
+    return frozenset(tokens)
+
+
+def character_key(vet: Veteran):
+    """Which character a veteran is (costume variants of one character match)."""
+    return vet.card_id // 100 if isinstance(vet.card_id, int) else vet.chara_name_en
+
+
+class MinHasher:
+    """MinHash signatures over string tokens, caching each token's hash values."""
+
+    def __init__(self, num_hashes: int = NUM_HASHES, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME)) for _ in range(num_hashes)]
+        self.token_values = {}
+
+    def _values(self, token: str) -> tuple:
+        values = self.token_values.get(token)
+        if values is None:
+            base = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            values = self.token_values[token] = tuple((a * base + b) % MERSENNE_PRIME for a, b in self.params)
+        return values
+
+    def signature(self, tokens) -> tuple:
+        """Per-hash minimum over the tokens (empty set -> empty signature)."""
+        if not tokens:
+            return ()
+        return tuple(map(min, zip(*(self._values(t) for t in tokens))))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def build_duplicates(characters: list[dict], threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """find_duplicates for enriched records still held as dicts (enrich_data.py's duplicates.json)."""
+    return find_duplicates([Veteran.from_dict(char) for char in characters], threshold)
+
+
+def find_duplicates(veterans: list[Veteran], threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """Cluster near-duplicate veterans and pick a keeper for each cluster."""
+    hasher = MinHasher()
+    features = [feature_set(vet) for vet in veterans]
+
+    # Union-find over confirmed pairs
+    parent = list(range(len(veterans)))
+
+    def root(row: int) -> int:
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    # Exact copies join directly; only one of them goes through LSH
+    first_seen = {}
+    for row, (vet, tokens) in enumerate(zip(veterans, features)):
+        key = (character_key(vet), tokens)
+        if key in first_seen:
+            parent[row] = first_seen[key]
+        else:
+            first_seen[key] = row
+
+    # LSH: veterans sharing any band of their signature (and the character) are candidates
+    buckets = {}
+    for (chara, tokens), row in first_seen.items():
+        signature = hasher.signature(tokens)
+        if not signature:
+            continue
+        for band in range(NUM_BANDS):
+            start = band * ROWS_PER_BAND
+            key = (chara, band, signature[start:start + ROWS_PER_BAND])
+            buckets.setdefault(key, []).append(row)
+
+    rejected = set()
+    for rows in buckets.values():
+        for i, a in enumerate(rows):
+            for b in rows[i + 1:]:
+                if root(a) == root(b) or (a, b) in rejected:
+                    continue
+                if jaccard(features[a], features[b]) >= threshold:
+                    parent[root(b)] = root(a)
+                else:
+                    rejected.add((a, b))
+
+    groups = {}
+    for row in range(len(veterans)):
+        groups.setdefault(root(row), []).append(row)
+
+    clusters = []
+    for rows in groups.values():
+        if len(rows) < 2:
+            continue
+        keeper = max(rows, key=lambda r: (veterans[r].rank_score or 0, -r))
+        members = sorted(
+            ([r, round(jaccard(features[keeper], features[r]), 3)] for r in rows),
+            key=lambda m: (m[0] != keeper, -m[1], m[0]),
+        )
+        clusters.append({"keeper": keeper, "members": members})
+    clusters.sort(key=lambda c: (-len(c["members"]), c["keeper"]))
+
+    return {
+        "version": DUPLICATES_VERSION,
+        "row_count": len(veterans),
+        "threshold": threshold,
+        "clusters": clusters,
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    threshold = DEFAULT_THRESHOLD
+    if "--threshold" in args:
+        pos = args.index("--threshold")
+        try:
+            threshold = float(args[pos + 1])
+        except (IndexError, ValueError):
+            print("[X] Error: --threshold needs a number between 0 and 1")
+            return 1
+        del args[pos:pos + 2]
+
+    input_path = Path(args[0]) if args else SCRIPT_DIR / "enriched_data.json"
+    if not input_path.exists():
+        print(f"[X] Error: {input_path} not found. Run enrich_data.py first.")
+        return 1
+
+    veterans = load_veterans(input_path)
+    report = find_duplicates(veterans, threshold)
+    clusters = report["clusters"]
+    extra = sum(len(c["members"]) - 1 for c in clusters)
+    print(f"Found {len(clusters)} near-duplicate cluster(s), {extra} veteran(s) could be transferred")
+
+    for number, cluster in enumerate(clusters, 1):
+        keeper = veterans[cluster["keeper"]]
+        print(f"\n{number}. {keeper.chara_name_en or 'Unknown'}")
+        for row, similarity in cluster["members"]:
+            vet = veterans[row]
+            tag = "keep" if row == cluster["keeper"] else f"{similarity:.0%}"
+            print(f"   [{tag:>4}] #{vet.trained_chara_id}  score {vet.rank_score or 0}  {vet.create_time or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
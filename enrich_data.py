@@ -11,19 +11,47 @@ This script downloads the community Global English data from uma-tools
 and enriches the extracted veteran data with human-readable names.
 
 Usage:
-    python enrich_data.py [input.json] [output.json]
+    python enrich_data.py [input.json] [output.json] [--shards[=SIZE]] [--memory-stats] [--force]
+    python enrich_data.py --batch <input.json | directory | "glob">... [--jobs=N] [--shards[=SIZE]] [--force]
+    python enrich_data.py query "<score>" [--where "<condition>"] [--top K] [--input enriched_data.json]
     
 If no arguments provided, reads data.json and writes enriched_data.json
 
+    --shards    Also split the output into fixed-size shards plus a manifest
+                (enriched_shards/) so the viewer can load records on demand
+    --memory-stats
+                Report object counts and sizes of the enriched records, with
+                shared catalog data counted once vs. once per reference
+    --force     Rebuild even if the build cache says the output is up to date,
+                and re-check every translation source for updates
+    --batch     Enrich several exports (e.g. one per game account) with a single
+                download/parse of the translation data, files in parallel.
+                Outputs go next to each input (data.json -> enriched_data.json,
+                other.json -> other.enriched.json); a directory means its
+                data*.json files and */data.json. --jobs=N caps the workers
+    query       Rank already-enriched veterans by an expression, see query.py
+
 Data sources:
 - https://github.com/TheCing/uma-tools (umalator-global)
 """
 
+import concurrent.futures
+import contextlib
+import copy
+import glob
+import hashlib
+import importlib
+import io
 import json
+import os
 import subprocess
 import sys
+import time
+import traceback
 from pathlib import Path
 
+from code_files import ENRICH_CODE_FILES
+
 # Fix Unicode output on Windows consoles
 if sys.stdout:
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -38,6 +66,8 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", "requests"])
     import requests
 
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
 # uma-tools data URLs
 # Global version (official English names)
 SKILLNAMES_GLOBAL_URL = "https://raw.githubusercontent.com/TheCing/uma-tools/master/umalator-global/skillnames.json"
@@ -176,45 +206,125 @@ NICKNAME_NAME_CORRECTIONS = {
 # Nickname names are loaded dynamically from text_data categories 130 and 151
 
 
-def download_json(url: str, name: str) -> dict:
-    """Download JSON data from URL."""
-    print(f"Downloading {name}...")
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        print(f"  [OK] {name} ({len(data)} entries)")
-        return data
-    except requests.RequestException as e:
-        print(f"  [!] Warning: Could not download {name}: {e}")
-        return {}
-
-
-def download_all_data() -> dict:
-    """Download all translation/name data."""
-    data = {}
-    
+# Translation data: (key in the loaded data, URL, display name)
+TRANSLATION_SOURCES = [
     # Skill names - Global version (official EN names): {"skill_id": ["Skill Name"]}
-    data["skills_global"] = download_json(SKILLNAMES_GLOBAL_URL, "skillnames.json (global)")
-    
+    ("skills_global", SKILLNAMES_GLOBAL_URL, "skillnames.json (global)"),
     # Skill names - JP version (more complete, with EN translations): {"skill_id": ["JP", "EN"]}
-    data["skills_jp"] = download_json(SKILLNAMES_JP_URL, "skillnames.json (jp)")
-    
+    ("skills_jp", SKILLNAMES_JP_URL, "skillnames.json (jp)"),
     # Skill data - conditions, effects, durations
-    data["skill_data"] = download_json(SKILL_DATA_URL, "skill_data.json")
-    
+    ("skill_data", SKILL_DATA_URL, "skill_data.json"),
     # Uma data (Global version - limited but accurate)
-    data["umas_global"] = download_json(UMAS_GLOBAL_URL, "umas.json (global)")
-    
+    ("umas_global", UMAS_GLOBAL_URL, "umas.json (global)"),
     # Uma data (full - has all characters but JP outfits)
-    data["umas_full"] = download_json(UMAS_FULL_URL, "umas.json (full)")
-    
+    ("umas_full", UMAS_FULL_URL, "umas.json (full)"),
     # UmaTL text data (for support cards, spark names, and other text)
-    data["text_data"] = download_json(TEXT_DATA_URL, "text_data_dict.json")
-    
+    ("text_data", TEXT_DATA_URL, "text_data_dict.json"),
+]
+
+# Downloaded translation data is kept here and re-checked with a conditional
+# request (ETag) once the copy is older than SOURCE_MAX_AGE seconds
+SOURCE_CACHE_DIR = SCRIPT_DIR / "translation_cache"
+SOURCE_MAX_AGE = 6 * 60 * 60
+
+
+def update_source(key: str, url: str, name: str, force: bool = False,
+                  offline: bool = False) -> tuple[str | None, dict | None]:
+    """Bring translation_cache/<key>.json up to date.
+
+    Returns (sha256 of the content, parsed data if it was just downloaded);
+    the hash is None when no copy could be obtained. With offline set the
+    cached copy is reported as is, without any request.
+    """
+    body_path = SOURCE_CACHE_DIR / f"{key}.json"
+    meta_path = SOURCE_CACHE_DIR / f"{key}.meta.json"
+    meta = {}
+    if body_path.exists() and meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+    if meta and (offline or not force and time.time() - meta.get("checked", 0) < SOURCE_MAX_AGE):
+        return meta["sha256"], None
+    if offline:
+        return None, None
+
+    print(f"Downloading {name}...")
+    headers = {"If-None-Match": meta["etag"]} if meta.get("etag") else {}
+    parsed = None
+    try:
+        response = requests.get(url, timeout=30, headers=headers)
+        if response.status_code == 304:
+            print(f"  [OK] {name} (unchanged)")
+        else:
+            response.raise_for_status()
+            body = response.content
+            parsed = json.loads(body)
+            meta = {"etag": response.headers.get("ETag"), "sha256": hashlib.sha256(body).hexdigest()}
+            print(f"  [OK] {name} ({len(parsed)} entries)")
+    except (requests.RequestException, ValueError) as e:
+        if meta:
+            print(f"  [!] Warning: Could not check {name}, using cached copy: {e}")
+            return meta["sha256"], None
+        print(f"  [!] Warning: Could not download {name}: {e}")
+        return None, None
+
+    meta["checked"] = time.time()
+    try:
+        SOURCE_CACHE_DIR.mkdir(exist_ok=True)
+        if parsed is not None:
+            body_path.write_bytes(body)
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    except OSError as e:
+        print(f"  [!] Warning: Could not cache {name}: {e}")
+    return meta["sha256"], parsed
+
+
+def update_sources(force: bool = False, offline: bool = False) -> dict:
+    """Check every translation source: {key: (sha256, parsed data or None)}."""
+    return {key: update_source(key, url, name, force, offline) for key, url, name in TRANSLATION_SOURCES}
+
+
+def load_sources(updated: dict) -> dict:
+    """Translation data for enrichment, from fresh downloads or the local cache."""
+    data = {}
+    for key, _url, name in TRANSLATION_SOURCES:
+        sha, parsed = updated.get(key, (None, None))
+        if parsed is None and sha is not None:
+            try:
+                with open(SOURCE_CACHE_DIR / f"{key}.json", "r", encoding="utf-8") as f:
+                    parsed = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  [!] Warning: Could not read cached {name}: {e}")
+        data[key] = parsed if parsed is not None else {}
     return data
 
 
+def download_all_data(force: bool = False) -> dict:
+    """Download (or reuse cached) translation/name data."""
+    return load_sources(update_sources(force))
+
+
+class TranslationTables:
+    """Translation data kept loaded between runs (the launcher's resident worker).
+
+    Reloaded only when a source's content hash changes.
+    """
+
+    def __init__(self):
+        self.hashes = None
+        self.data = None
+
+    def get(self, sources: dict) -> dict:
+        hashes = {key: sha for key, (sha, _parsed) in sources.items()}
+        if self.data is None or hashes != self.hashes:
+            self.data = load_sources(sources)
+            self.hashes = hashes
+        else:
+            print("[OK] Using translation tables already in memory")
+        return self.data
+
+
 def parse_condition(condition: str) -> str:
     """Parse a skill condition string into human-readable format."""
     if not condition:
@@ -690,19 +800,59 @@ def get_chara_info(data: dict, card_id: int) -> dict:
     return result
 
 
+class FrozenDict(dict):
+    """Read-only dict for catalog data shared by many records."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("shared catalog data is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value):
+    """Intern strings and turn dicts/lists into read-only shared objects."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return FrozenDict({freeze(k): freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def cached_lookup(data: dict, table: str, key, lookup):
+    """Memoized catalog lookup: every record asking for the same ID gets the
+    same frozen result instead of its own copy of names, effects and summaries.
+
+    With data["share_lookups"] set to False every call looks up afresh, as
+    enrichment did before sharing; used to measure what sharing saves.
+    """
+    if not data.get("share_lookups", True):
+        return lookup(data, key)
+    cache = data.setdefault("lookup_cache", {}).setdefault(table, {})
+    try:
+        return cache[key]
+    except KeyError:
+        value = cache[key] = freeze(lookup(data, key))
+        return value
+
+
 def enrich_character(char: dict, data: dict) -> dict:
     """Add English names to a single character entry."""
     
     # Card/character info
     card_id = char.get("card_id")
     if card_id:
-        info = get_chara_info(data, card_id)
+        info = cached_lookup(data, "chara", card_id, get_chara_info)
         char.update(info)
     
     # Race cloth/outfit name
     race_cloth_id = char.get("race_cloth_id")
     if race_cloth_id:
-        cloth_name = get_race_cloth_name(data, race_cloth_id)
+        cloth_name = cached_lookup(data, "race_cloth", race_cloth_id, get_race_cloth_name)
         if cloth_name:
             char["race_cloth_name_en"] = cloth_name
     
@@ -711,17 +861,17 @@ def enrich_character(char: dict, data: dict) -> dict:
     for skill in skill_array:
         skill_id = skill.get("skill_id")
         if skill_id:
-            skill_name = get_skill_name(data, skill_id)
+            skill_name = cached_lookup(data, "skill_name", skill_id, get_skill_name)
             if skill_name:
                 skill["skill_name_en"] = skill_name
             
             # Add skill details (condition, effects, duration)
-            skill_details = get_skill_details(data, skill_id)
+            skill_details = cached_lookup(data, "skill_details", skill_id, get_skill_details)
             if skill_details:
                 skill["rarity"] = skill_details.get("rarity")
                 skill["skill_type"] = skill_details.get("skill_type")
                 skill["condition"] = skill_details.get("condition_readable")
-                skill["effects"] = skill_details.get("effects", [])
+                skill["effects"] = skill_details.get("effects", ())
                 skill["duration"] = skill_details.get("duration_per_1000m")
                 skill["summary"] = skill_details.get("summary")
     
@@ -730,7 +880,7 @@ def enrich_character(char: dict, data: dict) -> dict:
     enriched_sparks = []
     for spark_id in factor_id_array:
         spark_entry = {"spark_id": spark_id}
-        spark_name = get_spark_name(data, spark_id)
+        spark_name = cached_lookup(data, "spark_name", spark_id, get_spark_name)
         if spark_name:
             spark_entry["spark_name_en"] = spark_name
         # Extract star level from last 2 digits of spark_id
@@ -746,7 +896,7 @@ def enrich_character(char: dict, data: dict) -> dict:
     for factor_info in factor_info_array:
         spark_id = factor_info.get("factor_id")
         if spark_id:
-            spark_name = get_spark_name(data, spark_id)
+            spark_name = cached_lookup(data, "spark_name", spark_id, get_spark_name)
             if spark_name:
                 factor_info["spark_name_en"] = spark_name
     
@@ -756,7 +906,7 @@ def enrich_character(char: dict, data: dict) -> dict:
         enriched_wins = []
         for saddle_id in win_saddle_array:
             win_entry = {"saddle_id": saddle_id}
-            race_name = get_race_title_name(data, saddle_id)
+            race_name = cached_lookup(data, "race_title", saddle_id, get_race_title_name)
             if race_name:
                 win_entry["race_name_en"] = race_name
             enriched_wins.append(win_entry)
@@ -768,7 +918,7 @@ def enrich_character(char: dict, data: dict) -> dict:
         enriched_nicknames = []
         for nickname_id in nickname_array:
             nick_entry = {"nickname_id": nickname_id}
-            nick_name = get_nickname_name(data, nickname_id)
+            nick_name = cached_lookup(data, "nickname", nickname_id, get_nickname_name)
             if nick_name:
                 nick_entry["nickname_name_en"] = nick_name
             enriched_nicknames.append(nick_entry)
@@ -779,7 +929,7 @@ def enrich_character(char: dict, data: dict) -> dict:
     for support in support_list:
         support_id = support.get("support_card_id")
         if support_id:
-            support_info = get_support_card_info(data, support_id)
+            support_info = cached_lookup(data, "support_card", support_id, get_support_card_info)
             support.update(support_info)
     
     # Enrich succession (parent) characters
@@ -787,7 +937,7 @@ def enrich_character(char: dict, data: dict) -> dict:
     for parent in succession_array:
         parent_card_id = parent.get("card_id")
         if parent_card_id:
-            info = get_chara_info(data, parent_card_id)
+            info = cached_lookup(data, "chara", parent_card_id, get_chara_info)
             parent.update(info)
             
             # Enrich parent's sparks with names and star levels
@@ -795,7 +945,7 @@ def enrich_character(char: dict, data: dict) -> dict:
             for spark in parent_sparks:
                 spark_id = spark.get("factor_id")
                 if spark_id:
-                    spark_name = get_spark_name(data, spark_id)
+                    spark_name = cached_lookup(data, "spark_name", spark_id, get_spark_name)
                     if spark_name:
                         spark["spark_name_en"] = spark_name
                     # Extract star level from last 2 digits
@@ -806,18 +956,349 @@ def enrich_character(char: dict, data: dict) -> dict:
     return char
 
 
-def enrich_data(input_path: Path, output_path: Path):
-    """Main function to enrich the data file."""
-    
+def sidecar_path(output_path: Path, name: str) -> Path:
+    """Path of an index file written alongside the enriched output.
+
+    The default enriched_data.json gets plain names (spark_index.json, ...)
+    that the viewer fetches directly; other outputs are prefixed with their
+    stem so several enriched files can share a directory.
+    """
+    if output_path.stem == "enriched_data":
+        return output_path.parent / name
+    return output_path.parent / f"{output_path.stem}.{name}"
+
+
+def write_json_compact(path: Path, obj) -> None:
+    """Write machine-read JSON without indentation."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+
+
+# Index files written next to the enriched output: (filename, module, builder)
+SIDECAR_INDEXES = [
+    ("spark_index.json", "spark_index", "build_spark_index"),
+    ("search_index.json", "search_index", "build_search_index"),
+    ("lineage.json", "lineage", "build_lineage_graph"),
+    ("duplicates.json", "dedup", "build_duplicates"),
+]
+
+
+def write_sidecar_indexes(characters: list, output_path: Path):
+    """Build and save the index files derived from the enriched characters."""
+    for filename, module_name, builder_name in SIDECAR_INDEXES:
+        try:
+            builder = getattr(importlib.import_module(module_name), builder_name)
+        except ImportError:
+            print(f"[!] {module_name}.py not found, skipping {filename}")
+            continue
+
+        index_path = sidecar_path(output_path, filename)
+        try:
+            write_json_compact(index_path, builder(characters))
+            print(f"[OK] Saved {filename} to {index_path}")
+        except PermissionError:
+            print(f"[!] Warning: Permission denied writing to {index_path}")
+
+
+def content_hash(characters: list) -> str:
+    """SHA-256 of the enriched records as compact JSON, one per line.
+
+    Stamped into list_index.json and the shard manifest so the viewer can
+    tell whether both describe the same data.
+    """
+    digest = hashlib.sha256()
+    for char in characters:
+        digest.update(json.dumps(char, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def write_list_index(characters: list, output_path: Path, data_hash: str | None = None):
+    """Write list_index.json plus one detail file per character.
+
+    The viewer lists characters from the compact rows and fetches
+    details/<trained_chara_id>.json when one is selected.
+    """
+    try:
+        from list_index import build_list_index
+    except ImportError:
+        print("[!] list_index.py not found, skipping list_index.json")
+        return
+
+    detail_dir = sidecar_path(output_path, "details")
+    detail_dir.mkdir(exist_ok=True)
+    index_path = sidecar_path(output_path, "list_index.json")
+    previous = previous_detail_hashes(index_path)
+    detail_hashes = {}
+    written = 0
+    for char in characters:
+        chara_id = char.get("trained_chara_id")
+        if not chara_id:
+            continue
+        payload = json.dumps(char, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        # Short content hash so the viewer's cached copy is refreshed when it changes
+        detail_hash = detail_hashes[chara_id] = hashlib.sha256(payload).hexdigest()[:12]
+        # Unchanged files are left alone, keeping their mtime (and the launcher's ETag)
+        detail_path = detail_dir / f"{chara_id}.json"
+        if previous.get(chara_id) == detail_hash:
+            try:
+                if detail_path.stat().st_size == len(payload):
+                    continue
+            except OSError:
+                pass
+        detail_path.write_bytes(payload)
+        written += 1
+
+    # Drop detail files of veterans no longer in the export
+    current = {str(chara_id) for chara_id in detail_hashes}
+    for old_detail in detail_dir.glob("*.json"):
+        if old_detail.stem not in current:
+            old_detail.unlink()
+
+    write_json_compact(index_path, build_list_index(characters, detail_hashes, data_hash))
+    print(f"[OK] Saved list_index.json to {index_path} "
+          f"({len(detail_hashes)} detail files in {detail_dir}, {written} written)")
+
+
+def previous_detail_hashes(index_path: Path) -> dict:
+    """trained_chara_id -> detail_hash from an existing list_index.json, {} if unreadable."""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            rows = json.load(f)["rows"]
+        return {row.get("trained_chara_id"): row.get("detail_hash") for row in rows}
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+# Characters per shard when --shards is given without a size
+DEFAULT_SHARD_SIZE = 500
+
+
+def write_shards(characters: list, output_path: Path, shard_size: int, data_hash: str | None = None):
+    """Split the enriched characters into shard files plus a manifest.
+
+    The manifest lists the row range, size and SHA-256 of every shard along
+    with each row's trained_chara_id, so the viewer can draw the list and
+    resolve lineage before any shard has loaded. Its content_hash matches
+    list_index.json's when both were written from the same data.
+    """
+    shard_dir = sidecar_path(output_path, "enriched_shards")
+    shard_dir.mkdir(exist_ok=True)
+    for old_shard in shard_dir.glob("shard_*.json"):
+        old_shard.unlink()
+
+    shards = []
+    for number, start in enumerate(range(0, len(characters), shard_size)):
+        chunk = characters[start:start + shard_size]
+        payload = json.dumps(chunk, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        filename = f"shard_{number:04d}.json"
+        (shard_dir / filename).write_bytes(payload)
+        shards.append({
+            "file": filename,
+            "start": start,
+            "end": start + len(chunk),
+            "bytes": len(payload),
+            "sha256": hashlib.sha256(payload).hexdigest(),
+        })
+
+    write_json_compact(shard_dir / "manifest.json", {
+        "version": 1,
+        "row_count": len(characters),
+        "shard_size": shard_size,
+        "content_hash": data_hash,
+        "shards": shards,
+        "ids": [c.get("trained_chara_id") for c in characters],
+    })
+    print(f"[OK] Saved {len(shards)} shard(s) of up to {shard_size} characters to {shard_dir}")
+
+
+def remove_shards(output_path: Path):
+    """Delete shards from an earlier --shards run so the viewer can't load stale records."""
+    shard_dir = sidecar_path(output_path, "enriched_shards")
+    manifest_path = shard_dir / "manifest.json"
+    if not manifest_path.exists():
+        return
+    manifest_path.unlink()
+    for old_shard in shard_dir.glob("shard_*.json"):
+        old_shard.unlink()
+    print(f"[OK] Removed stale shards from {shard_dir}")
+
+
+def memory_stats(obj) -> dict:
+    """Distinct object count and sys.getsizeof total for a nested JSON-like value.
+
+    An object referenced from many places is counted once, as it is stored.
+    """
+    seen = set()
+    stats = {"objects": 0, "bytes": 0}
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        stats["objects"] += 1
+        stats["bytes"] += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return stats
+
+
+def enrich_unshared(characters: list, data: dict) -> list:
+    """Enrich a copy of raw characters with lookup sharing off, for comparison."""
+    unshared = copy.deepcopy(characters)
+    unshared_data = {**data, "share_lookups": False}
+    for char in unshared:
+        enrich_character(char, unshared_data)
+    return unshared
+
+
+def print_memory_stats(characters: list, unshared: list):
+    """Print memory_stats for the enriched records and for the same records enriched without sharing."""
+    mb = 1024 * 1024
+    print("\nMemory (sys.getsizeof totals):")
+    for label, records in (("Without sharing", unshared), ("With sharing", characters)):
+        stats = memory_stats(records)
+        print(f"  {label + ':':<16} {stats['objects']:>10,} objects  {stats['bytes'] / mb:8.1f} MB")
+
+
+# Bump to invalidate every build.json written by older versions
+BUILD_CACHE_VERSION = 2
+
+
+def code_version() -> str:
+    """Hash of the enrichment code, so editing it invalidates the build cache."""
+    digest = hashlib.sha256()
+    for name in ENRICH_CODE_FILES:
+        path = SCRIPT_DIR / name
+        if path.exists():
+            digest.update(name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def input_key(input_bytes: bytes, shard_size: int | None) -> str:
+    """Content hash of the local build inputs: the export, the code and the shard size."""
+    parts = {
+        "version": BUILD_CACHE_VERSION,
+        "input": hashlib.sha256(input_bytes).hexdigest(),
+        "code": code_version(),
+        "shard_size": shard_size,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def build_key(local_key: str, sources: dict) -> str:
+    """Content hash of everything the enriched output depends on."""
+    parts = {
+        "input": local_key,
+        "sources": {key: sha for key, (sha, _parsed) in sorted(sources.items())},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def read_build_stamp(output_path: Path) -> dict | None:
+    """Build stamp ({"input": ..., "key": ...}) stored with an existing output, if any."""
+    stamp_path = sidecar_path(output_path, "build.json")
+    if not output_path.exists() or not stamp_path.exists():
+        return None
+    try:
+        with open(stamp_path, "r", encoding="utf-8") as f:
+            stamp = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(stamp, dict) or stamp.get("version") != BUILD_CACHE_VERSION:
+        return None
+    return stamp
+
+
+def write_build_stamp(output_path: Path, stamp: dict):
+    try:
+        write_json_compact(sidecar_path(output_path, "build.json"), {"version": BUILD_CACHE_VERSION, **stamp})
+    except PermissionError:
+        print(f"[!] Warning: Permission denied writing build cache next to {output_path}")
+
+
+def build_outputs_exist(output_path: Path, shard_size: int | None) -> bool:
+    """Whether the output and every sidecar a build writes for it are still on disk."""
+    paths = [output_path]
+    paths += [sidecar_path(output_path, filename) for filename, module_name, _ in SIDECAR_INDEXES
+              if (SCRIPT_DIR / f"{module_name}.py").exists()]
+    if (SCRIPT_DIR / "list_index.py").exists():
+        paths += [sidecar_path(output_path, "list_index.json"), sidecar_path(output_path, "details")]
+    if not all(path.exists() for path in paths):
+        return False
+    if shard_size is None:
+        return True
+
+    shard_dir = sidecar_path(output_path, "enriched_shards")
+    try:
+        with open(shard_dir / "manifest.json", "r", encoding="utf-8") as f:
+            shards = json.load(f)["shards"]
+        return all((shard_dir / shard["file"]).exists() for shard in shards)
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+def build_cache_hit(output_path: Path, local_key: str, shard_size: int | None) -> bool:
+    """Whether output_path was built from these local inputs and the cached translation data.
+
+    Checked before the translation sources are revalidated, so an unchanged
+    build never waits on the network; sources are refreshed only once a
+    rebuild is needed anyway.
+    """
+    stamp = read_build_stamp(output_path)
+    if not stamp or stamp.get("input") != local_key or not build_outputs_exist(output_path, shard_size):
+        return False
+    return build_key(local_key, update_sources(offline=True)) == stamp.get("key")
+
+
+def enrich_data(input_path: Path, output_path: Path, shard_size: int | None = None, show_memory: bool = False,
+                force: bool = False, tables: TranslationTables | None = None):
+    """Main function to enrich the data file.
+
+    Skips all work when the input, translation data and code are unchanged
+    since the last build of output_path, unless force is set.
+    """
+    started = time.perf_counter()
+
     # Load input data
     print(f"Loading {input_path}...")
     try:
-        with open(input_path, "r", encoding="utf-8") as f:
-            characters = json.load(f)
+        input_bytes = input_path.read_bytes()
     except FileNotFoundError:
         print(f"[X] Error: {input_path} not found")
         sys.exit(1)
-    except json.JSONDecodeError as e:
+
+    local_key = input_key(input_bytes, shard_size)
+    if not force and not show_memory and build_cache_hit(output_path, local_key, shard_size):
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"[OK] {output_path} is up to date (build cache hit, {elapsed:.0f} ms)")
+        return
+
+    # Check translation data (downloads only when the local copy is stale)
+    sources = update_sources(force)
+    stamp = {"input": local_key, "key": build_key(local_key, sources)}
+
+    characters = parse_characters(input_bytes, input_path)
+    
+    # Load translation data
+    data = tables.get(sources) if tables else load_sources(sources)
+    
+    if not has_translation_data(data):
+        print("\n[!] No translation data available, output will have IDs only")
+
+    build_output(characters, data, output_path, stamp, shard_size=shard_size, show_memory=show_memory)
+
+
+def parse_characters(input_bytes: bytes, input_path: Path) -> list:
+    """Parse an input file's contents into the character list."""
+    try:
+        characters = json.loads(input_bytes)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         print(f"[X] Error: Invalid JSON in {input_path}: {e}")
         sys.exit(1)
     
@@ -826,17 +1307,22 @@ def enrich_data(input_path: Path, output_path: Path):
         sys.exit(1)
     
     print(f"[OK] Loaded {len(characters)} characters\n")
-    
-    # Download translation data
-    data = download_all_data()
-    
-    if not data.get("skills_global") and not data.get("skills_jp") and not data.get("umas_global"):
-        print("\n[!] No translation data available, output will have IDs only")
-    
+    return characters
+
+
+def has_translation_data(data: dict) -> bool:
+    return bool(data.get("skills_global") or data.get("skills_jp") or data.get("umas_global"))
+
+
+def build_output(characters: list, data: dict, output_path: Path, stamp: dict, shard_size: int | None = None,
+                 show_memory: bool = False):
+    """Enrich parsed characters and write the output, its indexes and its build stamp."""
     # Enrich each character
     print("\nEnriching character data...")
     enriched_count = 0
     skill_enriched = 0
+    # Enriched separately first, from the raw records
+    unshared = enrich_unshared(characters, data) if show_memory else None
     
     for char in characters:
         before_keys = set(char.keys())
@@ -850,6 +1336,10 @@ def enrich_data(input_path: Path, output_path: Path):
     print(f"  [OK] {enriched_count}/{len(characters)} characters with name data")
     print(f"  [OK] {skill_enriched}/{len(characters)} characters with skill names")
     
+    if show_memory:
+        print_memory_stats(characters, unshared)
+        unshared = None
+    
     # Save output
     print(f"\nSaving to {output_path}...")
     try:
@@ -859,9 +1349,22 @@ def enrich_data(input_path: Path, output_path: Path):
     except PermissionError:
         print(f"[X] Error: Permission denied writing to {output_path}")
         sys.exit(1)
-    
+
+    # Write index files used by the viewer and launcher
+    write_sidecar_indexes(characters, output_path)
+
+    data_hash = content_hash(characters)
+    try:
+        write_list_index(characters, output_path, data_hash)
+        if shard_size:
+            write_shards(characters, output_path, shard_size, data_hash)
+        else:
+            remove_shards(output_path)
+    except PermissionError:
+        print(f"[!] Warning: Permission denied writing index files next to {output_path}")
+
     # Show sample (with safe encoding for Windows console)
-    if characters and (data.get("skills_global") or data.get("skills_jp") or data.get("umas_global")):
+    if characters and has_translation_data(data):
         sample = characters[0]
         
         def safe_print(text: str):
@@ -886,14 +1389,23 @@ def enrich_data(input_path: Path, output_path: Path):
     
     print(f"\n[SUCCESS] Done!")
     
-    # Run localization validator
+    run_validator(characters, output_path, data_hash)
+
+    # Only a complete build may be reused
+    write_build_stamp(output_path, stamp)
+
+
+def run_validator(characters: list, output_path: Path, data_hash: str | None = None):
+    """Run the localization validator on the enriched records and summarize its findings."""
     print("\n" + "=" * 50)
     print("Running localization check...")
     print("=" * 50 + "\n")
     
     try:
-        from validate_localization import check_enriched_data, print_terminology_reference
-        issues = check_enriched_data()
+        from validate_localization import check_characters, print_terminology_reference
+        # Checked in memory, the output just written is not read back; its
+        # validation cache is updated for later validate_localization.py runs
+        issues = check_characters(characters, output_path.name, output_path, data_hash)
         if issues:
             print(f"[!] Found {len(issues)} localization issue(s) from upstream data:\n")
             for issue in issues[:5]:  # Show first 5
@@ -910,13 +1422,300 @@ def enrich_data(input_path: Path, output_path: Path):
         print(f"[!] Localization check failed: {e}")
 
 
-def main():
+def batch_inputs(patterns: list[str]) -> list[Path]:
+    """Expand files, globs and directories into the list of exports to enrich.
+
+    A directory contributes its data*.json files and the data.json of each
+    subdirectory (one folder per account). Outputs and their sidecars
+    (name.enriched.json, name.enriched.list_index.json, ...) are left out.
+    """
+    inputs = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = [p for p in sorted(path.glob("data*.json")) if len(p.suffixes) == 1]
+            matches += sorted(path.glob("*/data.json"))
+        elif path.exists():
+            matches = [path]
+        else:
+            matches = [Path(p) for p in sorted(glob.glob(pattern, recursive=True))]
+        if not matches:
+            print(f"[!] Warning: No input files match {pattern}")
+        inputs.extend(matches)
+    return list(dict.fromkeys(p.resolve() for p in inputs))
+
+
+def batch_output_path(input_path: Path) -> Path:
+    """data.json -> enriched_data.json, anything else -> <stem>.enriched.json alongside."""
+    if input_path.name == "data.json":
+        return input_path.parent / "enriched_data.json"
+    return input_path.with_name(f"{input_path.stem}.enriched.json")
+
+
+# Translation tables of a batch worker process, set once by _init_batch_worker
+_batch_data = None
+
+
+def _init_batch_worker(data: dict):
+    global _batch_data
+    _batch_data = data
+    # Imported up front: these modules reconfigure sys.stdout on import,
+    # which fails while a file's output is being captured
+    for module_name in [module for _, module, _ in SIDECAR_INDEXES] + ["validate_localization"]:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+
+def _enrich_batch_file(input_path: Path, output_path: Path, stamp: dict, shard_size: int | None,
+                       show_memory: bool) -> tuple[bool, int, float, str]:
+    """Enrich one file of a batch: (succeeded, characters, seconds, captured output)."""
+    started = time.perf_counter()
+    log = io.StringIO()
+    count = 0
+    with contextlib.redirect_stdout(log):
+        try:
+            characters = parse_characters(input_path.read_bytes(), input_path)
+            count = len(characters)
+            build_output(characters, _batch_data, output_path, stamp, shard_size=shard_size,
+                         show_memory=show_memory)
+            ok = True
+        except SystemExit:
+            ok = False
+        except Exception as e:
+            print(f"[X] Error: {e}")
+            ok = False
+    return ok, count, time.perf_counter() - started, log.getvalue()
+
+
+def enrich_batch(patterns: list[str], shard_size: int | None = None, show_memory: bool = False,
+                 force: bool = False, jobs: int | None = None, tables: TranslationTables | None = None):
+    """Enrich many exports with one loaded set of translation tables, files in parallel."""
+    started = time.perf_counter()
+    inputs = batch_inputs(patterns)
+    if not inputs:
+        print("[X] Error: No input files to enrich")
+        sys.exit(1)
+    print(f"Batch: {len(inputs)} input file(s)\n")
+
+    # Unchanged outputs are skipped before any source is checked or table is loaded
+    results = {}
+    stale = []
+    for input_path in inputs:
+        output_path = batch_output_path(input_path)
+        try:
+            input_bytes = input_path.read_bytes()
+        except OSError as e:
+            results[input_path] = ("failed", 0, 0.0, f"[X] Error: Could not read {input_path}: {e}\n")
+            continue
+        local_key = input_key(input_bytes, shard_size)
+        if not force and not show_memory and build_cache_hit(output_path, local_key, shard_size):
+            results[input_path] = ("cached", None, 0.0, "")
+        else:
+            stale.append((input_path, output_path, local_key))
+
+    pending = []
+    if stale:
+        sources = update_sources(force)
+        pending = [(input_path, output_path, {"input": local_key, "key": build_key(local_key, sources)})
+                   for input_path, output_path, local_key in stale]
+
+    if pending:
+        load_started = time.perf_counter()
+        data = tables.get(sources) if tables else load_sources(sources)
+        if not has_translation_data(data):
+            print("[!] No translation data available, outputs will have IDs only")
+        print(f"[OK] Translation tables loaded in {time.perf_counter() - load_started:.2f}s")
+
+        def report(input_path, result):
+            ok, count, seconds, log = result
+            print(f"--- {input_path} ---")
+            print(log.rstrip() + "\n")
+            results[input_path] = ("built" if ok else "failed", count, seconds, "")
+
+        jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+        print(f"Enriching {len(pending)} file(s) with {jobs} worker(s)...\n")
+        if jobs == 1:
+            _init_batch_worker(data)
+            for input_path, output_path, stamp in pending:
+                report(input_path, _enrich_batch_file(input_path, output_path, stamp, shard_size, show_memory))
+        else:
+            # Workers receive the tables once, at startup, instead of downloading and parsing their own
+            with concurrent.futures.ProcessPoolExecutor(jobs, initializer=_init_batch_worker, initargs=(data,)) as pool:
+                futures = {
+                    pool.submit(_enrich_batch_file, input_path, output_path, stamp, shard_size, show_memory): input_path
+                    for input_path, output_path, stamp in pending
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    report(futures[future], future.result())
+
+    print("=" * 50)
+    print(f"Batch summary ({time.perf_counter() - started:.2f}s total)")
+    print("=" * 50)
+    for input_path in inputs:
+        status, count, seconds, message = results[input_path]
+        if message:
+            print(message.rstrip())
+        mark = "[X]" if status == "failed" else "[OK]"
+        detail = "up to date" if status == "cached" else f"{count} characters"
+        print(f"  {mark} {input_path} -> {batch_output_path(input_path).name}  {detail}  {seconds:.2f}s")
+
+    failed = sum(1 for status, *_ in results.values() if status == "failed")
+    if failed:
+        print(f"\n[X] {failed} of {len(inputs)} file(s) failed")
+        sys.exit(1)
+    built = sum(1 for status, *_ in results.values() if status == "built")
+    cached = sum(1 for status, *_ in results.values() if status == "cached")
+    print(f"\n[SUCCESS] {built} file(s) enriched, {cached} up to date")
+
+
+def query_command(args: list[str]):
+    """Run `enrich_data.py query ...` against an enriched output file."""
+    try:
+        from query import DEFAULT_TOP_K, Query, QueryError, run_query
+    except ImportError:
+        print("[X] Error: query.py not found next to enrich_data.py")
+        sys.exit(1)
+
+    expression = None
+    where = None
+    top_k = DEFAULT_TOP_K
+    data_path = Path("enriched_data.json")
+    try:
+        while args:
+            arg = args.pop(0)
+            if arg == "--where":
+                where = args.pop(0)
+            elif arg == "--top":
+                top_k = int(args.pop(0))
+            elif arg == "--input":
+                data_path = Path(args.pop(0))
+            elif expression is None:
+                expression = arg
+            else:
+                raise ValueError(f"Unexpected argument: {arg}")
+        if expression is None or top_k < 1:
+            raise ValueError("Usage: python enrich_data.py query \"<score>\" [--where \"<condition>\"] [--top K] [--input enriched_data.json]")
+        query = Query(expression, where)
+    except IndexError:
+        print("[X] Error: Missing value after option")
+        sys.exit(1)
+    except (ValueError, QueryError) as e:
+        print(f"[X] Error: {e}")
+        sys.exit(1)
+
+    try:
+        results, source = run_query(
+            query, data_path, top_k,
+            list_index_path=sidecar_path(data_path, "list_index.json"),
+            spark_index_path=sidecar_path(data_path, "spark_index.json"),
+        )
+    except FileNotFoundError:
+        print(f"[X] Error: {data_path} not found. Run enrich_data.py first.")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"[X] Error: {e}")
+        sys.exit(1)
+
+    print(f"Top {len(results)} by {expression}" + (f" where {where}" if where else "") + f" ({source})")
+    for rank, (score, info) in enumerate(results, 1):
+        name = info["chara_name_en"] or "Unknown"
+        if info["card_name_en"]:
+            name += f" [{info['card_name_en']}]"
+        print(f"{rank:>3}. {score:g}  {name} (#{info['trained_chara_id']}, score {info['rank_score']})")
+
+
+# Printed by --worker after each job, followed by the job's exit code
+WORKER_DONE = "\x1e[enrich-worker-done]"
+
+
+def run_worker():
+    """Resident worker for the launcher: load the tables once, then run jobs.
+
+    Each stdin line is a JSON list of enrich_data.py arguments; the job's
+    output is followed by a WORKER_DONE line with its exit code.
+    """
+    sys.stdout.reconfigure(line_buffering=True)
+    tables = TranslationTables()
+    print("Loading translation data...")
+    tables.get(update_sources())
+    print("[OK] Enrichment worker ready")
+    print(f"{WORKER_DONE} 0")
+
+    for line in sys.stdin:
+        try:
+            argv = json.loads(line)
+        except ValueError:
+            continue
+        code = 0
+        try:
+            main(argv, tables)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc(file=sys.stdout)
+            code = 1
+        print(f"{WORKER_DONE} {code}")
+
+
+def main(argv: list[str] | None = None, tables: TranslationTables | None = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["query"]:
+        query_command(argv[1:])
+        return
+    if argv[:1] == ["--worker"]:
+        run_worker()
+        return
+
+    # Parse options
+    args = []
+    shard_size = None
+    show_memory = False
+    force = False
+    batch = False
+    jobs = None
+    for arg in argv:
+        if arg == "--memory-stats":
+            show_memory = True
+        elif arg == "--force":
+            force = True
+        elif arg == "--batch":
+            batch = True
+        elif arg.startswith("--jobs="):
+            try:
+                jobs = int(arg.split("=", 1)[1])
+            except ValueError:
+                jobs = 0
+            if jobs <= 0:
+                print(f"[X] Error: Invalid job count in {arg}")
+                sys.exit(1)
+        elif arg == "--shards":
+            shard_size = DEFAULT_SHARD_SIZE
+        elif arg.startswith("--shards="):
+            try:
+                shard_size = int(arg.split("=", 1)[1])
+            except ValueError:
+                shard_size = 0
+            if shard_size <= 0:
+                print(f"[X] Error: Invalid shard size in {arg}")
+                sys.exit(1)
+        else:
+            args.append(arg)
+
+    if batch:
+        if not args:
+            print("Usage: python enrich_data.py --batch <input.json | dir | glob>... [--jobs=N]")
+            sys.exit(1)
+        enrich_batch(args, shard_size=shard_size, show_memory=show_memory, force=force, jobs=jobs, tables=tables)
+        return
+
     # Parse arguments
-    if len(sys.argv) >= 3:
-        input_path = Path(sys.argv[1])
-        output_path = Path(sys.argv[2])
-    elif len(sys.argv) == 2:
-        input_path = Path(sys.argv[1])
+    if len(args) >= 2:
+        input_path = Path(args[0])
+        output_path = Path(args[1])
+    elif len(args) == 1:
+        input_path = Path(args[0])
         output_path = input_path.parent / "enriched_data.json"
     else:
         # Default paths
@@ -925,12 +1724,12 @@ def main():
         elif Path("../data.json").exists():
             input_path = Path("../data.json")
         else:
-            print("Usage: python enrich_data.py [input.json] [output.json]")
+            print("Usage: python enrich_data.py [input.json] [output.json] [--shards[=SIZE]] [--memory-stats] [--force]")
             print("       If no arguments, reads data.json and writes enriched_data.json")
             sys.exit(1)
         output_path = input_path.parent / "enriched_data.json"
     
-    enrich_data(input_path, output_path)
+    enrich_data(input_path, output_path, shard_size=shard_size, show_memory=show_memory, force=force, tables=tables)
 
 
 if __name__ == "__main__":
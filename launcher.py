@@ -12,19 +12,34 @@ Opens a browser with buttons to:
 1. Extract data from game (requires UmaExtractor + game running)
 2. Enrich data with English names
 3. Open the viewer
+or to run extract, enrich and a localization check as one pipeline.
 """
 
+import gzip
 import http.server
 import json
+import logging
+import logging.handlers
 import os
-import socketserver
+import shutil
+import signal
 import subprocess
 import sys
 import threading
+import time
 import webbrowser
+from collections import deque
+from itertools import islice
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 
+from code_files import ENRICH_CODE_FILES
+from collection import DEFAULT_PAGE_SIZE, CharacterCollection, ancestor_rows, filter_rows, page_rows
+from lineage import ancestors, descendants, shared_ancestors
+from metrics import CountingWriter, Metrics
+from search_index import search
+from spark_index import evaluate_protection_rules, evaluate_spark_filters
+
 # Fix Unicode output on Windows consoles
 if sys.stdout:
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
@@ -34,9 +49,74 @@ if sys.stderr:
 PORT = 8080
 SCRIPT_DIR = Path(__file__).parent.resolve()
 
-# Store running processes and their output
-processes = {}
+# Output of the latest run of each job kind; requests are handled on
+# separate threads, so it (like the job scheduler) is only touched while
+# holding state_lock. output_buffers[kind]: JobOutput of that run
 output_buffers = {}
+state_lock = threading.Lock()
+# Notified whenever a script prints a line or finishes (wakes /api/stream)
+state_changed = threading.Condition(state_lock)
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_KEEPALIVE = 15
+
+# A job keeps its latest output in memory up to OUTPUT_BUFFER_BYTES (lines
+# cut at OUTPUT_LINE_MAX characters); all of it goes to LOG_DIR/<action>.log,
+# rotated at LOG_MAX_BYTES with LOG_BACKUPS old files kept
+OUTPUT_BUFFER_BYTES = 256 * 1024
+OUTPUT_LINE_MAX = 4096
+LOG_DIR = SCRIPT_DIR / 'logs'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+# Static files served gzip-compressed (to clients that accept it), from
+# precompressed copies kept in GZIP_CACHE_DIR and rebuilt when a file changes
+COMPRESSIBLE_TYPES = {'.json', '.js', '.css', '.html', '.svg', '.txt'}
+GZIP_MIN_SIZE = 1024
+GZIP_CACHE_DIR = SCRIPT_DIR / '.gzip_cache'
+gzip_locks = {}
+gzip_locks_lock = threading.Lock()
+
+# Parsed index files written by enrich_data.py, keyed by filename
+sidecar_cache = {}
+sidecar_lock = threading.Lock()
+
+# enriched_data.json indexed for /api/characters, rebuilt when the file changes
+characters = CharacterCollection(SCRIPT_DIR / 'enriched_data.json')
+
+# Request latencies, response sizes and job durations for /api/metrics
+metrics = Metrics()
+
+
+def warm_characters():
+    """Index enriched_data.json in the background, so the viewer's first list request is fast."""
+    def load():
+        try:
+            characters.get()
+        except (OSError, ValueError) as e:
+            print(f"[!] Warning: Could not index enriched_data.json: {e}")
+    
+    threading.Thread(target=load, daemon=True).start()
+
+
+def load_sidecar(name: str) -> dict | None:
+    """Load an index file from SCRIPT_DIR, re-reading it only when it changes."""
+    path = SCRIPT_DIR / name
+    with sidecar_lock:
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            sidecar_cache.pop(name, None)
+            return None
+
+        cached = sidecar_cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        sidecar_cache[name] = (mtime, data)
+        return data
 
 
 CONTROL_PANEL_HTML = '''<!DOCTYPE html>
@@ -103,6 +183,31 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
       margin-bottom: 32px;
     }
 
+    .pipeline {
+      display: flex;
+      justify-content: space-between;
+      align-items: center;
+      margin-bottom: 16px;
+      font-size: 13px;
+      color: var(--text-secondary);
+    }
+
+    .pipeline button {
+      background: transparent;
+      border: 1px solid var(--accent);
+      color: var(--accent);
+      padding: 8px 16px;
+      border-radius: 6px;
+      font-size: 13px;
+      cursor: pointer;
+    }
+
+    .pipeline button:disabled {
+      border-color: var(--border);
+      color: var(--text-muted);
+      cursor: not-allowed;
+    }
+
     .steps {
       display: flex;
       flex-direction: column;
@@ -240,7 +345,12 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
       cursor: pointer;
     }
 
-    .output-header button:hover {
+    .output-header button:disabled {
+      opacity: 0.4;
+      cursor: default;
+    }
+
+    .output-header button:hover:not(:disabled) {
       border-color: var(--accent);
       color: var(--accent);
     }
@@ -269,6 +379,43 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
       color: var(--green);
     }
 
+    .metrics-section {
+      margin-top: 24px;
+      background: var(--bg-panel);
+      border: 1px solid var(--border);
+      border-radius: 8px;
+      overflow: hidden;
+    }
+
+    .metrics-content {
+      padding: 16px;
+      font-family: 'JetBrains Mono', monospace;
+      font-size: 12px;
+      color: var(--text-secondary);
+    }
+
+    .metrics-content table {
+      width: 100%;
+      border-collapse: collapse;
+      margin-top: 12px;
+    }
+
+    .metrics-content th {
+      text-align: left;
+      font-weight: 500;
+      color: var(--text-muted);
+      border-bottom: 1px solid var(--border);
+      padding: 4px 8px 4px 0;
+    }
+
+    .metrics-content td {
+      padding: 3px 8px 3px 0;
+    }
+
+    .metrics-content td.num, .metrics-content th.num {
+      text-align: right;
+    }
+
     .status-bar {
       margin-top: 24px;
       padding: 12px 16px;
@@ -336,6 +483,11 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
     <h1>uma_viewer</h1>
     <p class="subtitle">Extract, enrich, and view your Uma Musume veteran data</p>
 
+    <div class="pipeline">
+      <span>Extract, enrich and check the result in one go</span>
+      <button id="run-all" onclick="runPipeline()">Run All</button>
+    </div>
+
     <div class="steps">
       <div class="step" id="step1">
         <div class="step-number">1</div>
@@ -375,11 +527,25 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
     <div class="output-section">
       <div class="output-header">
         <span>// output</span>
-        <button onclick="clearOutput()">clear</button>
+        <span>
+          <button id="cancel-jobs" onclick="cancelJobs()" disabled>cancel</button>
+          <button onclick="clearOutput()">clear</button>
+        </span>
       </div>
       <div class="output-content" id="output"></div>
     </div>
 
+    <div class="metrics-section">
+      <div class="output-header">
+        <span>// metrics</span>
+        <span>
+          <button onclick="window.open('/api/metrics?format=prometheus', '_blank')">prometheus</button>
+          <button id="metrics-toggle" onclick="toggleMetrics()">show</button>
+        </span>
+      </div>
+      <div class="metrics-content" id="metrics" hidden></div>
+    </div>
+
     <div class="status-bar">
       <span>Files:</span>
       <div class="files">
@@ -445,13 +611,25 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
       btn.textContent = text;
     }
 
+    const STEP_IDS = { 'extract': 'step1', 'enrich': 'step2', 'view': 'step3' };
+    const STEP_BUTTONS = { 'extract': 'Extract', 'enrich': 'Enrich' };
+
+    // Jobs this page is following, for the cancel button
+    let activeJobs = [];
+
+    async function submitJobs(body) {
+      const response = await fetch('/api/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+      });
+      const data = await response.json();
+      if (data.status !== 'ok') throw new Error(data.message || 'Unknown error');
+      return data.jobs;
+    }
+
     async function runStep(action) {
-      const stepMap = {
-        'extract': 'step1',
-        'enrich': 'step2',
-        'view': 'step3'
-      };
-      const stepId = stepMap[action];
+      const stepId = STEP_IDS[action];
 
       if (action === 'view') {
         window.open('/viewer.html', '_blank');
@@ -464,57 +642,187 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
       log(`\\n=== Starting ${action} ===`);
 
       try {
-        const response = await fetch(`/api/${action}`, { method: 'POST' });
-        const data = await response.json();
+        const [job] = await submitJobs({ kind: action });
+        if (job.status === 'queued') log(`Queued behind a running ${action}...`);
+        await followJob(job);
+      } catch (err) {
+        log('Failed to start: ' + err.message, 'error');
+        setStepState(stepId, 'error');
+      }
+    }
 
-        if (data.status === 'started') {
-          // Start polling for output
-          pollOutput(action, stepId);
-        } else {
-          log(data.message || 'Unknown error', 'error');
-          setStepState(stepId, 'error');
+    // Extract, enrich and validate as one chain of jobs, then show the timings
+    async function runPipeline() {
+      const button = document.getElementById('run-all');
+      button.disabled = true;
+      log('\\n=== Starting extract, enrich, validate ===');
+
+      try {
+        const jobs = await submitJobs({ pipeline: true });
+        for (const job of jobs) {
+          if (STEP_IDS[job.kind]) setStepState(STEP_IDS[job.kind], 'running');
+        }
+        for (const job of jobs) {
+          log(`\\n--- ${job.kind} ---`);
+          const result = await followJob(job);
+          if (result.status !== 'completed') {
+            // The server skips the rest of the chain
+            jobs.filter(j => j.id > job.id && STEP_IDS[j.kind]).forEach(j => {
+              setStepState(STEP_IDS[j.kind], '');
+              resetButton(STEP_IDS[j.kind], STEP_BUTTONS[j.kind]);
+            });
+            break;
+          }
+        }
+
+        const response = await fetch('/api/jobs');
+        const data = await response.json();
+        const pipeline = data.pipelines.find(p => p.id === jobs[0].pipeline);
+        if (pipeline) {
+          const steps = pipeline.steps.map(s => `${s.kind} ${formatSeconds(s.duration)}`).join(', ');
+          log(`\\n=== Pipeline ${pipeline.status} in ${formatSeconds(pipeline.duration)} (${steps}) ===`,
+              pipeline.status === 'completed' ? 'success' : 'error');
         }
       } catch (err) {
         log('Failed to start: ' + err.message, 'error');
+      }
+      button.disabled = false;
+    }
+
+    function formatSeconds(seconds) {
+      return seconds == null ? '-' : `${seconds.toFixed(1)}s`;
+    }
+
+    // Follow a job's output until it ends; resolves with its final status
+    function followJob(job) {
+      activeJobs.push(job.id);
+      document.getElementById('cancel-jobs').disabled = false;
+
+      return new Promise(resolve => {
+        const done = (data) => {
+          activeJobs = activeJobs.filter(id => id !== job.id);
+          document.getElementById('cancel-jobs').disabled = activeJobs.length === 0;
+          finishStep(job.kind, STEP_IDS[job.kind], data);
+          resolve(data);
+        };
+        // Stream output as it arrives, polling where EventSource is missing
+        if (window.EventSource) {
+          streamOutput(job.id, done);
+        } else {
+          pollOutput(job.id, done);
+        }
+      });
+    }
+
+    async function cancelJobs() {
+      // Latest first, so queued steps are dropped before the running one stops
+      for (const id of [...activeJobs].reverse()) {
+        try {
+          await fetch(`/api/jobs/${id}/cancel`, { method: 'POST' });
+        } catch (err) {
+          // Reported through the job's own status
+        }
+      }
+    }
+
+    // Output chunks kept on screen; older ones are in logs/<action>.log
+    const MAX_OUTPUT_CHUNKS = 2000;
+
+    function appendOutput(text) {
+      const output = document.getElementById('output');
+      output.appendChild(document.createTextNode(text));
+      while (output.childNodes.length > MAX_OUTPUT_CHUNKS) {
+        output.removeChild(output.firstChild);
+      }
+      output.scrollTop = output.scrollHeight;
+    }
+
+    // 'idle' means the server has no such job (any more), so waiting is pointless
+    function isFinal(status) {
+      return status !== 'running' && status !== 'queued';
+    }
+
+    // Show a job's final status, and on its step when it has one
+    function finishStep(action, stepId, data) {
+      const btnText = STEP_BUTTONS[action];
+      if (data.status === 'completed') {
+        log(data.cached ? '\\n=== Up to date (cached) ===' : '\\n=== Completed ===', 'success');
+        checkFiles();
+        if (!stepId) return;
+        setStepState(stepId, 'completed');
+        if (data.cached) {
+          document.getElementById(stepId).querySelector('button').textContent = 'Up to date';
+        }
+        
+        // Reset button text after delay
+        setTimeout(() => resetButton(stepId, btnText), 3000);
+      } else {
+        const labels = { 'error': 'Failed', 'cancelled': 'Cancelled', 'timeout': 'Timed out', 'skipped': 'Skipped' };
+        log(`\\n=== ${labels[data.status] || data.status} ===`, 'error');
+        if (!stepId) return;
         setStepState(stepId, 'error');
+        setTimeout(() => resetButton(stepId, btnText), 2000);
       }
     }
 
-    function pollOutput(action, stepId) {
+    function streamOutput(jobId, done) {
       if (polling) clearInterval(polling);
 
+      const source = new EventSource(`/api/stream/${jobId}`);
+      let received = false;
+
+      source.addEventListener('output', (e) => {
+        received = true;
+        appendOutput(JSON.parse(e.data));
+      });
+
+      source.addEventListener('status', (e) => {
+        received = true;
+        const data = JSON.parse(e.data);
+        if (isFinal(data.status)) {
+          // Closed by us, otherwise EventSource reconnects to the finished stream
+          source.close();
+          done(data);
+        }
+      });
+
+      source.onerror = () => {
+        // After events arrived EventSource reconnects by itself (resuming via
+        // Last-Event-ID); if the stream never worked, fall back to polling
+        if (!received) {
+          source.close();
+          pollOutput(jobId, done);
+        }
+      };
+    }
+
+    function pollOutput(jobId, done) {
+      if (polling) clearInterval(polling);
+
+      let seq = 0;
+      let waiting = false;
       polling = setInterval(async () => {
+        // One request at a time, so the same lines aren't fetched twice
+        if (waiting) return;
+        waiting = true;
         try {
-          const response = await fetch(`/api/output/${action}`);
+          const response = await fetch(`/api/output/${jobId}?since=${seq}`);
           const data = await response.json();
+          seq = data.seq;
 
           if (data.output) {
-            document.getElementById('output').innerHTML += escapeHtml(data.output);
-            document.getElementById('output').scrollTop = document.getElementById('output').scrollHeight;
+            appendOutput(data.output);
           }
 
-          if (data.status === 'completed') {
-            clearInterval(polling);
-            polling = null;
-            log('\\n=== Completed ===', 'success');
-            setStepState(stepId, 'completed');
-            checkFiles();
-            
-            // Reset button text after delay
-            const btnText = action === 'extract' ? 'Extract' : 'Enrich';
-            setTimeout(() => resetButton(stepId, btnText), 3000);
-          } else if (data.status === 'error') {
+          if (isFinal(data.status)) {
             clearInterval(polling);
             polling = null;
-            log('\\n=== Failed ===', 'error');
-            setStepState(stepId, 'error');
-            
-            const btnText = action === 'extract' ? 'Extract' : 'Enrich';
-            setTimeout(() => resetButton(stepId, btnText), 2000);
+            done(data);
           }
         } catch (err) {
           // Ignore polling errors
         }
+        waiting = false;
       }, 500);
     }
 
@@ -532,6 +840,73 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
       }
     }
 
+    // Live request, job and memory numbers from /api/metrics while shown
+    let metricsTimer = null;
+
+    function toggleMetrics() {
+      const panel = document.getElementById('metrics');
+      panel.hidden = !panel.hidden;
+      document.getElementById('metrics-toggle').textContent = panel.hidden ? 'show' : 'hide';
+      clearInterval(metricsTimer);
+      metricsTimer = null;
+      if (!panel.hidden) {
+        refreshMetrics();
+        metricsTimer = setInterval(refreshMetrics, 2000);
+      }
+    }
+
+    function formatBytes(bytes) {
+      if (bytes == null) return '-';
+      if (bytes < 1024) return `${bytes} B`;
+      if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+      return `${(bytes / 1024 / 1024).toFixed(1)} MB`;
+    }
+
+    function formatMs(seconds) {
+      return seconds == null ? '-' : `${(seconds * 1000).toFixed(1)} ms`;
+    }
+
+    function metricsTable(headers, rows) {
+      const head = headers.map((h, i) => `<th class="${i ? 'num' : ''}">${escapeHtml(h)}</th>`).join('');
+      const body = rows.map(row =>
+        '<tr>' + row.map((cell, i) => `<td class="${i ? 'num' : ''}">${escapeHtml(String(cell))}</td>`).join('') + '</tr>'
+      ).join('');
+      return `<table><tr>${head}</tr>${body}</table>`;
+    }
+
+    async function refreshMetrics() {
+      let data;
+      try {
+        const response = await fetch('/api/metrics');
+        data = await response.json();
+      } catch (err) {
+        return;
+      }
+      const p = data.process;
+      const summary = `rss ${formatBytes(p.rss_bytes)} | worker ${formatBytes(p.worker_rss_bytes)} | ` +
+        `up ${formatSeconds(p.uptime)} | threads ${p.threads} | jobs ${p.jobs_running} running, ${p.jobs_queued} queued`;
+
+      const routes = Object.entries(data.requests).map(([route, r]) => [
+        route, r.count,
+        Object.entries(r.codes).filter(([code]) => Number(code) >= 400).reduce((n, [, c]) => n + c, 0),
+        formatMs(r.latency.p50), formatMs(r.latency.p95), formatBytes(Math.round(r.size.sum / r.count))
+      ]);
+      const jobs = Object.entries(data.jobs).map(([kind, j]) => {
+        const running = j.phases.running || {};
+        const queued = j.phases.queued || {};
+        return [
+          kind, j.count, Object.entries(j.statuses).map(([s, c]) => `${s} ${c}`).join(', '),
+          `${j.last.status} ${formatSeconds(j.last.running)}`,
+          formatSeconds(queued.count ? queued.sum / queued.count : null),
+          formatSeconds(running.count ? running.sum / running.count : null)
+        ];
+      });
+
+      document.getElementById('metrics').innerHTML = escapeHtml(summary) +
+        metricsTable(['route', 'requests', 'errors', 'p50', 'p95', 'avg size'], routes) +
+        (jobs.length ? metricsTable(['job', 'runs', 'statuses', 'last', 'avg queued', 'avg run'], jobs) : '');
+    }
+
     // Check files on load
     checkFiles();
   </script>
@@ -540,12 +915,677 @@ CONTROL_PANEL_HTML = '''<!DOCTYPE html>
 '''
 
 
+def job_logger(action: str) -> logging.Logger:
+    """Logger writing an action's output to its rotating file in LOG_DIR."""
+    logger = logging.getLogger(f'launcher.jobs.{action}')
+    if not logger.handlers:
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        try:
+            LOG_DIR.mkdir(exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                LOG_DIR / f'{action}.log', maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                encoding='utf-8', delay=True)
+        except OSError as e:
+            print(f"[!] Warning: Could not write logs/{action}.log: {e}")
+            handler = logging.NullHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+
+class JobOutput:
+    """Output of one job run: its latest lines in memory, all of them on disk.
+    
+    Lines are numbered from 1 in the order they are printed, and clients ask
+    for the lines after the last seq they have seen. The in-memory ring drops
+    the oldest lines past OUTPUT_BUFFER_BYTES, so a noisy job costs the same
+    memory and response time as a quiet one; dropped lines stay in the log
+    file. Fields are guarded by state_lock.
+    """
+    
+    def __init__(self, action: str, queued: bool = False):
+        self.action = action
+        self.lines = deque()
+        self.size = 0
+        # Seq of the last line printed, and of the last one returned by /api/output without ?since=
+        self.seq = 0
+        self.polled = 0
+        # queued, running, then completed, error, cancelled, timeout or skipped
+        self.status = 'queued'
+        self.cached = False
+        self.log = job_logger(action)
+        if not queued:
+            self.begin()
+    
+    def begin(self):
+        """Mark the job as running. Call with state_lock held (or before it is shared)."""
+        self.status = 'running'
+        self.log.info('=== %s started %s ===', self.action, time.strftime('%Y-%m-%d %H:%M:%S'))
+    
+    def end(self, status: str, returncode: int | None = None):
+        """Record the final status. Call with state_lock held."""
+        self.status = status
+        self.log.info('=== %s %s (exit code %s) ===', self.action, status, returncode)
+        state_changed.notify_all()
+    
+    def append(self, line: str):
+        with state_changed:
+            self._push(line)
+        # Only the job's reader thread appends, so file order matches seq order
+        self.log.info('%s', line.rstrip('\n'))
+    
+    def note(self, line: str):
+        """Add a line from the launcher itself (not the job). Call with state_lock held."""
+        self._push(line)
+        self.log.info('%s', line.rstrip('\n'))
+    
+    def _push(self, line: str):
+        if len(line) > OUTPUT_LINE_MAX:
+            line = line[:OUTPUT_LINE_MAX] + ' [...]\n'
+        self.lines.append(line)
+        self.size += len(line.encode('utf-8', 'replace'))
+        self.seq += 1
+        while self.size > OUTPUT_BUFFER_BYTES and len(self.lines) > 1:
+            self.size -= len(self.lines.popleft().encode('utf-8', 'replace'))
+        state_changed.notify_all()
+    
+    def since(self, seq: int) -> tuple[list, int]:
+        """(lines printed after seq, seq of the last one). Call with state_lock held.
+        
+        A note stands in for lines already dropped from memory; a seq from
+        an earlier run (past this run's last line) starts over from the top.
+        """
+        if seq > self.seq or seq < 0:
+            seq = 0
+        first = self.seq - len(self.lines) + 1
+        lines = []
+        if seq + 1 < first:
+            lines.append(f'[... {first - seq - 1} earlier line(s) not kept, see logs/{self.action}.log ...]\n')
+        lines.extend(islice(self.lines, max(seq + 1 - first, 0), None))
+        return lines, self.seq
+    
+    def mentions(self, text: str) -> bool:
+        """Whether a line still in memory contains text. Call with state_lock held."""
+        return any(text in line for line in self.lines)
+
+
+def append_output(buffer: JobOutput, line: str):
+    buffer.append(line)
+
+
+def finish_job(action: str, buffer: JobOutput, returncode: int):
+    """Record a job's final status once its exit code is in and all output was read."""
+    with state_changed:
+        # enrich_data.py skipped the rebuild because nothing changed
+        buffer.cached = action == 'enrich' and returncode == 0 and buffer.mentions('build cache hit')
+        job = scheduler.job_for(buffer)
+        if job is not None:
+            scheduler.finished(job, returncode)
+        else:
+            buffer.end('completed' if returncode == 0 else 'error', returncode)
+        status = buffer.status
+    if action == 'enrich' and status == 'completed':
+        warm_characters()
+
+
+def stop_process(proc: subprocess.Popen, force: bool = False):
+    """Stop a job's process along with anything it started (UmaExtractor, for one)."""
+    if proc.poll() is not None:
+        return
+    if sys.platform == 'win32':
+        # /T takes the child processes along; without /F they are only asked to close
+        cmd = ['taskkill', '/T', '/PID', str(proc.pid)] + (['/F'] if force else [])
+        subprocess.run(cmd, capture_output=True, creationflags=subprocess.CREATE_NO_WINDOW)
+        return
+    try:
+        # Jobs run in their own session, so the group is the job and its children
+        os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+    except OSError:
+        proc.kill() if force else proc.terminate()
+
+
+def start_process_job(action: str, buffer: JobOutput, cmd: list) -> subprocess.Popen:
+    """Run a script as a child process, reading its output into buffer."""
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(SCRIPT_DIR),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        # A process group of its own, so stop_process() reaches its children
+        start_new_session=sys.platform != 'win32',
+        # For Windows: don't show console window
+        creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+    )
+    
+    def read_output():
+        for line in proc.stdout:
+            append_output(buffer, line)
+        proc.stdout.close()
+        proc.wait()
+        finish_job(action, buffer, proc.returncode)
+    
+    threading.Thread(target=read_output, daemon=True).start()
+    return proc
+
+
+# Printed by `enrich_data.py --worker` after startup and after each job
+WORKER_DONE = '\x1e[enrich-worker-done]'
+
+# The worker keeps running the code it started with, so it is restarted when these change
+WORKER_CODE_FILES = ENRICH_CODE_FILES
+
+
+class EnrichWorker:
+    """Resident `enrich_data.py --worker` process with warm translation tables.
+    
+    Started in the background with the launcher, so translation data is
+    downloaded and parsed while the user extracts; each Enrich then only
+    reads the new data.json. Runs one job at a time, its output going to
+    that job's buffer. Its fields are guarded by state_lock.
+    """
+    
+    def __init__(self):
+        self.proc = None
+        self.code_stamp = None
+        self.starting = False
+        self.action = None
+        self.buffer = None
+        self.stopped = False
+    
+    def _code_stamp(self):
+        return tuple((SCRIPT_DIR / name).stat().st_mtime_ns if (SCRIPT_DIR / name).exists() else None
+                     for name in WORKER_CODE_FILES)
+    
+    def start(self):
+        """Start (or restart) the worker process. Call with state_lock held."""
+        if self.proc is not None and self.proc.poll() is None:
+            # Finishes on its own once stdin is closed
+            self.proc.stdin.close()
+        
+        proc = subprocess.Popen(
+            [sys.executable, 'enrich_data.py', '--worker'],
+            cwd=str(SCRIPT_DIR),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+            env={**os.environ, 'PYTHONIOENCODING': 'utf-8'},
+            start_new_session=sys.platform != 'win32',
+            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+        )
+        self.proc = proc
+        self.code_stamp = self._code_stamp()
+        self.starting = True
+        self.stopped = False
+        threading.Thread(target=self._read_output, args=(proc,), daemon=True).start()
+    
+    def submit(self, action: str, buffer: JobOutput, argv: list) -> 'EnrichWorker':
+        """Run enrich_data.py with argv in the worker. Call with state_lock held."""
+        if self.proc is None or self.proc.poll() is not None or self.code_stamp != self._code_stamp():
+            self.start()
+        self.proc.stdin.write(json.dumps(argv) + '\n')
+        self.proc.stdin.flush()
+        # Attached only once the job was handed over, the reader can't see it earlier
+        self.action = action
+        self.buffer = buffer
+        return self
+    
+    def stopping(self) -> subprocess.Popen | None:
+        """Mark the running job as stopped and return the worker process to end;
+        the next job starts a new one. Call with state_lock held."""
+        if self.proc is not None:
+            self.stopped = True
+        return self.proc
+    
+    def _read_output(self, proc):
+        for line in proc.stdout:
+            with state_changed:
+                current = self.proc is proc
+                buffer, action = self.buffer, self.action
+                if current and line.startswith(WORKER_DONE):
+                    if self.starting:
+                        # Startup done, tables loaded
+                        self.starting = False
+                        if buffer is None:
+                            print('[OK] Enrichment worker ready')
+                        continue
+                    self.buffer = self.action = None
+            if not current:
+                continue
+            if line.startswith(WORKER_DONE):
+                finish_job(action, buffer, int(line.split()[-1]))
+            elif buffer is not None:
+                append_output(buffer, line)
+            elif line.startswith(('[X]', '[!]')):
+                print(f'[enrich worker] {line.rstrip()}')
+        
+        proc.stdout.close()
+        proc.wait()
+        with state_changed:
+            if self.proc is not proc or self.buffer is None:
+                return
+            buffer, action = self.buffer, self.action
+            self.buffer = self.action = None
+            self.proc = None
+            stopped = self.stopped
+        if stopped:
+            append_output(buffer, '[!] Enrichment worker stopped\n')
+        else:
+            append_output(buffer, f'[X] Enrichment worker exited unexpectedly (code {proc.returncode})\n')
+        finish_job(action, buffer, proc.returncode or 1)
+
+
+enrich_worker = EnrichWorker()
+
+
+def start_enrich_job(buffer: JobOutput):
+    """Enrich in the resident worker, or as a one-off process if it can't run."""
+    try:
+        return enrich_worker.submit('enrich', buffer, [])
+    except OSError:
+        return start_process_job('enrich', buffer, [sys.executable, 'enrich_data.py'])
+
+
+def start_extract_job(buffer: JobOutput) -> subprocess.Popen:
+    return start_process_job('extract', buffer, [sys.executable, 'run_extractor.py', '--yes'])
+
+
+def start_validate_job(buffer: JobOutput) -> subprocess.Popen:
+    # Terminology findings come from upstream data and are informational, as in enrich
+    return start_process_job('validate', buffer, [sys.executable, 'validate_localization.py', '--no-fail'])
+
+
+# What the scheduler can run: how to start a job of each kind (returning its
+# handle), how many may run at once, and seconds before a run counts as stuck
+JOB_KINDS = {
+    'extract': {'start': start_extract_job, 'limit': 1, 'timeout': 600},
+    'enrich': {'start': start_enrich_job, 'limit': 1, 'timeout': 1800},
+    'validate': {'start': start_validate_job, 'limit': 1, 'timeout': 300},
+}
+
+# The one-click pipeline, each step starting once the one before completed
+PIPELINE = ('extract', 'enrich', 'validate')
+
+FINAL_STATUSES = ('completed', 'error', 'cancelled', 'timeout', 'skipped')
+
+# Finished jobs kept for /api/jobs; every one is also logged to logs/jobs.log
+JOB_HISTORY_SIZE = 50
+
+# Seconds a stopped job gets to exit before it is killed outright
+STOP_GRACE = 10
+
+
+class Job:
+    """One run of a job kind, from queued to finished. Guarded by state_lock."""
+    
+    def __init__(self, job_id: int, kind: str, after: int | None = None, pipeline: int | None = None):
+        self.id = job_id
+        self.kind = kind
+        self.after = after
+        self.pipeline = pipeline
+        self.output = JobOutput(kind, queued=True)
+        self.handle = None
+        self.returncode = None
+        # 'cancelled' or 'timeout' once the job was asked to stop
+        self.stop_reason = None
+        self.stop_requested_at = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+    
+    @property
+    def status(self) -> str:
+        return self.output.status
+    
+    def duration(self) -> float | None:
+        if self.started_at is None:
+            return None
+        return round((self.finished_at or time.time()) - self.started_at, 3)
+    
+    def as_dict(self) -> dict:
+        result = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'after': self.after,
+            'pipeline': self.pipeline,
+            'queued_at': self.queued_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'wait': round((self.started_at or self.finished_at or time.time()) - self.queued_at, 3),
+            'duration': self.duration(),
+            'returncode': self.returncode,
+        }
+        if self.output.cached:
+            result['cached'] = True
+        return result
+
+
+def job_process(handle) -> subprocess.Popen | None:
+    """The process to end to stop a job's handle. Call with state_lock held."""
+    if isinstance(handle, EnrichWorker):
+        return handle.stopping()
+    return handle
+
+
+class JobScheduler:
+    """Queue of launcher jobs with dependencies, per-kind limits, cancellation and timeouts.
+    
+    Jobs start in the order they were submitted, once the job they come
+    after has completed and fewer than their kind's limit are running; if
+    that job fails or is stopped, the ones after it are skipped. A running
+    job past its kind's timeout is stopped by a watchdog thread. The last
+    JOB_HISTORY_SIZE finished jobs stay listed, and every finished job is
+    logged to logs/jobs.log. Guarded by state_lock.
+    """
+    
+    def __init__(self):
+        self.jobs = {}
+        self.next_id = 1
+        self.history_log = None
+        self.watchdog = None
+        # (process, force) pairs for send_signals()
+        self.signals = []
+    
+    def submit(self, kind: str, after: int | None = None, pipeline: int | None = None) -> Job:
+        """Queue a job and start it if it can run now. Call with state_lock held."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if after is not None and after not in self.jobs:
+            raise ValueError(f"No job with id {after}")
+        
+        job = Job(self.next_id, kind, after, pipeline)
+        self.next_id += 1
+        self.jobs[job.id] = job
+        if self.watchdog is None:
+            self.watchdog = threading.Thread(target=self._watch, daemon=True)
+            self.watchdog.start()
+        self.dispatch()
+        return job
+    
+    def submit_pipeline(self, kinds) -> list[Job]:
+        """Queue kinds as a chain, each after the one before. Call with state_lock held."""
+        unknown = [kind for kind in kinds if kind not in JOB_KINDS]
+        if unknown or not kinds:
+            raise ValueError(f"Unknown job kind: {', '.join(map(str, unknown))}" if unknown else "Empty pipeline")
+        
+        jobs = []
+        # A pipeline is known by the id of its first job
+        pipeline = self.next_id
+        for kind in kinds:
+            jobs.append(self.submit(kind, jobs[-1].id if jobs else None, pipeline))
+        return jobs
+    
+    def cancel(self, job_id: int) -> Job | None:
+        """Cancel a queued job, or stop a running one. Call with state_lock held,
+        then send_signals() once it is released."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status == 'queued':
+            job.output.note('[!] Cancelled before it started\n')
+            self._end(job, 'cancelled')
+            self.dispatch()
+        elif job.status == 'running' and job.stop_reason is None:
+            job.output.note(f'[!] Cancelling {job.kind}...\n')
+            self._stop(job, 'cancelled')
+        return job
+    
+    def job_for(self, output: JobOutput) -> Job | None:
+        """The job writing to output, if the scheduler started it. Call with state_lock held."""
+        for job in self.jobs.values():
+            if job.output is output:
+                return job
+        return None
+    
+    def finished(self, job: Job, returncode: int):
+        """Record a started job's exit and start whatever can run next. Call with state_lock held."""
+        self._end(job, job.stop_reason or ('completed' if returncode == 0 else 'error'), returncode)
+        self.dispatch()
+    
+    def dispatch(self):
+        """Start every queued job that can run now. Call with state_lock held."""
+        for job in list(self.jobs.values()):
+            if job.status != 'queued':
+                continue
+            before = self.jobs.get(job.after)
+            if before is not None and before.status in ('queued', 'running'):
+                continue
+            if before is not None and before.status != 'completed':
+                job.output.note(f'[!] Skipped, {before.kind} (job {before.id}) did not complete\n')
+                self._end(job, 'skipped')
+                continue
+            running = sum(1 for other in self.jobs.values() if other.kind == job.kind and other.status == 'running')
+            if running < JOB_KINDS[job.kind]['limit']:
+                self._start(job)
+    
+    def summary(self) -> dict:
+        """Jobs oldest first, plus per-pipeline status and timings. Call with state_lock held."""
+        jobs = [job.as_dict() for job in self.jobs.values()]
+        pipelines = {}
+        for job in jobs:
+            if job['pipeline'] is not None:
+                pipelines.setdefault(job['pipeline'], []).append(job)
+        
+        summaries = []
+        for pipeline, steps in pipelines.items():
+            statuses = [step['status'] for step in steps]
+            if any(status in ('queued', 'running') for status in statuses):
+                status = 'running'
+            else:
+                status = next((s for s in statuses if s != 'completed'), 'completed')
+            started = [step['started_at'] for step in steps if step['started_at']]
+            finished = [step['finished_at'] for step in steps if step['finished_at']]
+            summaries.append({
+                'id': pipeline,
+                'status': status,
+                'jobs': [step['id'] for step in steps],
+                'duration': round(max(finished) - min(started), 3) if started and finished and status != 'running' else None,
+                'steps': [{'kind': step['kind'], 'status': step['status'], 'duration': step['duration']} for step in steps],
+            })
+        return {'jobs': jobs, 'pipelines': summaries}
+    
+    def _start(self, job: Job):
+        kind = JOB_KINDS[job.kind]
+        job.output.begin()
+        job.started_at = time.time()
+        output_buffers[job.kind] = job.output
+        try:
+            job.handle = kind['start'](job.output)
+        except OSError as e:
+            job.output.note(f'[X] Could not start {job.kind}: {e}\n')
+            self._end(job, 'error')
+        state_changed.notify_all()
+    
+    def send_signals(self):
+        """Stop the processes of jobs asked to stop. Call without state_lock held:
+        on Windows this runs taskkill, which would hold up every request meanwhile."""
+        with state_lock:
+            signals, self.signals = self.signals, []
+        for proc, force in signals:
+            stop_process(proc, force)
+    
+    def _stop(self, job: Job, reason: str):
+        job.stop_reason = reason
+        job.stop_requested_at = time.time()
+        self._signal(job)
+    
+    def _signal(self, job: Job, force: bool = False):
+        proc = job_process(job.handle)
+        if proc is not None:
+            self.signals.append((proc, force))
+    
+    def _end(self, job: Job, status: str, returncode: int | None = None):
+        job.returncode = returncode
+        job.finished_at = time.time()
+        job.handle = None
+        job.output.end(status, returncode)
+        
+        info = job.as_dict()
+        metrics.record_job(job.kind, status, info['wait'], info['duration'])
+        if self.history_log is None:
+            self.history_log = job_logger('jobs')
+        self.history_log.info('%s', json.dumps(info))
+        
+        # Forget the oldest finished jobs, unless a queued one still waits on them
+        finished = [j for j in self.jobs.values() if j.status in FINAL_STATUSES]
+        needed = {j.after for j in self.jobs.values() if j.status == 'queued'}
+        for old in finished[:max(0, len(finished) - JOB_HISTORY_SIZE)]:
+            if old.id not in needed:
+                del self.jobs[old.id]
+    
+    def _watch(self):
+        """Stop jobs that ran past their timeout, and kill ones that ignore a stop."""
+        while True:
+            time.sleep(1)
+            with state_changed:
+                now = time.time()
+                for job in self.jobs.values():
+                    if job.status != 'running':
+                        continue
+                    timeout = JOB_KINDS[job.kind]['timeout']
+                    if job.stop_reason is None and now - job.started_at > timeout:
+                        job.output.note(f'[X] {job.kind} timed out after {timeout}s, stopping it\n')
+                        self._stop(job, 'timeout')
+                    elif job.stop_reason is not None and now - job.stop_requested_at > STOP_GRACE:
+                        self._signal(job, force=True)
+            self.send_signals()
+
+
+scheduler = JobScheduler()
+
+
+def find_output(name: str) -> JobOutput | None:
+    """Output of a job by id, or of the latest run of a kind. Call with state_lock held."""
+    if name.isdigit():
+        job = scheduler.jobs.get(int(name))
+        return job.output if job is not None else None
+    return output_buffers.get(name)
+
+
+def gzip_copy(path: Path, stat: os.stat_result) -> Path:
+    """Precompressed copy of a static file, rebuilt when the file's mtime changes."""
+    gz_path = GZIP_CACHE_DIR / (str(path.relative_to(SCRIPT_DIR)) + '.gz')
+    with gzip_locks_lock:
+        lock = gzip_locks.setdefault(gz_path, threading.Lock())
+    
+    # One compression per file at a time; other files are not held up
+    with lock:
+        try:
+            if gz_path.stat().st_mtime_ns == stat.st_mtime_ns:
+                return gz_path
+        except FileNotFoundError:
+            pass
+        
+        gz_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = gz_path.with_name(gz_path.name + '.tmp')
+        with open(path, 'rb') as src, gzip.GzipFile(tmp_path, 'wb', compresslevel=6, mtime=0) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        # The copy carries the source's mtime, which is how staleness is detected
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, gz_path)
+        return gz_path
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Whether an Accept-Encoding header allows gzip (and doesn't set q=0)."""
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+# More ranges than this in one request are answered with the whole file
+MAX_BYTE_RANGES = 32
+
+
+def parse_byte_ranges(header: str, size: int) -> list[tuple[int, int]] | None:
+    """Parse a Range header into inclusive (start, end) pairs within size.
+    
+    None means the header should be ignored (malformed, not bytes, or too
+    many ranges) and the whole file sent; [] means nothing is satisfiable.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+    parts = spec.split(',')
+    if len(parts) > MAX_BYTE_RANGES:
+        return None
+    
+    ranges = []
+    for part in parts:
+        first, dash, last = part.strip().partition('-')
+        if not dash:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else max(size - 1, start)
+                if end < start:
+                    return None
+            else:
+                # Suffix range: the last N bytes
+                suffix = int(last)
+                start, end = max(size - suffix, 0), size - 1
+                if suffix == 0:
+                    continue
+        except ValueError:
+            return None
+        if start < 0:
+            return None
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    # If-None-Match uses weak comparison
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
 class LauncherHandler(http.server.SimpleHTTPRequestHandler):
     """Handle both file serving and API requests."""
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=str(SCRIPT_DIR), **kwargs)
     
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+    
+    def handle_one_request(self):
+        """Handle a request as usual, then record its route, status, latency and size."""
+        self.command = None
+        self.response_code = None
+        self.wfile.written = 0
+        self.bytes_sent = 0
+        start = time.perf_counter()
+        try:
+            super().handle_one_request()
+        finally:
+            if self.command and self.response_code is not None:
+                try:
+                    metrics.record_request(urlparse(self.path).path, self.response_code,
+                                           time.perf_counter() - start, self.wfile.written + self.bytes_sent)
+                except Exception as e:
+                    # Accounting must never break a request that was already answered
+                    print(f"[!] Warning: Could not record request metrics: {e}")
+    
+    def log_request(self, code='-', size='-'):
+        # Kept for the metrics instead of printed
+        if isinstance(code, int):
+            self.response_code = int(code)
+    
     def log_message(self, format, *args):
         # Suppress default logging
         pass
@@ -570,25 +1610,59 @@ class LauncherHandler(http.server.SimpleHTTPRequestHandler):
                 'enriched_exists': enriched_exists
             })
         
+        elif parsed.path == '/api/search':
+            # Name/costume/skill/spark search over search_index.json
+            index = load_sidecar('search_index.json')
+            if index is None:
+                self.send_json({'status': 'error', 'message': 'search_index.json not found, run Enrich first'})
+                return
+            query = parse_qs(parsed.query).get('q', [''])[0]
+            rows = search(index, query)
+            self.send_json({'status': 'ok', 'rows': rows, 'row_count': index['row_count']})
+        
+        elif parsed.path == '/api/lineage':
+            self.handle_lineage_query(parse_qs(parsed.query))
+        
+        elif parsed.path == '/api/characters':
+            # Filter model as JSON in ?filters=, the rest as plain parameters
+            params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            try:
+                params['filters'] = json.loads(params.get('filters') or '{}')
+            except ValueError as e:
+                self.send_json({'status': 'error', 'message': f'Invalid filters: {e}'})
+                return
+            self.handle_characters(params)
+        
+        elif parsed.path.startswith('/api/characters/'):
+            self.handle_character_detail(parsed.path.split('/')[-1])
+        
+        elif parsed.path == '/api/jobs' or parsed.path.startswith('/api/jobs/'):
+            self.handle_jobs_get(parsed.path)
+        
+        elif parsed.path == '/api/metrics':
+            self.handle_metrics(parse_qs(parsed.query))
+        
+        elif parsed.path.startswith('/api/stream/'):
+            self.handle_stream(parsed.path.split('/')[-1], parse_qs(parsed.query))
+        
         elif parsed.path.startswith('/api/output/'):
-            # Get output from running process
+            # Output printed since ?since=<seq> (default: since the last call without it)
             action = parsed.path.split('/')[-1]
+            since = parse_qs(parsed.query).get('since', [''])[0]
             
-            if action in output_buffers:
-                output = output_buffers[action].get('new', '')
-                output_buffers[action]['new'] = ''
-                
-                status = 'running'
-                if action in processes:
-                    proc = processes[action]
-                    if proc.poll() is not None:
-                        # Process finished
-                        status = 'completed' if proc.returncode == 0 else 'error'
-                        del processes[action]
-                
-                self.send_json({'output': output, 'status': status})
+            with state_lock:
+                buffer = find_output(action)
+                if buffer is not None:
+                    lines, seq = buffer.since(int(since) if since.isdigit() else buffer.polled)
+                    if not since.isdigit():
+                        buffer.polled = seq
+                    result = {'output': ''.join(lines), 'status': buffer.status, 'seq': seq}
+                    if buffer.cached:
+                        result['cached'] = True
+            if buffer is not None:
+                self.send_json(result)
             else:
-                self.send_json({'output': '', 'status': 'idle'})
+                self.send_json({'output': '', 'status': 'idle', 'seq': 0})
         
         else:
             # Serve static files
@@ -597,59 +1671,443 @@ class LauncherHandler(http.server.SimpleHTTPRequestHandler):
     def do_POST(self):
         parsed = urlparse(self.path)
         
-        if parsed.path == '/api/extract':
-            self.run_script('extract', ['python', 'run_extractor.py', '--yes'])
+        if parsed.path in ('/api/extract', '/api/enrich'):
+            self.submit_job(parsed.path.split('/')[-1])
+        
+        elif parsed.path == '/api/jobs' or parsed.path.startswith('/api/jobs/'):
+            self.handle_jobs_post(parsed.path)
         
-        elif parsed.path == '/api/enrich':
-            self.run_script('enrich', ['python', 'enrich_data.py'])
+        elif parsed.path in ('/api/spark-filter', '/api/protection'):
+            self.handle_spark_query(parsed.path)
+        
+        elif parsed.path == '/api/characters':
+            try:
+                body = self.read_json_body()
+            except (ValueError, UnicodeDecodeError) as e:
+                self.send_json({'status': 'error', 'message': f'Invalid JSON: {e}'})
+                return
+            self.handle_characters(body)
         
         else:
             self.send_error(404)
     
-    def run_script(self, action, cmd):
-        """Start a script in background and track its output."""
-        if action in processes:
-            self.send_json({'status': 'error', 'message': 'Already running'})
+    def send_head(self):
+        """Static files with ETag/304 revalidation, Cache-Control, gzip and byte ranges.
+        
+        Directories and missing files are left to SimpleHTTPRequestHandler.
+        The body is sent by copyfile(), from the file or the ranges chosen here.
+        """
+        self.byte_ranges = None
+        parsed = urlparse(self.path)
+        path = Path(self.translate_path(self.path))
+        if parsed.path.endswith('/') or not path.is_file():
+            return super().send_head()
+        
+        stat = path.stat()
+        content_type = self.guess_type(str(path))
+        compressible = path.suffix in COMPRESSIBLE_TYPES and stat.st_size >= GZIP_MIN_SIZE
+        identity_etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        
+        # Ranges always address the uncompressed bytes; a slice from the middle of
+        # a gzip stream can't be decoded on its own
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') not in (None, identity_etag):
+            range_header = None  # The client's partial copy is outdated, send it all
+        ranges = parse_byte_ranges(range_header, stat.st_size) if range_header else None
+        
+        use_gzip = compressible and ranges is None and accepts_gzip(self.headers.get('Accept-Encoding'))
+        # Each encoding is a different byte sequence, so it gets its own tag
+        etag = identity_etag[:-1] + '-gz"' if use_gzip else identity_etag
+        # Versioned URLs (shards, details: ?v=<hash>) never change; the rest is revalidated
+        if 'v' in parse_qs(parsed.query):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'no-cache'
+        
+        def send_cache_headers():
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Accept-Ranges', 'bytes')
+            if compressible:
+                self.send_header('Vary', 'Accept-Encoding')
+        
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            send_cache_headers()
+            self.end_headers()
+            return None
+        
+        if ranges == []:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{stat.st_size}')
+            self.send_header('Content-Length', '0')
+            send_cache_headers()
+            self.end_headers()
+            return None
+        
+        serve_path = path
+        if use_gzip:
+            try:
+                serve_path = gzip_copy(path, stat)
+            except OSError:
+                # Read-only folder or similar: fall back to the plain file
+                use_gzip = False
+                etag = identity_etag
+        
+        try:
+            f = open(serve_path, 'rb')
+        except OSError:
+            self.send_error(404, 'File not found')
+            return None
+        
+        if ranges:
+            self.send_response(206)
+            if len(ranges) == 1:
+                start, end = ranges[0]
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{stat.st_size}')
+                self.send_header('Content-Length', str(end - start + 1))
+                self.byte_ranges = [(b'', start, end)]
+            else:
+                boundary = os.urandom(12).hex()
+                self.byte_ranges = [
+                    ((f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+                      f'Content-Range: bytes {start}-{end}/{stat.st_size}\r\n\r\n').encode(), start, end)
+                    for start, end in ranges
+                ]
+                closing = f'--{boundary}--\r\n'.encode()
+                # Every part ends with CRLF before the next delimiter
+                length = sum(len(head) + end - start + 1 + 2 for head, start, end in self.byte_ranges) + len(closing)
+                self.byte_ranges.append((closing, None, None))
+                self.send_header('Content-Type', f'multipart/byteranges; boundary={boundary}')
+                self.send_header('Content-Length', str(length))
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Last-Modified', self.date_time_string(stat.st_mtime))
+        send_cache_headers()
+        self.end_headers()
+        return f
+    
+    def copyfile(self, source, outputfile):
+        """Send a file body (whole, or the ranges picked by send_head) with sendfile.
+        
+        socket.sendfile() is zero-copy where the OS supports it (os.sendfile)
+        and falls back to plain sends elsewhere.
+        """
+        ranges = getattr(self, 'byte_ranges', None)
+        try:
+            source.fileno()
+        except OSError:
+            # In-memory bodies such as directory listings
+            super().copyfile(source, outputfile)
+            return
+        
+        outputfile.flush()
+        if ranges is None:
+            self.bytes_sent += self.connection.sendfile(source)
+            return
+        
+        multipart = len(ranges) > 1
+        for head, start, end in ranges:
+            if head:
+                outputfile.write(head)
+                outputfile.flush()
+            if start is not None:
+                self.bytes_sent += self.connection.sendfile(source, start, end - start + 1)
+                if multipart:
+                    outputfile.write(b'\r\n')
+    
+    def read_json_body(self):
+        """Parse the request body as a JSON object (empty body -> {}); ValueError otherwise."""
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+        if not isinstance(body, dict):
+            raise ValueError(f'expected an object, got {type(body).__name__}')
+        return body
+    
+    def handle_spark_query(self, path):
+        """Evaluate spark filters or protection rules against spark_index.json."""
+        index = load_sidecar('spark_index.json')
+        if index is None:
+            self.send_json({'status': 'error', 'message': 'spark_index.json not found, run Enrich first'})
             return
         
         try:
-            # Initialize output buffer
-            output_buffers[action] = {'new': '', 'all': ''}
-            
-            # Start process
-            proc = subprocess.Popen(
-                cmd,
-                cwd=str(SCRIPT_DIR),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                # For Windows: don't show console window
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-            )
-            
-            processes[action] = proc
-            
-            # Start thread to read output
-            def read_output():
-                for line in proc.stdout:
-                    output_buffers[action]['new'] += line
-                    output_buffers[action]['all'] += line
-                proc.stdout.close()
-            
-            thread = threading.Thread(target=read_output, daemon=True)
-            thread.start()
-            
-            self.send_json({'status': 'started'})
+            body = self.read_json_body()
+        except (ValueError, UnicodeDecodeError) as e:
+            self.send_json({'status': 'error', 'message': f'Invalid JSON: {e}'})
+            return
+        
+        if path == '/api/protection':
+            rules = body.get('rules', [])
+            if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+                self.send_json({'status': 'error', 'message': 'rules must be a list of objects'})
+                return
+            try:
+                rows = evaluate_protection_rules(index, rules, body.get('logic', 'or'))
+            except (TypeError, ValueError) as e:
+                self.send_json({'status': 'error', 'message': f'Invalid rule: {e}'})
+                return
+        else:
+            filters = body.get('filters', {})
+            if not isinstance(filters, dict):
+                self.send_json({'status': 'error', 'message': 'filters must be an object'})
+                return
+            # Groups that aren't objects can't hold a setting, as if left at their defaults
+            filters = {group: value for group, value in filters.items() if isinstance(value, dict)}
+            rows = evaluate_spark_filters(index, filters)
+        
+        self.send_json({'status': 'ok', 'rows': sorted(rows), 'row_count': index['row_count']})
+    
+    def load_characters(self) -> dict | None:
+        """The collection index, or None after sending the error."""
+        try:
+            collection = characters.get()
+        except (OSError, ValueError) as e:
+            self.send_json({'status': 'error', 'message': f'Could not load enriched_data.json: {e}'})
+            return None
+        if collection is None:
+            self.send_json({'status': 'error', 'message': 'enriched_data.json not found, run Enrich first'})
+        return collection
+    
+    def handle_characters(self, options):
+        """One page of the viewer's character list: filters, search, sortField/sortAsc, offset, limit."""
+        collection = self.load_characters()
+        if collection is None:
+            return
+        
+        filters = options.get('filters') or {}
+        try:
+            if not isinstance(filters, dict):
+                raise ValueError('filters must be an object')
+            matched = filter_rows(collection, filters, str(options.get('search') or ''),
+                                  str(options.get('sortField') or 'rank_score'),
+                                  options.get('sortAsc') in (True, 'true', '1'))
+            offset = int(options.get('offset') or 0)
+            limit = int(options.get('limit', DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError) as e:
+            self.send_json({'status': 'error', 'message': str(e)})
+            return
+        
+        self.send_json({
+            'status': 'ok',
+            'total': len(matched),
+            'row_count': collection['row_count'],
+            'offset': offset,
+            'rows': page_rows(collection, matched, offset, limit),
+        })
+    
+    def handle_character_detail(self, trained_id):
+        """A character's full record, plus list rows of its parents and grandparents."""
+        collection = self.load_characters()
+        if collection is None:
+            return
+        
+        row = collection['by_id'].get(int(trained_id)) if trained_id.isdigit() else None
+        if row is None:
+            self.send_json({'status': 'error', 'message': f'No character with trained_chara_id {trained_id}'})
+            return
+        
+        # The record is kept serialized, so it is spliced in rather than re-encoded
+        ancestors = json.dumps(ancestor_rows(collection, row), ensure_ascii=False)
+        body = f'{{"status": "ok", "row": {row}, "record": {collection["details"][row]}, "ancestors": {ancestors}}}'
+        self.send_json_body(body.encode('utf-8'))
+    
+    def handle_lineage_query(self, params):
+        """Descendants, ancestors or shared ancestors from lineage.json."""
+        graph = load_sidecar('lineage.json')
+        if graph is None:
+            self.send_json({'status': 'error', 'message': 'lineage.json not found, run Enrich first'})
+            return
+        
+        query = params.get('query', ['descendants'])[0]
+        try:
+            ids = [int(i) for i in params.get('id', [])]
+            depth = int(params['depth'][0]) if 'depth' in params else None
+        except ValueError:
+            self.send_json({'status': 'error', 'message': 'id and depth must be numbers'})
+            return
         
-        except Exception as e:
+        if query == 'shared' and len(ids) == 2:
+            found = shared_ancestors(graph, ids[0], ids[1])
+            result = [{'trained_chara_id': a, 'generations': list(d)} for a, d in sorted(found.items())]
+        elif query in ('descendants', 'ancestors') and len(ids) == 1:
+            lookup = descendants if query == 'descendants' else ancestors
+            found = lookup(graph, ids[0], depth)
+            result = [{'trained_chara_id': a, 'generations': d} for a, d in sorted(found.items())]
+        else:
+            self.send_json({'status': 'error', 'message': 'Use query=descendants|ancestors&id=N or query=shared&id=A&id=B'})
+            return
+        
+        for entry in result:
+            entry['name'] = graph['names'].get(str(entry['trained_chara_id']))
+        self.send_json({'status': 'ok', 'query': query, 'results': result})
+    
+    def submit_job(self, kind):
+        """Queue a job of one kind (the Extract and Enrich buttons of older panels)."""
+        with state_lock:
+            job = scheduler.submit(kind)
+            status = 'started' if job.status == 'running' else job.status
+            result = {'status': status, 'job': job.as_dict()}
+        self.send_json(result)
+    
+    def handle_jobs_post(self, path):
+        """POST /api/jobs ({"kind": ..., "after": id} or {"pipeline": true | [kinds]}) and /api/jobs/<id>/cancel."""
+        parts = path.strip('/').split('/')
+        if len(parts) == 4 and parts[3] == 'cancel' and parts[2].isdigit():
+            with state_lock:
+                job = scheduler.cancel(int(parts[2]))
+                result = job.as_dict() if job is not None else None
+            scheduler.send_signals()
+            if result is None:
+                self.send_json({'status': 'error', 'message': f'No job with id {parts[2]}'})
+            else:
+                self.send_json({'status': 'ok', 'job': result})
+            return
+        if len(parts) != 2:
+            self.send_error(404)
+            return
+        
+        try:
+            body = self.read_json_body()
+        except (ValueError, UnicodeDecodeError) as e:
+            self.send_json({'status': 'error', 'message': f'Invalid JSON: {e}'})
+            return
+        
+        try:
+            with state_lock:
+                if body.get('pipeline'):
+                    kinds = body['pipeline'] if isinstance(body['pipeline'], list) else PIPELINE
+                    jobs = scheduler.submit_pipeline(kinds)
+                else:
+                    jobs = [scheduler.submit(body.get('kind'), body.get('after'))]
+                result = [job.as_dict() for job in jobs]
+        except (TypeError, ValueError) as e:
             self.send_json({'status': 'error', 'message': str(e)})
+            return
+        self.send_json({'status': 'ok', 'jobs': result})
+    
+    def handle_jobs_get(self, path):
+        """GET /api/jobs (queue, history and pipeline timings) and /api/jobs/<id>."""
+        parts = path.strip('/').split('/')
+        with state_lock:
+            if len(parts) == 2:
+                result = {'status': 'ok', **scheduler.summary(),
+                          'kinds': {kind: {'limit': spec['limit'], 'timeout': spec['timeout']}
+                                    for kind, spec in JOB_KINDS.items()}}
+            elif len(parts) == 3 and parts[2].isdigit() and int(parts[2]) in scheduler.jobs:
+                result = {'status': 'ok', 'job': scheduler.jobs[int(parts[2])].as_dict()}
+            else:
+                result = {'status': 'error', 'message': f'No job with id {parts[-1]}'}
+        self.send_json(result)
+    
+    def handle_metrics(self, params):
+        """Request, job and memory metrics as JSON, or as Prometheus text with
+        ?format=prometheus (or an Accept header asking for text/plain)."""
+        with state_lock:
+            worker = enrich_worker.proc
+            statuses = [job.status for job in scheduler.jobs.values()]
+        gauges = {
+            'worker_pid': worker.pid if worker is not None and worker.poll() is None else None,
+            'jobs_running': statuses.count('running'),
+            'jobs_queued': statuses.count('queued'),
+        }
+        
+        accept = self.headers.get('Accept') or ''
+        fmt = params.get('format', [''])[0]
+        if fmt == 'prometheus' or (not fmt and 'text/plain' in accept and 'application/json' not in accept):
+            body = metrics.prometheus(gauges).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json({'status': 'ok', **metrics.snapshot(gauges)})
+    
+    def handle_stream(self, action, params):
+        """Server-sent events: output as it is read, then the final status.
+        
+        Output events carry the seq of their last line as the event ID, so a
+        reconnecting EventSource (Last-Event-ID header, or ?last_id=) resumes
+        where it stopped.
+        """
+        try:
+            sent = int(self.headers.get('Last-Event-ID') or params.get('last_id', ['0'])[0])
+        except ValueError:
+            sent = 0
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        
+        try:
+            self.wfile.write(b'retry: 1000\n\n')
+            reported = None
+            while True:
+                with state_changed:
+                    buffer = find_output(action)
+                    if buffer is not None:
+                        state_changed.wait_for(
+                            lambda: buffer.seq != sent or buffer.status != reported,
+                            timeout=STREAM_KEEPALIVE,
+                        )
+                        lines, seq = buffer.since(sent)
+                        status = buffer.status
+                        cached = buffer.cached
+                
+                if buffer is None:
+                    self.wfile.write(b'event: status\ndata: {"status": "idle"}\n\n')
+                    return
+                
+                chunks = []
+                if lines:
+                    # Everything new in one event, however fast the job prints
+                    chunks.append(f'id: {seq}\nevent: output\ndata: {json.dumps("".join(lines))}\n\n')
+                sent = seq
+                if status != reported:
+                    event = {'status': status, 'cached': True} if cached else {'status': status}
+                    chunks.append(f'event: status\ndata: {json.dumps(event)}\n\n')
+                    reported = status
+                # A comment on quiet streams, so dropped clients are noticed
+                self.wfile.write(''.join(chunks).encode() if chunks else b': keep-alive\n\n')
+                self.wfile.flush()
+                if status in FINAL_STATUSES:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass
     
     def send_json(self, data):
+        self.send_json_body(json.dumps(data).encode())
+    
+    def send_json_body(self, body: bytes):
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
+
+
+class LauncherServer(http.server.ThreadingHTTPServer):
+    """One thread per request, so a large download doesn't stall the panel's polls."""
+    
+    allow_reuse_address = True
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops connections from a burst of
+    # clients, which then wait a full second for their SYN to be retried
+    request_queue_size = 128
+    
+    def handle_error(self, request, client_address):
+        # A client that went away mid-response (closed tab, aborted download) is not an error
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
 
 
 def main():
@@ -666,8 +2124,18 @@ def main():
     if not (SCRIPT_DIR / 'viewer.html').exists():
         print("[!] Warning: viewer.html not found")
     
+    # Load translation data in the background while the user extracts
+    with state_lock:
+        try:
+            enrich_worker.start()
+        except OSError as e:
+            print(f"[!] Warning: Could not start the enrichment worker: {e}")
+    
+    if (SCRIPT_DIR / 'enriched_data.json').exists():
+        warm_characters()
+    
     # Start server
-    with socketserver.TCPServer(("", PORT), LauncherHandler) as httpd:
+    with LauncherServer(("", PORT), LauncherHandler) as httpd:
         url = f"http://localhost:{PORT}"
         print(f"[OK] Server running at {url}")
         print()
@@ -685,4 +2153,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# /// script
+# requires-python = ">=3.10"
+# dependencies = []
+# ///
+"""
+Lineage graph for enriched veteran data.
+
+Built by enrich_data.py next to the enriched output (lineage.json) from each
+veteran's succession_trained_chara_id_1/2. Answers "which of my veterans
+descend from X", "who are X's ancestors" and "what do X and Y share" without
+rescanning the collection.
+
+Graph layout (IDs are trained_chara_id, JSON keys are strings):
+    {
+      "version": 1,
+      "max_depth": 4,
+      "parents":   {"123": [45, 67]},         # forward edges, child -> parents
+      "children":  {"45": [123, 130]},        # reverse edges, parent -> children
+      "ancestors": {"123": [[45, 1], ...]},   # [ancestor, generations] up to max_depth
+      "names":     {"123": "Special Week"}
+    }
+
+Parents outside the collection (friends' or transferred veterans) still appear
+as IDs, so two veterans bred from the same rental share that ancestor.
+
+Usage:
+    python lineage.py descendants <trained_chara_id> [--depth N]
+    python lineage.py ancestors <trained_chara_id> [--depth N]
+    python lineage.py shared <trained_chara_id> <trained_chara_id>
+
+Reads lineage.json (or builds the graph from enriched_data.json) in this directory.
+"""
+
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+# Fix Unicode output on Windows consoles
+if sys.stdout:
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+if sys.stderr:
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+
+LINEAGE_VERSION = 1
+
+# Generations of ancestors precomputed per veteran (parents = 1, grandparents = 2, ...)
+LINEAGE_MAX_DEPTH = 4
+
+
+def build_lineage_graph(characters: list[dict], max_depth: int = LINEAGE_MAX_DEPTH) -> dict:
+    """Build forward/reverse adjacency and depth-limited ancestor sets."""
+    parents = {}
+    children = {}
+    names = {}
+
+    for char in characters:
+        chara_id = char.get("trained_chara_id")
+        if not chara_id:
+            continue
+        names[str(chara_id)] = char.get("chara_name_en") or char.get("card_name_en") or ""
+        links = []
+        for key in ("succession_trained_chara_id_1", "succession_trained_chara_id_2"):
+            parent_id = char.get(key)
+            if parent_id and parent_id not in links:
+                links.append(parent_id)
+                children.setdefault(str(parent_id), []).append(chara_id)
+        if links:
+            parents[str(chara_id)] = links
+
+    for kids in children.values():
+        kids.sort()
+
+    graph = {
+        "version": LINEAGE_VERSION,
+        "row_count": len(characters),
+        "max_depth": max_depth,
+        "parents": parents,
+        "children": children,
+        "names": names,
+    }
+    graph["ancestors"] = {
+        chara_id: sorted(_walk(graph, "parents", int(chara_id), max_depth).items())
+        for chara_id in parents
+    }
+    return graph
+
+
+def _walk(graph: dict, edges: str, start: int, max_depth: int | None) -> dict[int, int]:
+    """Breadth-first walk over parent or child edges: {id: generations away}."""
+    found = {}
+    queue = deque([(start, 0)])
+    while queue:
+        node, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for nxt in graph[edges].get(str(node), []):
+            if nxt not in found and nxt != start:
+                found[nxt] = depth + 1
+                queue.append((nxt, depth + 1))
+    return found
+
+
+def ancestors(graph: dict, chara_id: int, max_depth: int | None = None) -> dict[int, int]:
+    """Ancestors of a veteran mapped to how many generations back they are."""
+    if max_depth is not None and max_depth <= graph["max_depth"]:
+        return {a: d for a, d in graph["ancestors"].get(str(chara_id), []) if d <= max_depth}
+    return _walk(graph, "parents", chara_id, max_depth)
+
+
+def descendants(graph: dict, chara_id: int, max_depth: int | None = None) -> dict[int, int]:
+    """Veterans descending from chara_id mapped to how many generations down they are."""
+    return _walk(graph, "children", chara_id, max_depth)
+
+
+def shared_ancestors(graph: dict, first_id: int, second_id: int) -> dict[int, tuple[int, int]]:
+    """Ancestors common to two veterans (within max_depth): {id: (depth from first, depth from second)}."""
+    first = dict(graph["ancestors"].get(str(first_id), []))
+    second = dict(graph["ancestors"].get(str(second_id), []))
+    if len(second) < len(first):
+        return {a: (first[a], d) for a, d in second.items() if a in first}
+    return {a: (d, second[a]) for a, d in first.items() if a in second}
+
+
+def load_lineage_graph(directory: Path = SCRIPT_DIR) -> dict | None:
+    """Load lineage.json, or build the graph from enriched_data.json."""
+    graph_path = directory / "lineage.json"
+    if graph_path.exists():
+        with open(graph_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    data_path = directory / "enriched_data.json"
+    if data_path.exists():
+        with open(data_path, "r", encoding="utf-8") as f:
+            return build_lineage_graph(json.load(f))
+    return None
+
+
+def describe(graph: dict, chara_id: int) -> str:
+    """Human-readable label for a trained_chara_id."""
+    name = graph["names"].get(str(chara_id))
+    return f"{chara_id} {name}" if name else f"{chara_id} (not in collection)"
+
+
+def main():
+    args = sys.argv[1:]
+    depth = None
+    if "--depth" in args:
+        pos = args.index("--depth")
+        try:
+            depth = int(args[pos + 1])
+        except (IndexError, ValueError):
+            print("[X] Error: --depth needs a number")
+            return 1
+        del args[pos:pos + 2]
+
+    if len(args) < 2 or args[0] not in ("descendants", "ancestors", "shared") or (args[0] == "shared" and len(args) < 3):
+        print("Usage:" + __doc__.split("Usage:")[1].split("\n\n")[0])
+        return 1
+
+    graph = load_lineage_graph()
+    if graph is None:
+        print("[X] Error: lineage.json and enriched_data.json not found. Run enrich_data.py first.")
+        return 1
+
+    try:
+        ids = [int(a) for a in args[1:]]
+    except ValueError:
+        print("[X] Error: trained_chara_id must be a number")
+        return 1
+
+    if args[0] == "shared":
+        result = shared_ancestors(graph, ids[0], ids[1])
+        print(f"Shared ancestors of {describe(graph, ids[0])} and {describe(graph, ids[1])}: {len(result)}")
+        for chara_id, (d1, d2) in sorted(result.items(), key=lambda kv: sum(kv[1])):
+            print(f"  {describe(graph, chara_id)}  (generations: {d1} / {d2})")
+        return 0
+
+    lookup = descendants if args[0] == "descendants" else ancestors
+    result = lookup(graph, ids[0], depth)
+    print(f"{args[0].title()} of {describe(graph, ids[0])}: {len(result)}")
+    for chara_id, generations in sorted(result.items(), key=lambda kv: (kv[1], kv[0])):
+        print(f"  {describe(graph, chara_id)}  (generation {generations})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Compact list projection of enriched veteran data.
+
+Built by enrich_data.py next to the enriched output (list_index.json) along with
+one detail file per character (details/<trained_chara_id>.json). The viewer
+draws, filters and sorts its list from these small rows and fetches a
+character's full record only when it is selected.
+
+Index layout:
+    {
+      "version": 1,
+      "row_count": 1234,
+      "content_hash": "9f2c...",  # same as enriched_shards/manifest.json's when written together
+      "rows": [{"trained_chara_id": 1, "chara_name_en": "...", ..., "spark_summary": {"Spd": 7}}, ...]
+    }
+
+Rows keep the field names of the full records, so the viewer can use either.
+"""
+
+LIST_INDEX_VERSION = 1
+
+# Fields copied from the full record into each list row
+LIST_FIELDS = (
+    "trained_chara_id", "card_id",
+    "chara_name_en", "card_name_en", "costume_name_en",
+    "rank_score", "wins", "create_time", "running_style",
+    "speed", "stamina", "power", "guts", "wiz",
+    "proper_ground_turf", "proper_ground_dirt",
+    "proper_distance_short", "proper_distance_mile", "proper_distance_middle", "proper_distance_long",
+    "proper_running_style_nige", "proper_running_style_senko",
+    "proper_running_style_sashi", "proper_running_style_oikomi",
+    # Parent links let the family tree resolve names from list rows alone
+    "succession_trained_chara_id_1", "succession_trained_chara_id_2",
+)
+
+# Parent-mode spark preview categories, same ranges as getSparkSummary in viewer.js
+SPARK_SUMMARY_CATEGORIES = (
+    ("Spd", 100, 199),
+    ("Sta", 200, 299),
+    ("Pow", 300, 399),
+    ("Gut", 400, 499),
+    ("Wit", 500, 599),
+    ("Gnd", 1100, 1299),
+    ("Dst", 3100, 3499),
+    ("Sty", 2100, 2499),
+    ("Unq", 10000000, 19999999),
+)
+
+
+def spark_summary(char: dict) -> dict:
+    """Total stars per spark category over the character's and all parents' sparks."""
+    sparks = list(char.get("spark_array_enriched", []))
+    for parent in char.get("succession_chara_array", []):
+        sparks.extend(parent.get("factor_info_array", []))
+
+    totals = {}
+    for spark in sparks:
+        try:
+            spark_id = int(spark.get("spark_id") or spark.get("factor_id") or 0)
+        except (TypeError, ValueError):
+            continue
+        for label, lo, hi in SPARK_SUMMARY_CATEGORIES:
+            if lo <= spark_id <= hi:
+                totals[label] = totals.get(label, 0) + (spark.get("stars") or 0)
+                break
+    return {label: stars for label, stars in totals.items() if stars}
+
+
+def list_row(char: dict, detail_hash: str | None = None) -> dict:
+    """Project a full character record onto its list row."""
+    row = {field: char[field] for field in LIST_FIELDS if field in char}
+    row["spark_summary"] = spark_summary(char)
+    if detail_hash:
+        row["detail_hash"] = detail_hash
+    return row
+
+
+def build_list_index(characters: list[dict], detail_hashes: dict | None = None,
+                     content_hash: str | None = None) -> dict:
+    """Build the list index; detail_hashes maps trained_chara_id to a cache key,
+    content_hash identifies the enriched data it was built from."""
+    detail_hashes = detail_hashes or {}
+    return {
+        "version": LIST_INDEX_VERSION,
+        "row_count": len(characters),
+        "content_hash": content_hash,
+        "rows": [list_row(c, detail_hashes.get(c.get("trained_chara_id"))) for c in characters],
+    }
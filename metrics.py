@@ -0,0 +1,334 @@
+"""
+Request and job metrics for the launcher's /api/metrics endpoint.
+
+The launcher records every HTTP request (by route, so /api/characters/123
+and /api/characters/456 count together) and every finished job into a
+Metrics object, and reports it either as JSON or in the Prometheus text
+exposition format:
+
+    requests   per route: count by status code, latency histogram (seconds)
+               and response size histogram (bytes)
+    jobs       per job kind: count by final status, and a duration histogram
+               per phase (queued: waiting to start, running: start to exit)
+    process    resident memory (RSS) of the launcher and of its enrichment
+               worker, and uptime
+
+Histograms have fixed buckets, so recording is O(1) and memory stays
+constant however long the launcher runs.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+
+# Upper bounds of the histogram buckets; values above the last go to +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+JOB_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+# Launcher endpoints counted by their own path (see LauncherHandler in launcher.py)
+API_ROUTES = {"status", "search", "lineage", "characters", "jobs", "metrics", "extract", "enrich",
+              "spark-filter", "protection"}
+
+# Prefix of every metric name in the Prometheus format
+PROMETHEUS_PREFIX = "uma_launcher"
+# Prometheus names of the process gauges; other gauges keep their own name
+GAUGE_NAMES = {
+    "uptime": "uptime_seconds",
+    "rss_bytes": "resident_memory_bytes",
+    "worker_rss_bytes": "worker_resident_memory_bytes",
+}
+
+
+class Histogram:
+    """Observations per bucket (not cumulative), their sum and count."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate of quantile q, interpolated inside its bucket (the last bound for +Inf)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for n, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if n == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[n - 1] if n else 0
+                return lower + (self.bounds[n] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+            # [upper bound, observations in this bucket]; None is +Inf
+            "buckets": [[bound, count] for bound, count in zip(self.bounds + (None,), self.counts) if count],
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 6)
+
+
+def route_of(path: str) -> str:
+    """Route label for a request path: ids and job names become placeholders,
+    and every static file is counted as "static"."""
+    if path in ("/", "/index.html"):
+        return "/"
+    if not path.startswith("/api/"):
+        return "static"
+    parts = path.strip("/").split("/")
+    if len(parts) < 2:
+        return "/api/other"
+    if len(parts) == 2:
+        # Unknown paths share one label, so probing clients can't add routes without end
+        return path if parts[1] in API_ROUTES else "/api/other"
+    if parts[1] == "jobs" and len(parts) == 3:
+        return "/api/jobs/{id}"
+    if parts[1] == "jobs" and parts[3:] == ["cancel"]:
+        return "/api/jobs/{id}/cancel"
+    if parts[1] == "characters":
+        return "/api/characters/{id}"
+    if parts[1] in ("stream", "output"):
+        return f"/api/{parts[1]}/{{job}}"
+    return "/api/other"
+
+
+class CountingWriter:
+    """File-like wrapper counting the bytes written through it (a handler's wfile)."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.written = 0
+
+    def write(self, data) -> int:
+        self.raw.write(data)
+        self.written += len(data)
+        return len(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+def resident_memory(pid: int | None = None) -> int | None:
+    """Resident set size in bytes of a process (default: this one), None if unknown.
+
+    Current RSS on Linux and Windows; elsewhere only this process's peak RSS
+    is available.
+    """
+    if sys.platform == "win32":
+        return _windows_rss(pid)
+    if os.path.exists("/proc/self/statm"):
+        try:
+            with open(f"/proc/{pid or 'self'}/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if pid is not None:
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes, except on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _windows_rss(pid: int | None) -> int | None:
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    psapi = ctypes.WinDLL("psapi", use_last_error=True)
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+
+    if pid is None:
+        handle = kernel32.GetCurrentProcess()
+    else:
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return None
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        if not psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+    finally:
+        if pid is not None:
+            kernel32.CloseHandle(handle)
+
+
+class Metrics:
+    """Counters and histograms of requests and jobs, safe to update from any thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        # route -> {"codes": {code: count}, "latency": Histogram, "size": Histogram}
+        self.routes = {}
+        # kind -> {"statuses": {status: count}, "phases": {phase: Histogram}, "last": {...}}
+        self.jobs = {}
+
+    def record_request(self, path: str, code, seconds: float, size: int):
+        """Count one finished request to path with its status code, duration and bytes sent."""
+        route = route_of(path)
+        with self.lock:
+            entry = self.routes.get(route)
+            if entry is None:
+                entry = self.routes[route] = {
+                    "codes": {},
+                    "latency": Histogram(LATENCY_BUCKETS),
+                    "size": Histogram(SIZE_BUCKETS),
+                }
+            code = str(code)
+            entry["codes"][code] = entry["codes"].get(code, 0) + 1
+            entry["latency"].observe(seconds)
+            entry["size"].observe(size)
+
+    def record_job(self, kind: str, status: str, waited: float | None, ran: float | None):
+        """Count one finished job with its time queued and time running (None if it never started)."""
+        with self.lock:
+            entry = self.jobs.setdefault(kind, {"statuses": {}, "phases": {}})
+            entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+            # Exact numbers of the latest run; a handful of runs says little about buckets
+            entry["last"] = {"status": status, "queued": waited, "running": ran, "finished_at": time.time()}
+            for phase, seconds in (("queued", waited), ("running", ran)):
+                if seconds is not None:
+                    if phase not in entry["phases"]:
+                        entry["phases"][phase] = Histogram(JOB_BUCKETS)
+                    entry["phases"][phase].observe(seconds)
+
+    def snapshot(self, gauges: dict | None = None) -> dict:
+        """Everything recorded so far as plain data, plus current process gauges.
+
+        gauges adds launcher state only the caller knows, such as the
+        enrichment worker's pid ("worker_pid") or queue lengths.
+        """
+        gauges = dict(gauges or {})
+        worker_pid = gauges.pop("worker_pid", None)
+        process = {
+            "uptime": round(time.time() - self.started, 3),
+            "rss_bytes": resident_memory(),
+            "worker_rss_bytes": resident_memory(worker_pid) if worker_pid else None,
+            "threads": threading.active_count(),
+            **gauges,
+        }
+        with self.lock:
+            requests = {
+                route: {
+                    "count": entry["latency"].count,
+                    "codes": dict(entry["codes"]),
+                    "latency": entry["latency"].as_dict(),
+                    "size": entry["size"].as_dict(),
+                }
+                for route, entry in sorted(self.routes.items())
+            }
+            jobs = {
+                kind: {
+                    "count": sum(entry["statuses"].values()),
+                    "statuses": dict(entry["statuses"]),
+                    "phases": {phase: hist.as_dict() for phase, hist in entry["phases"].items()},
+                    "last": dict(entry["last"]),
+                }
+                for kind, entry in sorted(self.jobs.items())
+            }
+        return {"process": process, "requests": requests, "jobs": jobs}
+
+    def prometheus(self, gauges: dict | None = None) -> str:
+        """The same numbers in the Prometheus text exposition format (version 0.0.4)."""
+        snapshot = self.snapshot(gauges)
+        with self.lock:
+            routes = {route: (dict(entry["codes"]), entry["latency"], entry["size"])
+                      for route, entry in sorted(self.routes.items())}
+            jobs = {kind: (dict(entry["statuses"]), dict(entry["phases"]))
+                    for kind, entry in sorted(self.jobs.items())}
+            lines = []
+            _metric_header(lines, "http_requests_total", "counter", "HTTP requests by route and status code")
+            for route, (codes, _, _) in routes.items():
+                for code, count in sorted(codes.items()):
+                    lines.append(_sample("http_requests_total", {"route": route, "code": code}, count))
+            _metric_header(lines, "http_request_duration_seconds", "histogram", "Time to handle a request")
+            for route, (_, latency, _) in routes.items():
+                _histogram_samples(lines, "http_request_duration_seconds", {"route": route}, latency)
+            _metric_header(lines, "http_response_size_bytes", "histogram", "Bytes sent per response")
+            for route, (_, _, size) in routes.items():
+                _histogram_samples(lines, "http_response_size_bytes", {"route": route}, size)
+            _metric_header(lines, "jobs_total", "counter", "Finished jobs by kind and final status")
+            for kind, (statuses, _) in jobs.items():
+                for status, count in sorted(statuses.items()):
+                    lines.append(_sample("jobs_total", {"kind": kind, "status": status}, count))
+            _metric_header(lines, "job_duration_seconds", "histogram", "Time jobs spent queued and running")
+            for kind, (_, phases) in jobs.items():
+                for phase, hist in sorted(phases.items()):
+                    _histogram_samples(lines, "job_duration_seconds", {"kind": kind, "phase": phase}, hist)
+
+        for name, value in snapshot["process"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric = GAUGE_NAMES.get(name, name)
+                _metric_header(lines, metric, "gauge", None)
+                lines.append(_sample(metric, {}, value))
+        return "\n".join(lines) + "\n"
+
+
+def _metric_header(lines: list, name: str, kind: str, help_text: str | None):
+    if help_text:
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {kind}")
+
+
+def _sample(name: str, labels: dict, value) -> str:
+    if labels:
+        text = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in labels.items())
+        return f"{PROMETHEUS_PREFIX}_{name}{{{text}}} {value}"
+    return f"{PROMETHEUS_PREFIX}_{name} {value}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_samples(lines: list, name: str, labels: dict, hist: Histogram):
+    cumulative = 0
+    for bound, count in zip(hist.bounds + ("+Inf",), hist.counts):
+        cumulative += count
+        lines.append(_sample(f"{name}_bucket", {**labels, "le": str(bound)}, cumulative))
+    lines.append(_sample(f"{name}_sum", labels, round(hist.sum, 6)))
+    lines.append(_sample(f"{name}_count", labels, hist.count))
@@ -0,0 +1,169 @@
+"""
+Typed, compact in-memory model for veteran data.
+
+Veteran, Spark, SkillRef, Parent and SupportCardRef keep the fields the tools
+read most in __slots__ attributes instead of per-record dicts, so they use
+less memory and are read with plain attribute access:
+
+    veteran = Veteran.from_dict(raw)
+    veteran.speed, veteran.sparks[0].stars, veteran.parents[0].chara_name_en
+
+Works on raw UmaExtractor records and enriched ones alike. Fields without a
+slot are kept in `extra`, and key order is remembered (shared between records
+with the same layout), so to_dict() returns exactly the original JSON shape.
+
+dedup.py works on these objects; bench_model.py compares them with plain
+dicts.
+"""
+
+import json
+from pathlib import Path
+
+from spark_index import PARENT_POSITIONS
+
+# One shared tuple per distinct key order
+_KEY_ORDERS = {}
+
+
+class _Record:
+    """Base for slotted records: JSON key -> attribute mapping plus leftovers."""
+
+    __slots__ = ("_keys", "extra")
+
+    # JSON key -> attribute name
+    FIELDS: dict[str, str] = {}
+    # JSON key -> record class for lists of nested records
+    NESTED: dict[str, type] = {}
+
+    @classmethod
+    def from_dict(cls, raw: dict):
+        obj = cls.__new__(cls)
+        for attr in cls._attrs:
+            setattr(obj, attr, None)
+
+        extra = None
+        for key, value in raw.items():
+            attr = cls.FIELDS.get(key)
+            if attr is None:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+                continue
+            nested = cls.NESTED.get(key)
+            if nested is not None and isinstance(value, list):
+                value = [nested.from_dict(item) for item in value]
+            setattr(obj, attr, value)
+
+        keys = tuple(raw)
+        obj._keys = _KEY_ORDERS.setdefault(keys, keys)
+        obj.extra = extra
+        return obj
+
+    def to_dict(self) -> dict:
+        out = {}
+        for key in self._keys:
+            attr = self.FIELDS.get(key)
+            if attr is None:
+                out[key] = self.extra[key]
+                continue
+            value = getattr(self, attr)
+            if key in self.NESTED and isinstance(value, list):
+                value = [item.to_dict() for item in value]
+            out[key] = value
+        return out
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._attrs = tuple(dict.fromkeys(cls.FIELDS.values()))
+
+    def __repr__(self):
+        fields = ", ".join(f"{a}={getattr(self, a)!r}" for a in self._attrs[:3])
+        return f"{type(self).__name__}({fields}, ...)"
+
+
+class Spark(_Record):
+    """A spark: the veteran's own (spark_id) or a parent's (factor_id)."""
+
+    __slots__ = ("spark_id", "name", "stars")
+    FIELDS = {"spark_id": "spark_id", "factor_id": "spark_id", "spark_name_en": "name", "stars": "stars"}
+
+
+class SkillRef(_Record):
+    """A learned skill with its enriched details."""
+
+    __slots__ = ("skill_id", "level", "name", "rarity", "skill_type", "condition", "effects", "duration", "summary")
+    FIELDS = {
+        "skill_id": "skill_id", "level": "level", "skill_name_en": "name",
+        "rarity": "rarity", "skill_type": "skill_type", "condition": "condition",
+        "effects": "effects", "duration": "duration", "summary": "summary",
+    }
+
+
+class SupportCardRef(_Record):
+    """A support card from the training deck."""
+
+    __slots__ = ("support_card_id", "limit_break_count", "name", "card_type")
+    FIELDS = {
+        "support_card_id": "support_card_id", "limit_break_count": "limit_break_count",
+        "support_card_name_en": "name", "support_card_type": "card_type",
+    }
+
+
+class Parent(_Record):
+    """A parent or grandparent from succession_chara_array."""
+
+    __slots__ = ("position_id", "card_id", "chara_name_en", "card_name_en", "sparks")
+    FIELDS = {
+        "position_id": "position_id", "card_id": "card_id",
+        "chara_name_en": "chara_name_en", "card_name_en": "card_name_en",
+        "factor_info_array": "sparks",
+    }
+    NESTED = {"factor_info_array": Spark}
+
+
+VETERAN_SCALARS = (
+    "trained_chara_id", "card_id", "chara_name_en", "card_name_en", "costume_name_en",
+    "rank_score", "wins", "create_time", "running_style",
+    "speed", "stamina", "power", "guts", "wiz",
+    "proper_ground_turf", "proper_ground_dirt",
+    "proper_distance_short", "proper_distance_mile", "proper_distance_middle", "proper_distance_long",
+    "proper_running_style_nige", "proper_running_style_senko",
+    "proper_running_style_sashi", "proper_running_style_oikomi",
+    "succession_trained_chara_id_1", "succession_trained_chara_id_2",
+    "factor_id_array",
+)
+
+
+class Veteran(_Record):
+    """One trained veteran."""
+
+    __slots__ = VETERAN_SCALARS + ("sparks", "skills", "parents", "support_cards")
+    FIELDS = {
+        **{name: name for name in VETERAN_SCALARS},
+        "spark_array_enriched": "sparks",
+        "skill_array": "skills",
+        "succession_chara_array": "parents",
+        "support_card_list": "support_cards",
+    }
+    NESTED = {
+        "spark_array_enriched": Spark,
+        "skill_array": SkillRef,
+        "succession_chara_array": Parent,
+        "support_card_list": SupportCardRef,
+    }
+
+    def direct_parents(self) -> list:
+        """The two direct parents, without grandparents."""
+        return [p for p in self.parents or [] if p.position_id in PARENT_POSITIONS]
+
+
+def load_veterans(path: Path) -> list[Veteran]:
+    """Load a data.json or enriched_data.json file into Veteran objects."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [Veteran.from_dict(raw) for raw in json.load(f)]
+
+
+def dump_veterans(veterans: list[Veteran], path: Path):
+    """Write Veteran objects back in the enriched JSON format."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([v.to_dict() for v in veterans], f, indent=2, ensure_ascii=False)
@@ -0,0 +1,351 @@
+"""
+Top-K queries over enriched veteran data.
+
+Used by `python enrich_data.py query`. A query ranks veterans by a score
+expression, optionally keeping only those matching a --where condition:
+
+    python enrich_data.py query 'stars("stamina", "parents", 3) + stars("long", "parents", 3)' --top 20
+    python enrich_data.py query rank_score --where 'long >= A and stars("groundwork") > 0'
+
+Expressions use Python syntax (+ - * /, comparisons, and/or/not, parentheses) over:
+  - numeric fields: speed, stamina, power, guts, wiz (or wit), rank_score, wins, ...
+    (the list_index.json fields; any other name is an error)
+  - aptitudes: turf, dirt, sprint, mile, medium, long, front, pace, late, end,
+    graded G=1 ... S=8 (the letters work as constants)
+  - stars(spark [, scope [, min_stars]]): total stars of matching sparks, where
+    spark is a category (speed ... wit, turf ... end, unique) or part of a spark
+    name, and scope is "own" (default), "parents" (own + parents) or "all"
+    (own + parents + grandparents)
+
+When list_index.json and spark_index.json are present and up to date, the query
+is answered from them; otherwise enriched_data.json is streamed one record at
+a time. Either way it is a single pass keeping only the best K rows in a heap.
+"""
+
+import ast
+import difflib
+import heapq
+import json
+from pathlib import Path
+
+from list_index import LIST_FIELDS
+from spark_index import (
+    PARENT_POSITIONS, SCOPE_GRANDPARENT, SCOPE_OWN, SCOPE_PARENT, SPARK_CATEGORIES,
+    normalize_spark_name, spark_stars,
+)
+
+DEFAULT_TOP_K = 10
+
+# Shorthand names for record fields
+FIELD_ALIASES = {
+    "wit": "wiz",
+    "turf": "proper_ground_turf",
+    "dirt": "proper_ground_dirt",
+    "sprint": "proper_distance_short",
+    "mile": "proper_distance_mile",
+    "medium": "proper_distance_middle",
+    "long": "proper_distance_long",
+    "front": "proper_running_style_nige",
+    "pace": "proper_running_style_senko",
+    "late": "proper_running_style_sashi",
+    "end": "proper_running_style_oikomi",
+}
+
+# Names usable in expressions; anything else is rejected rather than read as 0
+QUERY_FIELDS = frozenset(LIST_FIELDS) | frozenset(FIELD_ALIASES)
+
+# Aptitude grades as constants, same scale as getAptitudeGrade in viewer.js
+GRADES = {"S": 8, "A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
+
+STAR_SCOPES = {
+    "own": {SCOPE_OWN},
+    "parents": {SCOPE_OWN, SCOPE_PARENT},
+    "all": {SCOPE_OWN, SCOPE_PARENT, SCOPE_GRANDPARENT},
+}
+
+BINARY_OPS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b if b else 0,
+}
+COMPARE_OPS = {
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+}
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+class QueryError(ValueError):
+    """Raised for expressions outside the query language."""
+
+
+class StarsTerm:
+    """One stars(...) call: which sparks count, from where, and how many stars minimum."""
+
+    def __init__(self, spark: str, scope: str, min_stars: int):
+        if scope not in STAR_SCOPES:
+            raise QueryError(f'stars() scope must be one of {", ".join(STAR_SCOPES)}, not "{scope}"')
+        self.spark = normalize_spark_name(spark)
+        self.scopes = STAR_SCOPES[scope]
+        self.min_stars = min_stars
+        self.id_range = SPARK_CATEGORIES.get(self.spark)
+
+    def matches(self, spark_id: int, name: str, stars: int) -> bool:
+        if stars < self.min_stars:
+            return False
+        if self.id_range:
+            return self.id_range[0] <= spark_id <= self.id_range[1]
+        return self.spark in name
+
+
+class Query:
+    """A compiled score expression plus optional where condition."""
+
+    def __init__(self, score: str, where: str | None = None):
+        self.fields = set()
+        self.stars_terms = []
+        self.score = self._compile(score)
+        self.where = self._compile(where) if where else None
+
+    def _compile(self, text: str):
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise QueryError(f"Cannot parse {text!r}: {e.msg}") from None
+        return self._node(tree.body)
+
+    def _node(self, node):
+        """Turn an AST node into a function of (record fields, star totals)."""
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            value = node.value
+            return lambda row, stars: value
+
+        if isinstance(node, ast.Name):
+            if node.id in GRADES:
+                value = GRADES[node.id]
+                return lambda row, stars: value
+            if node.id not in QUERY_FIELDS:
+                raise QueryError(_unknown_field(node.id))
+            field = FIELD_ALIASES.get(node.id, node.id)
+            self.fields.add(field)
+            return lambda row, stars: _number(row.get(field))
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "stars":
+            return self._stars_call(node)
+
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPS:
+            op, left, right = BINARY_OPS[type(node.op)], self._node(node.left), self._node(node.right)
+            return lambda row, stars: op(left(row, stars), right(row, stars))
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.Not)):
+            operand = self._node(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda row, stars: -operand(row, stars)
+            return lambda row, stars: not operand(row, stars)
+
+        if isinstance(node, ast.Compare) and all(type(op) in COMPARE_OPS for op in node.ops):
+            operands = [self._node(node.left)] + [self._node(c) for c in node.comparators]
+            ops = [COMPARE_OPS[type(op)] for op in node.ops]
+
+            def compare(row, stars):
+                values = [operand(row, stars) for operand in operands]
+                return all(op(values[i], values[i + 1]) for i, op in enumerate(ops))
+            return compare
+
+        if isinstance(node, ast.BoolOp):
+            parts = [self._node(v) for v in node.values]
+            if isinstance(node.op, ast.And):
+                return lambda row, stars: all(part(row, stars) for part in parts)
+            return lambda row, stars: any(part(row, stars) for part in parts)
+
+        raise QueryError(f"Unsupported expression: {ast.unparse(node)}")
+
+    def _stars_call(self, node):
+        args = []
+        for arg in node.args:
+            if not isinstance(arg, ast.Constant):
+                raise QueryError("stars() arguments must be literals, e.g. stars(\"stamina\", \"parents\", 3)")
+            args.append(arg.value)
+        if not 1 <= len(args) <= 3 or node.keywords:
+            raise QueryError("stars() takes (spark [, scope [, min_stars]])")
+
+        spark = str(args[0])
+        scope = str(args[1]) if len(args) > 1 else "own"
+        min_stars = int(args[2]) if len(args) > 2 else 0
+        slot = len(self.stars_terms)
+        self.stars_terms.append(StarsTerm(spark, scope, min_stars))
+        return lambda row, stars: stars[slot]
+
+
+def _unknown_field(name: str) -> str:
+    """Error message for a name that is not a field, with the closest match if any."""
+    close = difflib.get_close_matches(name, sorted(QUERY_FIELDS | set(GRADES)), n=1)
+    hint = f', did you mean "{close[0]}"?' if close else ""
+    return f'Unknown field "{name}"{hint}'
+
+
+def _number(value) -> float:
+    """Numeric value of a field (missing or non-numeric -> 0)."""
+    if isinstance(value, bool):
+        return int(value)
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _objects(items) -> list:
+    """The dict entries of a list field, ignoring a missing field and malformed entries."""
+    return [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+
+
+def _record_sparks(char: dict):
+    """Yield (spark_id, normalized name, stars, scope) for a full record, like build_spark_index."""
+    for spark in _objects(char.get("spark_array_enriched")):
+        yield spark.get("spark_id"), spark.get("spark_name_en"), spark.get("stars"), SCOPE_OWN
+    for parent in _objects(char.get("succession_chara_array")):
+        scope = SCOPE_PARENT if parent.get("position_id") in PARENT_POSITIONS else SCOPE_GRANDPARENT
+        for spark in _objects(parent.get("factor_info_array")):
+            yield spark.get("factor_id"), spark.get("spark_name_en"), spark.get("stars"), scope
+
+
+def record_stars(query: Query, char: dict) -> list[int]:
+    """Star totals for each stars() term, computed from a full record."""
+    totals = [0] * len(query.stars_terms)
+    if not totals:
+        return totals
+    for spark_id, name, stars, scope in _record_sparks(char):
+        try:
+            spark_id = int(spark_id)
+        except (TypeError, ValueError):
+            continue
+        stars = stars or spark_stars(spark_id)
+        name = normalize_spark_name(name)
+        for slot, term in enumerate(query.stars_terms):
+            if scope in term.scopes and term.matches(spark_id, name, stars):
+                totals[slot] += stars
+    return totals
+
+
+def index_stars(term: StarsTerm, index: dict) -> dict[int, int]:
+    """Star totals per row for one stars() term, from spark_index.json."""
+    if term.id_range:
+        lo, hi = term.id_range
+        spark_ids = [key for key in index["postings"] if lo <= int(key) <= hi]
+    else:
+        spark_ids = {str(spark_id) for name, ids in index["names"].items() if term.spark in name for spark_id in ids}
+
+    totals = {}
+    for key in spark_ids:
+        for row, stars, scope in index["postings"].get(key, []):
+            if scope in term.scopes and stars >= term.min_stars:
+                totals[row] = totals.get(row, 0) + stars
+    return totals
+
+
+def iter_json_array(path: Path):
+    """Yield the objects of a top-level JSON array without loading the whole file.
+
+    Raises ValueError for anything else, including an item that is not an object.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        started = False
+        count = 0
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if not started:
+                    if buffer[pos] != "[":
+                        raise ValueError(f"{path} is not a JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    return
+                try:
+                    item, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+                    break  # Item continues in the next chunk
+                if not isinstance(item, dict):
+                    raise ValueError(f"{path}: item {count} is {type(item).__name__}, expected a character object")
+                count += 1
+                yield item
+            if not chunk:
+                raise ValueError(f"{path} ended before the JSON array was closed")
+
+
+def _load_fresh_index(path: Path | None, data_path: Path) -> dict | None:
+    """Load an index file if it exists and is not older than the data file."""
+    if path is None or not path.exists():
+        return None
+    if data_path.exists() and path.stat().st_mtime < data_path.stat().st_mtime:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def summary(row_index: int, char: dict) -> dict:
+    """The fields printed for each result."""
+    return {
+        "row": row_index,
+        "trained_chara_id": char.get("trained_chara_id"),
+        "chara_name_en": char.get("chara_name_en"),
+        "card_name_en": char.get("card_name_en"),
+        "rank_score": char.get("rank_score"),
+    }
+
+
+def run_query(query: Query, data_path: Path, top_k: int = DEFAULT_TOP_K,
+              list_index_path: Path | None = None, spark_index_path: Path | None = None) -> tuple[list, str]:
+    """Best top_k rows as [(score, summary), ...], plus which source answered the query."""
+    rows = None
+    star_columns = None
+    source = f"streamed {data_path.name}"
+
+    # Answer from the indexes when they cover every field the query uses
+    if query.fields <= set(LIST_FIELDS):
+        list_index = _load_fresh_index(list_index_path, data_path)
+        spark_index = _load_fresh_index(spark_index_path, data_path) if query.stars_terms else None
+        if list_index and (spark_index or not query.stars_terms):
+            if not spark_index or spark_index["row_count"] == list_index["row_count"]:
+                rows = list_index["rows"]
+                star_columns = [index_stars(term, spark_index) for term in query.stars_terms]
+                source = "indexes"
+
+    if rows is None:
+        if not data_path.exists():
+            raise FileNotFoundError(data_path)
+        rows = iter_json_array(data_path)
+
+    heap = []  # min-heap of (score, -row, summary); ties keep the earlier row
+    for row_index, char in enumerate(rows):
+        if star_columns is None:
+            stars = record_stars(query, char)
+        else:
+            stars = [column.get(row_index, 0) for column in star_columns]
+
+        if query.where and not query.where(char, stars):
+            continue
+        score = query.score(char, stars)
+        entry = (score, -row_index)
+        if len(heap) < top_k:
+            heapq.heappush(heap, (*entry, summary(row_index, char)))
+        elif entry > heap[0][:2]:
+            heapq.heapreplace(heap, (*entry, summary(row_index, char)))
+
+    results = [(score, info) for score, _row, info in sorted(heap, reverse=True)]
+    return results, source
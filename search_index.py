@@ -0,0 +1,115 @@
+"""
+Trigram search index over character, costume, skill and spark names.
+
+Built by enrich_data.py next to the enriched output (search_index.json) so the
+viewer's search box and the launcher's /api/search endpoint can find matching
+characters without lowercasing every name on every keystroke.
+
+Index layout:
+    {
+      "version": 1,
+      "row_count": 1234,
+      "terms": [["special week", "name", [0, 5, 17]], ...],  # text, field, sorted rows
+      "trigrams": {"spe": [0, 42, ...], ...}                # trigram -> term numbers
+    }
+
+A query matches a term when the (lowercased) query is a substring of it. Queries
+of three or more characters narrow the candidate terms through the trigram
+postings first; shorter queries just scan the distinct terms. A query can be
+limited to one field with a prefix, e.g. "skill:groundwork" or "spark:stamina".
+"""
+
+SEARCH_INDEX_VERSION = 1
+
+SEARCH_FIELDS = ("name", "costume", "skill", "spark")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for index terms and queries."""
+    return (text or "").strip().lower()
+
+
+def trigrams(text: str) -> set[str]:
+    """All three-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def searchable_terms(char: dict):
+    """Yield (field, text) pairs for everything searchable on a character."""
+    yield "name", char.get("chara_name_en")
+    yield "costume", char.get("costume_name_en")
+    yield "costume", char.get("card_name_en")
+    for skill in char.get("skill_array", []):
+        yield "skill", skill.get("skill_name_en")
+    for spark in char.get("spark_array_enriched", []):
+        yield "spark", spark.get("spark_name_en")
+
+
+def build_search_index(characters: list[dict]) -> dict:
+    """Build the trigram search index for a list of enriched characters."""
+    term_numbers = {}
+    terms = []
+
+    for row, char in enumerate(characters):
+        for field, text in searchable_terms(char):
+            text = normalize_text(text)
+            if not text:
+                continue
+            key = (text, field)
+            number = term_numbers.get(key)
+            if number is None:
+                number = term_numbers[key] = len(terms)
+                terms.append([text, field, []])
+            rows = terms[number][2]
+            if not rows or rows[-1] != row:
+                rows.append(row)
+
+    grams = {}
+    for number, (text, _field, _rows) in enumerate(terms):
+        for gram in trigrams(text):
+            grams.setdefault(gram, []).append(number)
+
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "row_count": len(characters),
+        "terms": terms,
+        "trigrams": grams,
+    }
+
+
+def parse_query(query: str) -> tuple[str, str | None]:
+    """Split an optional "field:" prefix off a query."""
+    text = normalize_text(query)
+    field, sep, rest = text.partition(":")
+    if sep and field in SEARCH_FIELDS:
+        return rest.strip(), field
+    return text, None
+
+
+def matching_terms(index: dict, text: str) -> list[int]:
+    """Numbers of the terms containing text."""
+    terms = index["terms"]
+    if len(text) < 3:
+        return [n for n, term in enumerate(terms) if text in term[0]]
+
+    candidates = None
+    # Intersect the shortest posting lists first
+    for posting in sorted((index["trigrams"].get(g, []) for g in trigrams(text)), key=len):
+        candidates = set(posting) if candidates is None else candidates.intersection(posting)
+        if not candidates:
+            return []
+    return sorted(n for n in candidates if text in terms[n][0])
+
+
+def search(index: dict, query: str) -> list[int]:
+    """Sorted rows matching a search query (all rows for an empty query)."""
+    text, field = parse_query(query)
+    if not text:
+        return list(range(index["row_count"]))
+
+    rows = set()
+    for number in matching_terms(index, text):
+        _text, term_field, term_rows = index["terms"][number]
+        if field is None or term_field == field:
+            rows.update(term_rows)
+    return sorted(rows)
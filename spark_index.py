@@ -0,0 +1,175 @@
+"""
+Inverted spark index for enriched veteran data.
+
+Built by enrich_data.py next to the enriched output (spark_index.json) so the
+viewer and launcher can answer spark filters and protection rules from posting
+lists instead of rescanning every character's sparks.
+
+Index layout:
+    {
+      "version": 1,
+      "row_count": 1234,
+      "names": {"stamina": [201, 202, 203], ...},     # normalized name -> spark IDs
+      "postings": {"201": [[row, stars, scope], ...]}  # spark ID -> sorted by row
+    }
+
+Rows are positions in the enriched character list. Scope tells where the spark
+came from: 0 = the veteran itself, 1 = a direct parent, 2 = a grandparent.
+"""
+
+SPARK_INDEX_VERSION = 1
+
+SCOPE_OWN = 0
+SCOPE_PARENT = 1
+SCOPE_GRANDPARENT = 2
+
+# succession_chara_array position_id values for the two direct parents
+PARENT_POSITIONS = (10, 20)
+
+# Spark ID ranges used by the viewer's filter modal (inclusive)
+ATTRIBUTE_SPARK_RANGES = {
+    "speed": (100, 199), "stamina": (200, 299), "power": (300, 399),
+    "guts": (400, 499), "wit": (500, 599),
+}
+APTITUDE_SPARK_RANGES = {
+    "turf": (1100, 1199), "dirt": (1200, 1299),
+    "sprint": (3100, 3199), "mile": (3200, 3299), "medium": (3300, 3399), "long": (3400, 3499),
+    "front": (2100, 2199), "pace": (2200, 2299), "late": (2300, 2399), "end": (2400, 2499),
+}
+UNIQUE_SPARK_RANGE = (10000000, 19999999)
+
+# Every range above by name, for tools that take a spark category as text
+SPARK_CATEGORIES = {**ATTRIBUTE_SPARK_RANGES, **APTITUDE_SPARK_RANGES, "unique": UNIQUE_SPARK_RANGE}
+
+
+def normalize_spark_name(name: str) -> str:
+    """Normalize a spark name for index keys and lookups."""
+    return (name or "").strip().lower()
+
+
+def spark_stars(spark_id: int) -> int:
+    """Star level encoded in the last two digits of a spark ID (0 if not 1-3)."""
+    stars = int(spark_id) % 100
+    return stars if 1 <= stars <= 3 else 0
+
+
+def build_spark_index(characters: list[dict]) -> dict:
+    """Build the inverted spark index for a list of enriched characters."""
+    names = {}
+    postings = {}
+
+    def add(row: int, spark_id, name: str | None, stars, scope: int):
+        try:
+            spark_id = int(spark_id)
+        except (TypeError, ValueError):
+            return
+        key = str(spark_id)
+        postings.setdefault(key, []).append([row, stars or spark_stars(spark_id), scope])
+        if name:
+            ids = names.setdefault(normalize_spark_name(name), [])
+            if spark_id not in ids:
+                ids.append(spark_id)
+
+    for row, char in enumerate(characters):
+        for spark in char.get("spark_array_enriched", []):
+            add(row, spark.get("spark_id"), spark.get("spark_name_en"), spark.get("stars"), SCOPE_OWN)
+
+        for parent in char.get("succession_chara_array", []):
+            scope = SCOPE_PARENT if parent.get("position_id") in PARENT_POSITIONS else SCOPE_GRANDPARENT
+            for spark in parent.get("factor_info_array", []):
+                add(row, spark.get("factor_id"), spark.get("spark_name_en"), spark.get("stars"), scope)
+
+    for ids in names.values():
+        ids.sort()
+
+    return {
+        "version": SPARK_INDEX_VERSION,
+        "row_count": len(characters),
+        "names": names,
+        "postings": postings,
+    }
+
+
+def rows_in_ranges(index: dict, ranges: list[tuple[int, int]], scopes: set[int], min_stars: int = 0) -> set[int]:
+    """Union of rows holding any spark whose ID falls in one of the ranges."""
+    rows = set()
+    for key, posting in index["postings"].items():
+        spark_id = int(key)
+        if not any(lo <= spark_id <= hi for lo, hi in ranges):
+            continue
+        for row, stars, scope in posting:
+            if scope in scopes and stars >= min_stars:
+                rows.add(row)
+    return rows
+
+
+def stars_by_row(index: dict, name_query: str, scopes: set[int]) -> dict[int, int]:
+    """Total stars per row over every spark whose name contains name_query."""
+    query = normalize_spark_name(name_query)
+    totals = {}
+    for name, spark_ids in index["names"].items():
+        if query not in name:
+            continue
+        for spark_id in spark_ids:
+            for row, stars, scope in index["postings"].get(str(spark_id), []):
+                if scope in scopes:
+                    totals[row] = totals.get(row, 0) + stars
+    return totals
+
+
+def _min_stars(star_filter: str) -> int:
+    """Translate the viewer's star filter ('all', '2+', '3') to a minimum."""
+    return {"2+": 2, "3": 3}.get(star_filter, 0)
+
+
+def evaluate_spark_filters(index: dict, filters: dict) -> set[int]:
+    """Rows passing the viewer's attribute/aptitude/unique spark filters.
+
+    Mirrors passesSparkFilters in viewer.js: each enabled group must be
+    satisfied by at least one spark, parents optionally included.
+    """
+    result = set(range(index["row_count"]))
+    all_scopes = {SCOPE_OWN, SCOPE_PARENT, SCOPE_GRANDPARENT}
+
+    groups = [
+        (filters.get("attributeSparks", {}), ATTRIBUTE_SPARK_RANGES),
+        (filters.get("aptitudeSparks", {}), APTITUDE_SPARK_RANGES),
+    ]
+    for group, id_ranges in groups:
+        ranges = [id_ranges[k] for k, v in group.items() if v is True and k in id_ranges]
+        if not ranges:
+            continue
+        scopes = all_scopes if group.get("includeParents") else {SCOPE_OWN}
+        result &= rows_in_ranges(index, ranges, scopes, _min_stars(group.get("starFilter", "all")))
+
+    unique = filters.get("uniqueSparks", {})
+    if unique.get("enabled"):
+        scopes = all_scopes if unique.get("includeParents") else {SCOPE_OWN}
+        result &= rows_in_ranges(index, [UNIQUE_SPARK_RANGE], scopes, _min_stars(unique.get("starFilter", "all")))
+
+    return result
+
+
+def evaluate_protection_rules(index: dict, rules: list[dict], logic: str = "or") -> set[int]:
+    """Rows protected by the optimizer's spark rules.
+
+    Mirrors isProtectedByRules in viewer.js: a rule matches when the summed
+    stars of sparks containing its name reach minStars, counting the
+    veteran's own sparks and, for scope 'total', its two direct parents.
+    """
+    if not rules:
+        return set()
+
+    matches = []
+    for rule in rules:
+        scopes = {SCOPE_OWN, SCOPE_PARENT} if rule.get("scope") == "total" else {SCOPE_OWN}
+        totals = stars_by_row(index, rule.get("sparkName", ""), scopes)
+        min_stars = int(rule.get("minStars", 0))
+        if min_stars <= 0:
+            matches.append(set(range(index["row_count"])))
+        else:
+            matches.append({row for row, stars in totals.items() if stars >= min_stars})
+
+    if logic == "and":
+        return set.intersection(*matches)
+    return set.union(*matches)
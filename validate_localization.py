@@ -6,15 +6,21 @@
 Validate localization against official Uma Musume Global terminology.
 
 This script checks:
-1. viewer.html UI labels for incorrect terms
+1. UI labels in viewer.html, viewer.js and the launcher's control panel
 2. enriched_data.json for non-Global translations
 
 Usage:
-    python validate_localization.py [--fix]
+    python validate_localization.py [--fix] [--full] [--no-fail]
     
-    --fix    Automatically fix issues in viewer.html
+    --fix        Automatically fix issues in viewer.html
+    --full       Re-check enriched_data.json even if it is unchanged since
+                 the last run (validation_cache.json)
+    --no-fail    Exit 0 when terminology issues are found; only a file that
+                 could not be checked is an error (used by the launcher)
 """
 
+import bisect
+import hashlib
 import json
 import re
 import sys
@@ -136,163 +142,290 @@ ALL_TERM_CORRECTIONS = {
 }
 
 
+# Terms that should be exact matches in spark names
+SPARK_TERM_CORRECTIONS = {
+    # Running styles - JP terms → Global
+    "Runner": "Front Runner",
+    "Frontrunner": "Front Runner",
+    "Front-runner": "Front Runner",
+    "Nige": "Front Runner",
+    "Leader": "Pace Chaser",
+    "Senko": "Pace Chaser",
+    "Stalker": "Pace Chaser", 
+    "Betweener": "Late Surger",
+    "Sashi": "Late Surger",
+    "Chaser": "End Closer",
+    "Oikomi": "End Closer",
+    # Distances - incorrect → Global
+    "Short": "Sprint",
+    "Short Distance": "Sprint",
+    "Mid-Distance": "Medium",
+    "Middle Distance": "Medium",
+    # Stats - incorrect → Global (Wit is correct)
+    "Wisdom": "Wit",
+    "Int": "Wit",
+    "Intelligence": "Wit",
+}
+
+# Terms to check in epithet names (support bonuses)
+# Note: "Wit Bonus" and "Wit Cap Up" are CORRECT Global terms
+# Use exact match to avoid false positives (e.g., "Skill Point Bonus" contains "int bonus" as substring)
+EPITHET_TERM_CORRECTIONS = {
+    "Wisdom Bonus": "Wit Bonus",
+    "Wisdom Cap Up": "Wit Cap Up",
+    "Wiz Bonus": "Wit Bonus",
+    "Int Bonus": "Wit Bonus",
+    "Int Cap Up": "Wit Cap Up",
+}
+
+# Terms flagged in UI text (labels, not property keys)
+UI_TERM_CORRECTIONS = {
+    # Running styles - JP terms that should use Global terms
+    "Runner": "Front Runner",
+    "Frontrunner": "Front Runner",
+    "Front-runner": "Front Runner",
+    "Leader": "Pace Chaser",
+    "Stalker": "Pace Chaser",
+    "Betweener": "Late Surger",
+    "Chaser": "End Closer",
+    # Distances - only flag incorrect ones
+    "Short": "Sprint",
+    "Mid-Distance": "Medium",
+    "Middle": "Medium",
+    # Stats
+    "Wisdom": "Wit",
+}
+
+_UI_TERMS = "|".join(re.escape(term) for term in sorted(UI_TERM_CORRECTIONS, key=len, reverse=True))
+
+# One alternation for every term: a whole HTML text node in any case
+# (<span class="aptitude-label">Stalker</span>), or a whole string literal
+# in exact case ('Stalker', "Stalker", `Stalker`) - lowercase literals are keys
+UI_TERM_PATTERN = re.compile(
+    rf">\s*(?P<node>(?i:{_UI_TERMS}))\s*<|(?P<quote>['\"`])(?P<literal>{_UI_TERMS})(?P=quote)"
+)
+UI_TERM_LOOKUP = {term.casefold(): correct for term, correct in UI_TERM_CORRECTIONS.items()}
+
+# Cached findings are only reused under the same correction tables
+RULES_VERSION = hashlib.sha256(
+    json.dumps([SPARK_TERM_CORRECTIONS, EPITHET_TERM_CORRECTIONS], sort_keys=True).encode()
+).hexdigest()[:16]
+VALIDATION_CACHE_VERSION = 2
+
+# Case-folded term -> (term, correction), so each name is checked with one lookup
+SPARK_TERM_LOOKUP = {term.casefold(): (term, correct) for term, correct in SPARK_TERM_CORRECTIONS.items()}
+EPITHET_TERM_LOOKUP = {term.casefold(): (term, correct) for term, correct in EPITHET_TERM_CORRECTIONS.items()}
+
 # =============================================================================
 # Validation Functions
 # =============================================================================
 
-def check_viewer_html() -> list[dict]:
-    """Check viewer.html for incorrect terminology in UI labels."""
+def scan_ui_text(text: str, file_name: str, start: int = 0, end: int | None = None) -> list[dict]:
+    """Find wrong UI terms in text[start:end] in one pass, with file/line/column."""
+    line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
     issues = []
-    viewer_path = SCRIPT_DIR / "viewer.html"
-    
-    if not viewer_path.exists():
-        return [{"file": "viewer.html", "issue": "File not found"}]
-    
-    content = viewer_path.read_text(encoding="utf-8")
-    lines = content.split('\n')
-    
-    # Only check these specific terms that are likely UI labels (not property keys)
-    ui_term_corrections = {
-        # Running styles - JP terms that should use Global terms
-        "Runner": "Front Runner",
-        "Frontrunner": "Front Runner",
-        "Front-runner": "Front Runner",
-        "Leader": "Pace Chaser",
-        "Stalker": "Pace Chaser",
-        "Betweener": "Late Surger",
-        "Chaser": "End Closer",
-        # Distances - only flag incorrect ones
-        "Short": "Sprint",
-        "Mid-Distance": "Medium",
-        "Middle": "Medium",
-        # Stats
-        "Wisdom": "Wit",
-    }
-    
-    for line_num, line in enumerate(lines, 1):
-        for term, correct in ui_term_corrections.items():
-            # Only match as standalone UI labels (in span tags with aptitude-label class)
-            pattern = rf'aptitude-label["\']?>({re.escape(term)})<'
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                found_term = match.group(1)
-                if found_term.lower() == term.lower():
-                    issues.append({
-                        "file": "viewer.html",
-                        "line": line_num,
-                        "found": found_term,
-                        "expected": correct,
-                        "context": line.strip()[:80],
-                    })
-    
+    for match in UI_TERM_PATTERN.finditer(text, start, len(text) if end is None else end):
+        group = "node" if match.group("node") else "literal"
+        found = match.group(group)
+        offset = match.start(group)
+        line = bisect.bisect_right(line_starts, offset)
+        line_start = line_starts[line - 1]
+        line_end = text.find("\n", offset)
+        issues.append({
+            "file": file_name,
+            "line": line,
+            "column": offset - line_start + 1,
+            "found": found,
+            "expected": UI_TERM_LOOKUP[found.casefold()],
+            "context": text[line_start:line_end if line_end != -1 else len(text)].strip()[:80],
+        })
     return issues
 
 
-def check_enriched_data() -> list[dict]:
+def check_ui_files() -> list[dict]:
+    """Check viewer.html, viewer.js and the launcher's control panel for incorrect UI terms."""
+    issues = []
+    for file_name in ("viewer.html", "viewer.js", "launcher.py"):
+        path = SCRIPT_DIR / file_name
+        if not path.exists():
+            issues.append({"file": file_name, "issue": "File not found"})
+            continue
+        text = path.read_text(encoding="utf-8")
+        if file_name != "launcher.py":
+            issues.extend(scan_ui_text(text, file_name))
+            continue
+        # Only the control panel page, not the launcher's Python code
+        panel = re.search(r"CONTROL_PANEL_HTML\s*=\s*'''", text)
+        if panel is None:
+            issues.append({"file": file_name, "issue": "CONTROL_PANEL_HTML not found"})
+            continue
+        issues.extend(scan_ui_text(text, file_name, panel.end(), text.find("'''", panel.end())))
+    return issues
+
+
+def check_enriched_data(data_path: Path | None = None, full: bool = False) -> list[dict]:
     """Check enriched_data.json for non-Global terminology.
     
     Only checks spark names for exact terminology matches.
     Skill names, character names, etc. are excluded since they contain
     these terms as part of proper nouns or descriptive names.
+    
+    Findings are cached next to the data file, so an untouched file is not
+    even parsed. full=True ignores the cache and checks everything.
     """
-    issues = []
-    data_path = SCRIPT_DIR / "enriched_data.json"
+    if data_path is None:
+        data_path = SCRIPT_DIR / "enriched_data.json"
     
     if not data_path.exists():
-        return [{"file": "enriched_data.json", "issue": "File not found"}]
+        return [{"file": data_path.name, "issue": "File not found"}]
+    
+    cache_path = validation_cache_path(data_path)
+    stat = data_path.stat()
+    signature = [stat.st_size, stat.st_mtime_ns]
+    cache = {} if full else load_validation_cache(cache_path)
+    if cache.get("file") == signature:
+        print("  Unchanged since the last check, using cached results")
+        return cache["issues"]
     
     try:
         with open(data_path, "r", encoding="utf-8") as f:
             data = json.load(f)
     except json.JSONDecodeError as e:
-        return [{"file": "enriched_data.json", "issue": f"Invalid JSON: {e}"}]
+        return [{"file": data_path.name, "issue": f"Invalid JSON: {e}"}]
     
     if not isinstance(data, list):
-        return [{"file": "enriched_data.json", "issue": "Expected array of characters"}]
-    
-    # Terms that should be exact matches in spark names
-    spark_term_corrections = {
-        # Running styles - JP terms → Global
-        "Runner": "Front Runner",
-        "Frontrunner": "Front Runner",
-        "Front-runner": "Front Runner",
-        "Nige": "Front Runner",
-        "Leader": "Pace Chaser",
-        "Senko": "Pace Chaser",
-        "Stalker": "Pace Chaser", 
-        "Betweener": "Late Surger",
-        "Sashi": "Late Surger",
-        "Chaser": "End Closer",
-        "Oikomi": "End Closer",
-        # Distances - incorrect → Global
-        "Short": "Sprint",
-        "Short Distance": "Sprint",
-        "Mid-Distance": "Medium",
-        "Middle Distance": "Medium",
-        # Stats - incorrect → Global (Wit is correct)
-        "Wisdom": "Wit",
-        "Int": "Wit",
-        "Intelligence": "Wit",
-    }
+        return [{"file": data_path.name, "issue": "Expected array of characters"}]
     
-    # Terms to check in epithet names (support bonuses)
-    # Note: "Wit Bonus" and "Wit Cap Up" are CORRECT Global terms
-    # Use exact match to avoid false positives (e.g., "Skill Point Bonus" contains "int bonus" as substring)
-    epithet_term_corrections = {
-        "Wisdom Bonus": "Wit Bonus",
-        "Wisdom Cap Up": "Wit Cap Up",
-        "Wiz Bonus": "Wit Bonus",
-        "Int Bonus": "Wit Bonus",
-        "Int Cap Up": "Wit Cap Up",
-    }
+    issues = check_characters(data, data_path.name)
+    save_validation_cache(cache_path, _cache_contents(signature, None, issues))
+    return issues
+
+
+def validation_cache_path(data_path: Path) -> Path:
+    """validation_cache.json beside enriched_data.json, <stem>.validation_cache.json otherwise."""
+    if data_path.stem == "enriched_data":
+        return data_path.parent / "validation_cache.json"
+    return data_path.parent / f"{data_path.stem}.validation_cache.json"
+
+
+def load_validation_cache(cache_path: Path) -> dict:
+    """The cached findings with the file signature and content hash they are for.
     
+    Returns {} when the cache is missing or was written for other rules.
+    """
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != VALIDATION_CACHE_VERSION or cache.get("rules") != RULES_VERSION:
+        return {}
+    return cache
+
+
+def _cache_contents(signature: list, data_hash: str | None, issues: list[dict]) -> dict:
+    return {
+        "version": VALIDATION_CACHE_VERSION,
+        "rules": RULES_VERSION,
+        "file": signature,
+        "content_hash": data_hash,
+        "issues": issues,
+    }
+
+
+def save_validation_cache(cache_path: Path, cache: dict):
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"  [!] Could not write {cache_path.name}: {e}")
+
+
+def _term_matcher(lookup: dict):
+    """Exact, case-insensitive term check with one result cached per distinct name."""
+    cache = {}
+    
+    def match(value: str):
+        try:
+            return cache[value]
+        except KeyError:
+            result = cache[value] = lookup.get(value.strip().casefold())
+            return result
+    
+    return match
+
+
+def _name_checks() -> tuple:
+    """(list key, name key, field label, matcher, issue key prefix) for each checked name list."""
+    return (
+        ("spark_array_enriched", "spark_name_en", "spark_array_enriched[].spark_name_en",
+         _term_matcher(SPARK_TERM_LOOKUP), "spark"),
+        ("nickname_array_enriched", "nickname_name_en", "nickname_array_enriched[].nickname_name_en",
+         _term_matcher(EPITHET_TERM_LOOKUP), "epithet"),
+    )
+
+
+def _record_findings(char: dict, checks: tuple) -> list:
+    """Wrong terms in one record: [[prefix, field, term, correct, sample value], ...]."""
+    findings = []
+    for list_key, name_key, field, match, prefix in checks:
+        for entry in char.get(list_key, ()):
+            if not isinstance(entry, dict):
+                continue
+            value = entry.get(name_key)
+            if not value:
+                continue
+            found = match(value)
+            if found is not None:
+                findings.append([prefix, field, found[0], found[1], value[:50]])
+    return findings
+
+
+def _merge_findings(per_record, file_name: str) -> list[dict]:
+    """One sample issue per wrong term, from (index, findings) pairs in record order."""
     sample_issues = {}
-    
-    for idx, char in enumerate(data):
-        # Check spark names for exact terminology
-        sparks = char.get("spark_array_enriched", [])
-        for spark in sparks:
-            if isinstance(spark, dict):
-                value = spark.get("spark_name_en", "")
-                if value:
-                    # Check for exact matches
-                    for term, correct in spark_term_corrections.items():
-                        if value.strip().lower() == term.lower():
-                            key = f"spark:{term}"
-                            if key not in sample_issues:
-                                sample_issues[key] = {
-                                    "file": "enriched_data.json",
-                                    "field": "spark_array_enriched[].spark_name_en",
-                                    "found": term,
-                                    "expected": correct,
-                                    "sample_value": value[:50],
-                                    "char_index": idx,
-                                }
-        
-        # Check epithet names (use EXACT match to avoid false positives)
-        # e.g., "Skill Point Bonus" contains "int bonus" as substring but is correct
-        epithets = char.get("nickname_array_enriched", [])
-        for epithet in epithets:
-            if isinstance(epithet, dict):
-                value = epithet.get("nickname_name_en", "")
-                if value:
-                    for term, correct in epithet_term_corrections.items():
-                        # Use exact match (case-insensitive) to avoid substring false positives
-                        if value.strip().lower() == term.lower():
-                            key = f"epithet:{term}"
-                            if key not in sample_issues:
-                                sample_issues[key] = {
-                                    "file": "enriched_data.json",
-                                    "field": "nickname_array_enriched[].nickname_name_en",
-                                    "found": term,
-                                    "expected": correct,
-                                    "sample_value": value[:50],
-                                    "char_index": idx,
-                                }
-    
+    for idx, findings in per_record:
+        for prefix, field, term, correct, sample in findings:
+            key = f"{prefix}:{term}"
+            if key not in sample_issues:
+                sample_issues[key] = {
+                    "file": file_name,
+                    "field": field,
+                    "found": term,
+                    "expected": correct,
+                    "sample_value": sample,
+                    "char_index": idx,
+                }
     return list(sample_issues.values())
 
 
+def check_characters(data, file_name: str = "enriched_data.json", data_path: Path | None = None,
+                     data_hash: str | None = None) -> list[dict]:
+    """Check already-loaded characters (any iterable) for non-Global terminology.
+    
+    Same checks as check_enriched_data(), for callers that have the records
+    in memory, such as enrich_data.py right after enriching them. Reports
+    one sample issue per wrong term found in spark and epithet names.
+    
+    data_path is the file the records were just written to: its validation
+    cache is saved so a later check_enriched_data() finds the file unchanged.
+    data_hash is enrich_data.content_hash() of the records; when the cache
+    was written for the same hash its findings are reused without a scan.
+    """
+    cache_path = validation_cache_path(data_path) if data_path is not None else None
+    cache = load_validation_cache(cache_path) if cache_path is not None and data_hash else {}
+    if cache and cache.get("content_hash") == data_hash:
+        issues = cache["issues"]
+    else:
+        checks = _name_checks()
+        issues = _merge_findings(((idx, _record_findings(char, checks)) for idx, char in enumerate(data)), file_name)
+    
+    if cache_path is not None:
+        stat = data_path.stat()
+        save_validation_cache(cache_path, _cache_contents([stat.st_size, stat.st_mtime_ns], data_hash, issues))
+    return issues
+
+
 def fix_viewer_html() -> int:
     """Fix incorrect terminology in viewer.html."""
     viewer_path = SCRIPT_DIR / "viewer.html"
@@ -373,13 +506,13 @@ def main():
     
     fix_mode = "--fix" in sys.argv
     
-    # Check viewer.html
-    print("Checking viewer.html...")
-    viewer_issues = check_viewer_html()
+    # Check UI text
+    print("Checking viewer.html, viewer.js and the launcher panel...")
+    viewer_issues = check_ui_files()
     
     # Check enriched_data.json
     print("Checking enriched_data.json...")
-    data_issues = check_enriched_data()
+    data_issues = check_enriched_data(full="--full" in sys.argv)
     
     all_issues = viewer_issues + data_issues
     
@@ -393,7 +526,7 @@ def main():
     
     for issue in all_issues:
         if "line" in issue:
-            print(f"  {issue['file']}:{issue['line']}")
+            print(f"  {issue['file']}:{issue['line']}:{issue['column']}")
             print(f"    Found: '{issue['found']}' -> Should be: '{issue['expected']}'")
             safe_print(f"    Context: {issue['context']}")
         elif "field" in issue:
@@ -414,6 +547,9 @@ def main():
     
     print_terminology_reference()
     
+    if "--no-fail" in sys.argv:
+        # Issues without a found term are files that could not be checked at all
+        return 1 if any("found" not in issue for issue in all_issues) else 0
     return 1 if all_issues else 0
 
 
@@ -7,6 +7,37 @@ let filteredData = [];
 let selectedIndex = 0;
 let byTrainedId = {};
 
+// Optional inverted spark index (spark_index.json, written by enrich_data.py)
+let sparkIndex = null;
+let sparkFilterCache = { key: null, rows: null };
+let protectionCache = { key: null, rows: null };
+
+// Optional trigram search index (search_index.json)
+let searchIndex = null;
+let searchCache = { key: null, rows: null };
+
+// Optional near-duplicate clusters for the optimizer (duplicates.json)
+let duplicateReport = null;
+
+// On-demand records: list rows from list_index.json and/or shards from
+// enriched_shards/manifest.json stand in until a full record is needed
+let shardManifest = null;
+// Set when shard rows were filled in without re-sorting the list
+let listStale = false;
+let shardLoads = {};
+let shardObserver = null;
+let listRefreshTimer = null;
+let detailRequest = 0;
+
+// Served by the launcher, the list is filtered, sorted and paged by its
+// /api/characters endpoint; data then only holds rows fetched so far
+const LIST_PAGE_SIZE = 200;
+let listApi = false;
+let listTotal = 0;
+let listRequest = 0;
+let listLoading = false;
+let allRecordsLoaded = false;
+
 // Sort state - load from localStorage
 let sortField = localStorage.getItem('uma_sortField') || 'rank_score';
 let sortAsc = localStorage.getItem('uma_sortAsc') === 'true';
@@ -122,9 +153,29 @@ function saveFilters() {
 
 async function loadData() {
   try {
-    const response = await fetch('enriched_data.json');
-    if (!response.ok) throw new Error('Failed to load');
-    data = await response.json();
+    if (await loadListApi()) {
+      render();
+      return;
+    }
+    
+    const hasShards = await loadShardManifest();
+    const listIndex = await fetchOptionalJson('list_index.json');
+    
+    // With shards, the list index must be built from the same data (same row
+    // count can still mean different veterans)
+    if (listIndex && (!hasShards || (listIndex.content_hash && listIndex.content_hash === shardManifest.content_hash))) {
+      // Compact list rows now, full records per character on selection
+      data = listIndex.rows.map((row, i) => ({
+        ...row,
+        _partial: true,
+        _shard: hasShards ? data[i]._shard : undefined
+      }));
+    } else if (hasShards) {
+      // Only the first shard is needed for the first paint
+      await loadShard(0);
+    } else {
+      data = await fetchJson('enriched_data.json');
+    }
     
     // Build lookup map
     byTrainedId = {};
@@ -134,6 +185,11 @@ async function loadData() {
       }
     });
     
+    await loadIndexes();
+    // List rows carry no sparks, so spark filters need the spark index
+    if (!sparkIndex && data.some(isPartial)) {
+      await ensureAllRecords();
+    }
     render();
   } catch (err) {
     document.getElementById('app').innerHTML = `
@@ -144,6 +200,236 @@ async function loadData() {
   }
 }
 
+// Use the launcher's list API when there is one (static hosting has no /api)
+async function loadListApi() {
+  const page = await fetchOptionalJson('api/characters?limit=0');
+  if (!page || page.status !== 'ok') return false;
+  
+  listApi = true;
+  data = new Array(page.row_count);
+  byTrainedId = {};
+  // Spark and search indexes stay on the server; duplicate clusters are small
+  duplicateReport = await loadIndexFile('duplicates.json');
+  return true;
+}
+
+async function fetchJson(url) {
+  const response = await fetch(url);
+  if (!response.ok) throw new Error(`Failed to load ${url}`);
+  return response.json();
+}
+
+// Fetch an optional file; null if it is missing or unreadable
+async function fetchOptionalJson(url) {
+  try {
+    return await fetchJson(url);
+  } catch (err) {
+    return null;
+  }
+}
+
+// ============================================
+// ON-DEMAND RECORDS
+// ============================================
+// Until its full record is loaded, a row in `data` is either a list row from
+// list_index.json (_partial: list fields only) or, in sharded mode without a
+// list index, a stub holding only its trained_chara_id (_stub).
+
+function isStub(char) {
+  return !!char && char._stub === true;
+}
+
+function isPartial(char) {
+  return !!char && (char._partial === true || char._stub === true);
+}
+
+function setRecord(i, c) {
+  data[i] = c;
+  if (c.trained_chara_id) {
+    byTrainedId[c.trained_chara_id] = { char: c, index: i };
+  }
+}
+
+async function loadShardManifest() {
+  shardManifest = await fetchOptionalJson('enriched_shards/manifest.json');
+  if (!shardManifest) return false;
+  
+  shardLoads = {};
+  data = new Array(shardManifest.row_count);
+  shardManifest.shards.forEach((shard, k) => {
+    for (let i = shard.start; i < shard.end; i++) {
+      data[i] = { _stub: true, _shard: k, _row: i, trained_chara_id: shardManifest.ids[i] };
+    }
+  });
+  return true;
+}
+
+function loadShard(k) {
+  if (!shardLoads[k]) {
+    const shard = shardManifest.shards[k];
+    // The content hash doubles as a cache key, so unchanged shards come from the browser cache
+    shardLoads[k] = fetchJson(`enriched_shards/${shard.file}?v=${shard.sha256.slice(0, 16)}`)
+      .then(records => {
+        records.forEach((c, j) => setRecord(shard.start + j, c));
+        showLoadedRows(k);
+      })
+      .catch(err => {
+        delete shardLoads[k];
+        throw err;
+      });
+  }
+  return shardLoads[k];
+}
+
+// Fetch one character's detail blob (details/<trained_chara_id>.json)
+async function loadDetailBlob(i) {
+  const row = data[i];
+  if (listApi) {
+    const detail = await fetchJson(`api/characters/${row.trained_chara_id}`);
+    if (detail.status !== 'ok') throw new Error(detail.message);
+    // Parents and grandparents come along, so the family tree has names
+    addListRows(detail.ancestors);
+    if (data[i] === row) setRecord(i, detail.record);
+    return;
+  }
+  const record = await fetchJson(`details/${row.trained_chara_id}.json?v=${row.detail_hash || ''}`);
+  if (data[i] === row) setRecord(i, record);
+}
+
+// Load full records for the given rows, from shards when sharded
+function ensureRows(rows) {
+  const pending = rows.filter(i => isPartial(data[i]));
+  if (shardManifest) {
+    const shards = new Set(pending.map(i => data[i]._shard));
+    return Promise.all([...shards].map(loadShard));
+  }
+  return Promise.all(pending.map(loadDetailBlob));
+}
+
+async function ensureAllRecords() {
+  // In list API mode, rows never fetched are holes in data
+  if (listApi ? allRecordsLoaded : !data.some(isPartial)) return;
+  if (shardManifest) {
+    await Promise.all(shardManifest.shards.map((_, k) => loadShard(k)));
+    return;
+  }
+  // One full download beats thousands of detail blobs
+  const records = await fetchJson('enriched_data.json');
+  if (records.length !== data.length) {
+    const source = listApi ? 'the launcher\'s /api/characters row_count' : 'list_index.json';
+    throw new Error(`enriched_data.json has ${records.length} records, ${source} says ${data.length}`);
+  }
+  records.forEach((c, i) => setRecord(i, c));
+  allRecordsLoaded = true;
+  scheduleListRefresh();
+}
+
+// Swap a loaded shard's placeholders for its rows where they stand. The list
+// is only re-filtered and re-sorted when asked, so nothing moves while scrolling.
+function showLoadedRows(k) {
+  const list = document.getElementById('list');
+  if (!list || !filteredData.some(c => isStub(c) && c._shard === k)) return;
+  
+  filteredData = filteredData.map(c => (isStub(c) && c._shard === k ? data[c._row] : c));
+  list.querySelectorAll(`.character-item.pending[data-shard="${k}"]`).forEach(el => {
+    const row = parseInt(el.dataset.index);
+    const holder = document.createElement('div');
+    holder.innerHTML = listItemHtml(data[row], row);
+    const item = holder.firstElementChild;
+    bindListItem(item);
+    if (shardObserver) shardObserver.unobserve(el);
+    el.replaceWith(item);
+  });
+  listStale = true;
+  updateListCount();
+}
+
+// Re-filter the list once after a burst of record loads
+function scheduleListRefresh() {
+  if (listRefreshTimer) return;
+  listRefreshTimer = setTimeout(() => {
+    listRefreshTimer = null;
+    filterAndSortList();
+  }, 50);
+}
+
+function parentRows(char) {
+  return [char.succession_trained_chara_id_1, char.succession_trained_chara_id_2]
+    .map(id => byTrainedId[id]?.index)
+    .filter(i => i !== undefined);
+}
+
+// Show a character once its full record is loaded. Stub ancestors are loaded
+// too so the family tree has names; list rows already carry them.
+async function showDetail(index) {
+  const request = ++detailRequest;
+  if (isPartial(data[index])) {
+    try {
+      await ensureRows([index]);
+    } catch (err) {
+      if (request === detailRequest) {
+        document.getElementById('detail').innerHTML = `<div class="empty-state">// failed to load character details</div>`;
+      }
+      return;
+    }
+  }
+  if (shardManifest && data[index]) {
+    try {
+      const parents = parentRows(data[index]);
+      await ensureRows(parents.filter(i => isStub(data[i])));
+      const grandparents = parents.flatMap(i => parentRows(data[i]));
+      await ensureRows(grandparents.filter(i => isStub(data[i])));
+    } catch (err) {
+      // Render whatever is loaded; missing ancestors show as external
+    }
+  }
+  // A newer selection may have finished first
+  if (request === detailRequest) renderDetail(data[index]);
+}
+
+// Load shards as their placeholder rows scroll into view
+function observePendingRows(list) {
+  if (shardObserver) shardObserver.disconnect();
+  if (!shardManifest) return;
+  
+  shardObserver = new IntersectionObserver(entries => {
+    const shards = new Set(entries
+      .filter(e => e.isIntersecting)
+      .map(e => parseInt(e.target.dataset.shard)));
+    if (shards.size === 0) return;
+    // Each load refreshes the list when it lands
+    shards.forEach(k => loadShard(k).catch(() => {}));
+  }, { root: list, rootMargin: '200px' });
+  
+  list.querySelectorAll('.character-item.pending').forEach(el => shardObserver.observe(el));
+}
+
+// Fetch an optional index file; null if missing or built for different data
+async function loadIndexFile(url) {
+  const index = await fetchOptionalJson(url);
+  return index && index.row_count === data.length ? index : null;
+}
+
+async function loadIndexes() {
+  sparkFilterCache = { key: null, rows: null };
+  protectionCache = { key: null, rows: null };
+  searchCache = { key: null, rows: null };
+  
+  const [spark, search, duplicates] = await Promise.all([
+    loadIndexFile('spark_index.json'),
+    loadIndexFile('search_index.json'),
+    loadIndexFile('duplicates.json')
+  ]);
+  
+  if (spark) {
+    spark.ids = Object.keys(spark.postings).map(Number);
+    spark.nameList = Object.entries(spark.names);
+  }
+  sparkIndex = spark;
+  searchIndex = search;
+  duplicateReport = duplicates;
+}
+
 // ============================================
 // VIEW MODE
 // ============================================
@@ -155,7 +441,7 @@ function toggleViewMode() {
   // Re-render list to show spark preview in parent mode
   filterAndSortList();
   if (selectedIndex >= 0 && data[selectedIndex]) {
-    renderDetail(data[selectedIndex]);
+    showDetail(selectedIndex);
   }
 }
 
@@ -190,7 +476,7 @@ function isAptitudeGood(value) {
   return value >= 7;
 }
 
-function passesFilters(char) {
+function passesFilters(char, rowIndex) {
   // Track filter - must have at least one checked track with A+ aptitude
   const trackChecks = [];
   if (filters.track.turf) trackChecks.push(isAptitudeGood(char.proper_ground_turf));
@@ -214,11 +500,86 @@ function passesFilters(char) {
   if (styleChecks.length > 0 && !styleChecks.some(v => v)) return false;
   
   // Spark filters
-  if (!passesSparkFilters(char)) return false;
+  if (sparkIndex && rowIndex !== undefined) {
+    const rows = getSparkFilterRows();
+    if (rows && !rows.has(rowIndex)) return false;
+  } else if (!passesSparkFilters(char)) {
+    return false;
+  }
   
   return true;
 }
 
+// Spark ID ranges for the filter modal's spark groups
+const ATTRIBUTE_SPARK_IDS = { speed: [100, 199], stamina: [200, 299], power: [300, 399], guts: [400, 499], wit: [500, 599] };
+const APTITUDE_SPARK_IDS = {
+  turf: [1100, 1199], dirt: [1200, 1299],
+  sprint: [3100, 3199], mile: [3200, 3299], medium: [3300, 3399], long: [3400, 3499],
+  front: [2100, 2199], pace: [2200, 2299], late: [2300, 2399], end: [2400, 2499]
+};
+const UNIQUE_SPARK_IDS = [10000000, 19999999];
+
+// Spark index scopes: 0 = own spark, 1 = direct parent, 2 = grandparent
+const SCOPE_OWN = 0;
+const SCOPE_PARENT = 1;
+
+function starFilterMinimum(filter) {
+  if (filter === '3') return 3;
+  if (filter === '2+') return 2;
+  return 0;
+}
+
+function intersectRows(a, b) {
+  const [small, large] = a.size <= b.size ? [a, b] : [b, a];
+  const result = new Set();
+  for (const row of small) {
+    if (large.has(row)) result.add(row);
+  }
+  return result;
+}
+
+// Union of rows holding a spark whose ID falls in one of the ranges
+function sparkRowsInRanges(ranges, starFilter, includeParents) {
+  const minStars = starFilterMinimum(starFilter);
+  const rows = new Set();
+  for (const id of sparkIndex.ids) {
+    if (!ranges.some(([min, max]) => id >= min && id <= max)) continue;
+    for (const [row, stars, scope] of sparkIndex.postings[id]) {
+      if ((includeParents || scope === SCOPE_OWN) && stars >= minStars) rows.add(row);
+    }
+  }
+  return rows;
+}
+
+// Rows passing the spark filters, or null when no spark filter is active.
+// Same rules as passesSparkFilters, answered from the spark index.
+function getSparkFilterRows() {
+  const key = JSON.stringify([filters.attributeSparks, filters.aptitudeSparks, filters.uniqueSparks]);
+  if (sparkFilterCache.key === key) return sparkFilterCache.rows;
+  
+  let rows = null;
+  const restrict = (groupRows) => {
+    rows = rows ? intersectRows(rows, groupRows) : groupRows;
+  };
+  
+  [[filters.attributeSparks, ATTRIBUTE_SPARK_IDS], [filters.aptitudeSparks, APTITUDE_SPARK_IDS]].forEach(([group, ids]) => {
+    const ranges = Object.entries(group)
+      .filter(([k, v]) => v === true && ids[k])
+      .map(([k]) => ids[k]);
+    if (ranges.length > 0) {
+      restrict(sparkRowsInRanges(ranges, group.starFilter, group.includeParents));
+    }
+  });
+  
+  const uniqueFilter = filters.uniqueSparks;
+  if (uniqueFilter.enabled) {
+    restrict(sparkRowsInRanges([UNIQUE_SPARK_IDS], uniqueFilter.starFilter, uniqueFilter.includeParents));
+  }
+  
+  sparkFilterCache = { key, rows };
+  return rows;
+}
+
 function passesSparkFilters(char) {
   const sparks = char.spark_array_enriched || [];
   let allSparks = [...sparks];
@@ -238,7 +599,7 @@ function passesSparkFilters(char) {
   
   // Attribute sparks filter (Speed, Stamina, Power, Guts, Wit)
   const attrFilter = filters.attributeSparks;
-  const attrIds = { speed: [100, 199], stamina: [200, 299], power: [300, 399], guts: [400, 499], wit: [500, 599] };
+  const attrIds = ATTRIBUTE_SPARK_IDS;
   const checkedAttrs = Object.entries(attrFilter)
     .filter(([k, v]) => v === true && attrIds[k])
     .map(([k]) => attrIds[k]);
@@ -256,11 +617,7 @@ function passesSparkFilters(char) {
   
   // Aptitude sparks filter (Ground + Distance + Style sparks)
   const aptFilter = filters.aptitudeSparks;
-  const aptIds = {
-    turf: [1100, 1199], dirt: [1200, 1299],
-    sprint: [3100, 3199], mile: [3200, 3299], medium: [3300, 3399], long: [3400, 3499],
-    front: [2100, 2199], pace: [2200, 2299], late: [2300, 2399], end: [2400, 2499]
-  };
+  const aptIds = APTITUDE_SPARK_IDS;
   const checkedApts = Object.entries(aptFilter)
     .filter(([k, v]) => v === true && aptIds[k])
     .map(([k]) => aptIds[k]);
@@ -352,7 +709,7 @@ function render() {
           </div>
         </div>
         <div class="search-box">
-          <input type="text" id="search" placeholder="search..." autocomplete="off">
+          <input type="text" id="search" placeholder="search... (skill:, spark:)" autocomplete="off">
         </div>
       </div>
       <div class="controls-row">
@@ -447,12 +804,21 @@ function render() {
   document.getElementById('filter-apply').addEventListener('click', applyFilters);
   document.getElementById('filter-reset').addEventListener('click', resetFilters);
   
+  // Next page of a list API list when scrolled near its end
+  document.getElementById('list').addEventListener('scroll', (e) => {
+    const list = e.currentTarget;
+    if (listApi && list.scrollTop + list.clientHeight >= list.scrollHeight - 400) {
+      fetchListPage(false);
+    }
+  });
+  
   // Optimization listeners
   attachOptimizeListeners();
   
   filterAndSortList();
-  if (data.length > 0) {
-    renderDetail(data[0]);
+  // The list API shows its first row once the first page is in
+  if (data.length > 0 && !listApi) {
+    showDetail(0);
   }
 }
 
@@ -704,22 +1070,160 @@ function updateSortDirButton() {
   }
 }
 
+// ============================================
+// SEARCH
+// ============================================
+
+const SEARCH_FIELDS = ['name', 'costume', 'skill', 'spark'];
+
+// Split an optional "field:" prefix (e.g. "skill:groundwork") off the query
+function parseSearchQuery(query) {
+  const text = query.trim().toLowerCase();
+  const sep = text.indexOf(':');
+  if (sep > 0 && SEARCH_FIELDS.includes(text.slice(0, sep))) {
+    return { text: text.slice(sep + 1).trim(), field: text.slice(0, sep) };
+  }
+  return { text, field: null };
+}
+
+function searchTrigrams(text) {
+  const grams = new Set();
+  for (let i = 0; i + 3 <= text.length; i++) grams.add(text.slice(i, i + 3));
+  return [...grams];
+}
+
+// Rows matching the query via the search index, or null without an index
+function getSearchRows(query) {
+  if (!searchIndex) return null;
+  if (searchCache.key === query) return searchCache.rows;
+  
+  const { text, field } = parseSearchQuery(query);
+  const terms = searchIndex.terms;
+  let candidates;
+  if (!text) {
+    searchCache = { key: query, rows: new Set(data.keys()) };
+    return searchCache.rows;
+  }
+  if (text.length < 3) {
+    candidates = terms.keys();
+  } else {
+    // Intersect trigram postings, shortest first
+    const postings = searchTrigrams(text)
+      .map(g => searchIndex.trigrams[g] || [])
+      .sort((a, b) => a.length - b.length);
+    let set = new Set(postings[0]);
+    for (let i = 1; i < postings.length && set.size > 0; i++) {
+      set = intersectRows(set, new Set(postings[i]));
+    }
+    candidates = set;
+  }
+  
+  const rows = new Set();
+  for (const n of candidates) {
+    const [termText, termField, termRows] = terms[n];
+    if ((field === null || termField === field) && termText.includes(text)) {
+      termRows.forEach(row => rows.add(row));
+    }
+  }
+  
+  searchCache = { key: query, rows };
+  return rows;
+}
+
+// Fallback when search_index.json is unavailable: same fields, scanned directly
+function matchesSearch(char, query) {
+  const { text, field } = parseSearchQuery(query);
+  if (!text) return true;
+  const values = {
+    name: [char.chara_name_en],
+    costume: [char.costume_name_en, char.card_name_en],
+    skill: (char.skill_array || []).map(s => s.skill_name_en),
+    spark: (char.spark_array_enriched || []).map(s => s.spark_name_en)
+  };
+  return (field ? [field] : SEARCH_FIELDS).some(f =>
+    values[f].some(v => (v || '').toLowerCase().includes(text)));
+}
+
+// List rows from /api/characters; rows not loaded yet are kept in data too
+function addListRows(rows) {
+  return rows.map(({ row, ...fields }) => {
+    const item = { ...fields, _partial: true, _row: row };
+    if (!data[row]) setRecord(row, item);
+    return item;
+  });
+}
+
+// Fetch the first page of the list (reset) or the next one while scrolling
+async function fetchListPage(reset) {
+  if (!reset && (listLoading || filteredData.length >= listTotal)) return;
+  const request = reset ? ++listRequest : listRequest;
+  listLoading = true;
+  
+  const params = new URLSearchParams({
+    filters: JSON.stringify(filters),
+    search: document.getElementById('search')?.value || '',
+    sortField,
+    sortAsc,
+    offset: reset ? 0 : filteredData.length,
+    limit: LIST_PAGE_SIZE
+  });
+  
+  try {
+    const page = await fetchJson(`api/characters?${params}`);
+    // A newer search or filter was sent meanwhile
+    if (request !== listRequest) return;
+    if (page.status !== 'ok') throw new Error(page.message);
+    
+    // Nothing selected yet: show the top of the list
+    const selectFirst = reset && !data[selectedIndex] && page.rows.length > 0;
+    const rows = addListRows(page.rows);
+    filteredData = reset ? rows : filteredData.concat(rows);
+    listTotal = page.total;
+    const countEl = document.getElementById('count-display');
+    if (countEl) {
+      countEl.textContent = `// ${listTotal} characters`;
+    }
+    if (selectFirst) selectedIndex = rows[0]._row;
+    renderList(filteredData);
+    if (selectFirst) showDetail(selectedIndex);
+  } catch (err) {
+    if (request === listRequest) {
+      const list = document.getElementById('list');
+      if (list) list.innerHTML = `<div class="empty-state">// failed to load the list</div>`;
+    }
+  } finally {
+    if (request === listRequest) listLoading = false;
+  }
+}
+
 function filterAndSortList() {
+  if (listApi) {
+    fetchListPage(true);
+    return;
+  }
+  
   const q = (document.getElementById('search')?.value || '').toLowerCase();
+  const searchRows = q.trim() ? getSearchRows(q) : null;
   
   // Apply search and filters
-  filteredData = data.filter(c => {
-    // Search filter
-    const name = (c.chara_name_en || '').toLowerCase();
-    const card = (c.card_name_en || '').toLowerCase();
-    if (!name.includes(q) && !card.includes(q)) return false;
+  filteredData = data.filter((c, i) => {
+    // Search filter (names, costumes, skills and sparks)
+    if (q.trim() && !(searchRows ? searchRows.has(i) : matchesSearch(c, q))) return false;
+    
+    // Unloaded rows stay listed until their shard arrives (spark index still applies)
+    if (isStub(c)) {
+      const sparkRows = sparkIndex ? getSparkFilterRows() : null;
+      return !sparkRows || sparkRows.has(i);
+    }
     
     // Apply filters (if any are active)
-    return passesFilters(c);
+    return passesFilters(c, i);
   });
   
-  // Sort
+  // Sort (unloaded rows last, in file order)
   filteredData.sort((a, b) => {
+    if (isStub(a) || isStub(b)) return isStub(a) - isStub(b);
+    
     let aVal = a[sortField];
     let bVal = b[sortField];
     
@@ -737,12 +1241,24 @@ function filterAndSortList() {
     return sortAsc ? aVal - bVal : bVal - aVal;
   });
   
+  listStale = false;
+  updateListCount();
+  renderList(filteredData);
+}
+
+// Rows loaded since the last sort keep their place until "re-sort" is clicked
+function updateListCount() {
   const countEl = document.getElementById('count-display');
-  if (countEl) {
-    countEl.textContent = `// ${filteredData.length} characters`;
+  if (!countEl) return;
+  countEl.textContent = `// ${filteredData.length} characters`;
+  if (listStale) {
+    const button = document.createElement('button');
+    button.className = 'list-refresh';
+    button.textContent = 're-sort';
+    button.title = 'Apply sort and filters to rows loaded since the list was drawn';
+    button.addEventListener('click', filterAndSortList);
+    countEl.append(' ', button);
   }
-  
-  renderList(filteredData);
 }
 
 // Get spark summary for parent mode list preview
@@ -773,9 +1289,10 @@ function getSparkSummary(char) {
     'Unq': { ranges: [[10000000, 19999999]], color: 'unique' } // Unique sparks
   };
   
-  const totals = {};
+  // List rows from list_index.json come with the totals precomputed
+  const totals = char.spark_summary ? { ...char.spark_summary } : {};
   
-  allSparks.forEach(s => {
+  if (!char.spark_summary) allSparks.forEach(s => {
     const id = parseInt(s.spark_id || s.factor_id) || 0;
     const stars = s.stars || 0;
     
@@ -807,32 +1324,48 @@ function renderList(chars) {
   const list = document.getElementById('list');
   if (!list) return;
   
-  const isParentMode = viewMode === 'parent';
+  const rowOf = new Map();
+  // List API rows and shard stubs carry their row number
+  if (!listApi) data.forEach((c, i) => rowOf.set(c, i));
   
-  list.innerHTML = chars.map((c, i) => {
-    let metaContent;
-    if (isParentMode) {
-      const rankScore = c.rank_score ? c.rank_score.toLocaleString() : '0';
-      metaContent = `<span class="parent-rank">${rankScore}</span><span class="spark-preview">${getSparkSummary(c)}</span>`;
-    } else {
-      metaContent = `<span class="list-score">${formatScore(c.rank_score)}</span> • ${c.wins || 0} wins`;
-    }
-    
+  list.innerHTML = chars.map(c => listItemHtml(c, c._row ?? rowOf.get(c))).join('');
+  list.querySelectorAll('.character-item').forEach(bindListItem);
+  
+  observePendingRows(list);
+}
+
+function listItemHtml(c, row) {
+  if (isStub(c)) {
     return `
-      <div class="character-item ${data.indexOf(c) === selectedIndex ? 'active' : ''}" data-index="${data.indexOf(c)}">
+      <div class="character-item pending" data-index="${row}" data-shard="${c._shard}">
+        <div class="name">loading...</div>
+        <div class="meta">&nbsp;</div>
+      </div>
+    `;
+  }
+  
+  let metaContent;
+  if (viewMode === 'parent') {
+    const rankScore = c.rank_score ? c.rank_score.toLocaleString() : '0';
+    metaContent = `<span class="parent-rank">${rankScore}</span><span class="spark-preview">${getSparkSummary(c)}</span>`;
+  } else {
+    metaContent = `<span class="list-score">${formatScore(c.rank_score)}</span> • ${c.wins || 0} wins`;
+  }
+  
+  return `
+      <div class="character-item ${row === selectedIndex ? 'active' : ''}" data-index="${row}">
         <div class="name">${c.chara_name_en || 'Unknown'}</div>
         <div class="meta">${metaContent}</div>
       </div>
     `;
-  }).join('');
-  
-  list.querySelectorAll('.character-item').forEach(el => {
-    el.addEventListener('click', () => {
-      selectedIndex = parseInt(el.dataset.index);
-      document.querySelectorAll('.character-item').forEach(e => e.classList.remove('active'));
-      el.classList.add('active');
-      renderDetail(data[selectedIndex]);
-    });
+}
+
+function bindListItem(el) {
+  el.addEventListener('click', () => {
+    selectedIndex = parseInt(el.dataset.index);
+    document.querySelectorAll('.character-item').forEach(e => e.classList.remove('active'));
+    el.classList.add('active');
+    showDetail(selectedIndex);
   });
 }
 
@@ -976,8 +1509,9 @@ function renderDetail(char) {
       selectedIndex = idx;
       document.querySelectorAll('.character-item').forEach(e => e.classList.remove('active'));
       document.querySelector(`.character-item[data-index="${idx}"]`)?.classList.add('active');
-      renderDetail(data[idx]);
-      document.getElementById('detail').scrollTop = 0;
+      showDetail(idx).then(() => {
+        document.getElementById('detail').scrollTop = 0;
+      });
     });
   });
 }
@@ -1464,9 +1998,50 @@ function calculateSparkScore(char) {
   return { total: totalScore, breakdown };
 }
 
+// Rows protected by the current rules, answered from the spark index
+function getProtectedRows() {
+  const key = JSON.stringify([protectionRules, protectionLogic]);
+  if (protectionCache.key === key) return protectionCache.rows;
+  
+  const ruleRows = protectionRules.map(rule => {
+    const searchName = rule.sparkName.toLowerCase();
+    const totals = new Map();
+    for (const [name, ids] of sparkIndex.nameList) {
+      if (!name.includes(searchName)) continue;
+      for (const id of ids) {
+        for (const [row, stars, scope] of sparkIndex.postings[id] || []) {
+          // Scope 'total' adds the two direct parents, never grandparents
+          if (scope === SCOPE_OWN || (rule.scope === 'total' && scope === SCOPE_PARENT)) {
+            totals.set(row, (totals.get(row) || 0) + stars);
+          }
+        }
+      }
+    }
+    
+    if (rule.minStars <= 0) return new Set(data.keys());
+    const rows = new Set();
+    totals.forEach((stars, row) => {
+      if (stars >= rule.minStars) rows.add(row);
+    });
+    return rows;
+  });
+  
+  let rows;
+  if (protectionLogic === 'and') {
+    rows = ruleRows.reduce((acc, r) => intersectRows(acc, r));
+  } else {
+    rows = new Set();
+    ruleRows.forEach(r => r.forEach(row => rows.add(row)));
+  }
+  
+  protectionCache = { key, rows };
+  return rows;
+}
+
 // Check if Uma is protected by any rule
-function isProtectedByRules(char) {
+function isProtectedByRules(char, rowIndex) {
   if (protectionRules.length === 0) return false;
+  if (sparkIndex && rowIndex !== undefined) return getProtectedRows().has(rowIndex);
   
   const mainSparks = char.spark_array_enriched || [];
   
@@ -1530,7 +2105,7 @@ function saveProtectionRules() {
 function recalculateProtection() {
   if (!optimizationResults) return;
   optimizationResults.forEach(r => {
-    r.isProtected = isProtectedByRules(data[r.index]);
+    r.isProtected = isProtectedByRules(data[r.index], r.index);
     const belowThreshold = r.score < transferThreshold;
     r.toTransfer = belowThreshold && !r.isProtected;
   });
@@ -1547,10 +2122,13 @@ function recalculateScores() {
   });
 }
 
-function runOptimization() {
+async function runOptimization() {
+  // Scores need every record, so load any shards still pending
+  await ensureAllRecords();
+  
   const results = data.map((char, index) => {
     const score = calculateSparkScore(char);
-    const isProtected = isProtectedByRules(char);
+    const isProtected = isProtectedByRules(char, index);
     const belowThreshold = score.total < transferThreshold;
     
     return {
@@ -1596,6 +2174,7 @@ function renderOptimizationResults() {
   // Preserve open state of details elements before re-rendering
   const scoringDetailsOpen = container.querySelector('.optimize-settings')?.open ?? false;
   const hvSkillsDetailsOpen = container.querySelectorAll('.optimize-settings')[1]?.open ?? false;
+  const duplicatesDetailsOpen = container.querySelector('.optimize-duplicates')?.open ?? false;
   
   const protectedCount = optimizationResults.filter(r => r.isProtected && r.score < transferThreshold).length;
   
@@ -1730,6 +2309,8 @@ function renderOptimizationResults() {
       </div>
     </details>
     
+    ${renderDuplicateClusters(duplicatesDetailsOpen)}
+    
     <div class="optimize-sort-controls">
       <span class="optimize-sort-label">Sort by:</span>
       <button class="optimize-sort-btn ${optimizerSortBy === 'date' ? 'active' : ''}" id="sort-by-date">Date</button>
@@ -1879,7 +2460,7 @@ function renderOptimizationResults() {
       saveProtectionRules();
       // Recalculate protection status
       optimizationResults.forEach(r => {
-        r.isProtected = isProtectedByRules(data[r.index]);
+        r.isProtected = isProtectedByRules(data[r.index], r.index);
         const belowThreshold = r.score < transferThreshold;
         r.toTransfer = belowThreshold && !r.isProtected;
       });
@@ -1896,7 +2477,7 @@ function renderOptimizationResults() {
       saveProtectionRules();
       // Recalculate protection status
       optimizationResults.forEach(r => {
-        r.isProtected = isProtectedByRules(data[r.index]);
+        r.isProtected = isProtectedByRules(data[r.index], r.index);
         const belowThreshold = r.score < transferThreshold;
         r.toTransfer = belowThreshold && !r.isProtected;
       });
@@ -1911,7 +2492,7 @@ function renderOptimizationResults() {
       selectedIndex = idx;
       closeOptimization();
       filterAndSortList();
-      renderDetail(data[idx]);
+      showDetail(idx);
     });
   });
 }
@@ -1942,6 +2523,39 @@ function renderOptimizeRow(result, isTransfer) {
   `;
 }
 
+function renderDuplicateClusters(open) {
+  if (!duplicateReport || duplicateReport.clusters.length === 0) return '';
+  
+  const clusters = duplicateReport.clusters;
+  const extra = clusters.reduce((n, c) => n + c.members.length - 1, 0);
+  
+  return `
+    <details class="optimize-settings optimize-duplicates" ${open ? 'open' : ''}>
+      <summary>// near-duplicates (${clusters.length} groups, ${extra} extra)</summary>
+      <div class="settings-content">
+        <small class="duplicates-note">Same character with ${Math.round(duplicateReport.threshold * 100)}%+ matching sparks and skills. The highest rated copy is suggested as the keeper.</small>
+        ${clusters.map(cluster => `
+          <div class="duplicate-cluster">
+            ${cluster.members.map(([row, similarity]) => {
+              const char = data[row] || {};
+              const isKeeper = row === cluster.keeper;
+              return `
+                <div class="optimize-row duplicate-row ${isKeeper ? '' : 'transfer'}" data-index="${row}">
+                  <div class="optimize-row-main">
+                    <span class="optimize-name">${char.chara_name_en || 'Unknown'}</span>
+                    <span class="optimize-rank">${(char.rank_score || 0).toLocaleString()}</span>
+                    <span class="duplicate-tag ${isKeeper ? 'keeper' : ''}">${isKeeper ? 'keep' : `${Math.round(similarity * 100)}% match`}</span>
+                  </div>
+                </div>
+              `;
+            }).join('')}
+          </div>
+        `).join('')}
+      </div>
+    </details>
+  `;
+}
+
 function renderOptimizeUI() {
   return `
     <!-- Optimization Modal -->